@@ -3,15 +3,41 @@ from __future__ import annotations
 
 from typing import Any, Union
 
-from flask import Flask, request
-
-
-ResponseType = Union[dict[str, Any], tuple[Any, int]]
+import argparse
+
+from flask import Flask, Response, request
+
+from sit_liveclip.core import wire
+from sit_liveclip.utils import TIMERS, format_metrics
+from sit_liveclip.broker import (
+    MAX_SESSIONS,
+    Mailbox,
+    MailboxRegistry,
+    SessionLimitError,
+)
+from sit_liveclip.broker.protocol import (
+    STEP_TIMEOUT,
+    MAX_POLL_TIMEOUT,
+    StateType,
+    json_state,
+    binary_state,
+    prefers_binary,
+    wait_for_state,
+    preprocess_player_state,
+)
+
+
+ResponseType = Union[dict[str, Any], tuple[Any, int], Response]
+
+MAILBOX_CAPACITY = 1
 
 app = Flask(__name__)
 
-action_queue: list[int] = []
-state_queue: list[dict[str, Any]] = []
+# one latest-wins mailbox per player, keyed by the `X-Session-Id` header
+mailboxes: MailboxRegistry[Mailbox[StateType]] = MailboxRegistry(
+    MAILBOX_CAPACITY,
+    MAX_SESSIONS,
+)
 
 
 @app.route("/")
@@ -21,30 +47,122 @@ def index() -> str:
 
 @app.route("/state", methods=["POST", "GET"])
 def handle_state_route() -> ResponseType:
-    if request.method == "GET":
-        if len(state_queue) == 0:
-            return "", 404
-        return state_queue.pop()
+    """Post a player state, or get the latest one.
 
-    state = _preprocess_player_state(request.json)
-    state_queue.append(state)
-    return {"len_state_queue": len(state_queue)}
+    A GET with a `timeout` query parameter is a long-poll: the request is held open
+    until a state is posted or the timeout passes, in which case 204 is returned.
+    Without it, 404 is returned right away when no state is pending. Only the
+    latest state is kept, older ones are counted as dropped or stale.
+    """
+    mailbox = _get_mailbox()
 
+    if request.method == "GET":
+        timeout = request.args.get("timeout", default=0.0, type=float)
+        state = wait_for_state(mailbox, min(timeout, MAX_POLL_TIMEOUT))
+        if state is None:
+            return "", 204 if timeout > 0 else 404
+        return _make_state_response(*state)
+
+    mailbox.post_state(
+        request.get_data()
+        if request.mimetype == wire.STATE_MEDIA_TYPE
+        else preprocess_player_state(request.json),
+    )
+    return mailbox.stats()["states"]
+
+
+@app.route("/action", methods=["POST", "GET"])
+@app.route("/action/<int(signed=True):action>", methods=["POST"])
+def handle_action_route(action: int | None = None) -> ResponseType:
+    """Post an action, or take the latest one, with the same polling as `/state`."""
+    mailbox = _get_mailbox()
 
-@app.route("/action/<action>", methods=["POST", "GET"])
-def handle_action_route(action: int) -> ResponseType:
     if request.method == "GET":
-        if len(action_queue) == 0:
-            return "", 404
-        return {"action": action}
+        timeout = request.args.get("timeout", default=0.0, type=float)
+        taken = mailbox.take_action(min(timeout, MAX_POLL_TIMEOUT))
+        if taken is None:
+            return "", 204 if timeout > 0 else 404
+        return {"action": taken}
+
+    mailbox.post_action(int(request.json["action"]) if action is None else action)
+    return mailbox.stats()["actions"]
+
+
+@app.route("/step", methods=["POST"])
+def handle_step_route() -> ResponseType:
+    """Queue an action and answer with the next player state in the same request.
+
+    States still pending answer earlier actions, so they are discarded first.
+    """
+    mailbox = _get_mailbox()
+    mailbox.post_step(int(request.json["action"]))
+
+    timeout = request.args.get("timeout", default=STEP_TIMEOUT, type=float)
+    state = wait_for_state(mailbox, min(timeout, STEP_TIMEOUT))
+    if state is None:
+        return "", 504
+    return _make_state_response(*state)
+
+
+@app.route("/stats")
+def handle_stats_route() -> ResponseType:
+    """Report the posted, taken, dropped and stale counters of every session."""
+    return mailboxes.stats()
+
+
+@app.route("/metrics")
+def handle_metrics_route() -> ResponseType:
+    """Report the mailbox counters and, with `--timing`, the broker timers as text."""
+    return Response(
+        format_metrics(TIMERS, mailboxes.counters()),
+        mimetype="text/plain",
+    )
+
+
+@app.errorhandler(SessionLimitError)
+def handle_session_limit(error: SessionLimitError) -> ResponseType:
+    """Refuse new sessions while every mailbox is waited on."""
+    return str(error), 503
+
 
-    action_queue.append(action)
-    return {"action_queue": action_queue}
+def _get_mailbox() -> Mailbox[StateType]:
+    return mailboxes.get(
+        request.headers.get("X-Session-Id") or request.args.get("session")
+    )
 
 
-def _preprocess_player_state(state: Any) -> dict[str, Any]:
-    return {"state": state}
+@TIMERS.timed("broker/respond")
+def _make_state_response(state: StateType, wait_time: float) -> ResponseType:
+    """Answer in the binary format if the client prefers it, in JSON otherwise."""
+    if prefers_binary(request.headers.get("Accept", "")):
+        return Response(
+            binary_state(state),
+            mimetype=wire.STATE_MEDIA_TYPE,
+            headers={"X-Wait-Time": str(wait_time)},
+        )
+    return json_state(state, wait_time)
 
 
 if __name__ == "__main__":
-    app.run(port=1234, debug=False)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", default=1234, type=int)
+    parser.add_argument(
+        "--async",
+        help="Serve with the asyncio broker, which also accepts players over /ws",
+        dest="use_async",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--timing",
+        help="Time the state waits and responses, reported by /metrics",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    if args.use_async:
+        from sit_liveclip.broker import aio  # pylint: disable=import-outside-toplevel
+
+        aio.run(port=args.port, timing=args.timing)
+    else:
+        TIMERS.enabled = args.timing
+        app.run(port=args.port, debug=False)
@@ -0,0 +1,637 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import json
+import math
+import time
+import queue
+import logging
+import threading
+import contextlib
+from multiprocessing.connection import Client, Listener, AuthenticationError
+
+import numpy as np
+
+import torch
+from tianshou.env import BaseVectorEnv, DummyVectorEnv
+from tianshou.data import Batch, VectorReplayBuffer
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Sequence
+
+    from multiprocessing.queues import Queue
+    from multiprocessing.context import BaseContext
+    from multiprocessing.process import BaseProcess
+    from multiprocessing.connection import Connection
+    from multiprocessing.synchronize import Event
+
+    import gym
+
+    from torch import nn
+    from tianshou.policy import BasePolicy
+
+    from sit_liveclip.types import (
+        NDArrayBool,
+        NDArrayInt64,
+        NDArrayUInt8,
+        NDArrayFloat32,
+        NDArrayFloat64,
+    )
+
+    EnvFn = Callable[[], gym.Env | BaseVectorEnv]
+    PolicyFn = Callable[[BaseVectorEnv], BasePolicy]
+    RolloutViews = dict[str, np.ndarray[Any, Any]]  # field -> array
+
+
+logger = logging.getLogger(__name__)
+
+# values of the "meta" field of a rollout
+ROLLOUT_META = ("actor_id", "policy_version", "wait_time")
+
+_ALIGNMENT = 8  # bytes, of every field of a rollout
+
+
+class RolloutLayout(NamedTuple):
+    """Byte layout of a rollout, `rollout_length` steps of `num_envs` flat envs.
+
+    A rollout is a single buffer, so that it is written by an actor and read by the
+    learner in place, in shared memory or straight from a socket. `obs` holds the
+    observation after the last step too, to bootstrap the value of the rollout.
+    """
+
+    rollout_length: int
+    num_envs: int
+    obs_size: int
+
+    @property
+    def fields(self) -> dict[str, tuple[tuple[int, ...], str]]:
+        """Shape and dtype of each field, in their order in the buffer."""
+        steps = (self.rollout_length, self.num_envs)
+        return {
+            "meta": ((len(ROLLOUT_META),), "float64"),
+            "obs": ((self.rollout_length + 1, self.num_envs, self.obs_size), "float32"),
+            "act": (steps, "int64"),
+            "rew": (steps, "float32"),
+            "done": (steps, "bool"),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            _align(math.prod(shape) * np.dtype(dtype).itemsize)
+            for shape, dtype in self.fields.values()
+        )
+
+    def views(self, buffer: Any) -> RolloutViews:
+        """Arrays of the fields of a rollout, viewing the bytes of `buffer`.
+
+        >>> layout = RolloutLayout(rollout_length=4, num_envs=2, obs_size=3)
+        >>> views = layout.views(np.zeros(layout.nbytes, dtype="uint8"))
+        >>> views["obs"].shape, views["act"].shape, layout.nbytes
+        ((5, 2, 3), (4, 2), 248)
+        """
+        views = {}
+        offset = 0
+        for name, (shape, dtype) in self.fields.items():
+            count = math.prod(shape)
+            views[name] = np.frombuffer(
+                buffer,
+                dtype=dtype,
+                count=count,
+                offset=offset,
+            ).reshape(shape)
+            offset += _align(count * np.dtype(dtype).itemsize)
+        return views
+
+
+class SharedRollouts:
+    """Slots of rollouts in shared memory, passed between actors and the learner.
+
+    An actor takes a slot from `free`, writes a rollout into it and puts it in
+    `full`. The learner copies it out and puts it back in `free`. Only slot indices
+    go through the queues, and actors wait for a free slot when the learner falls
+    behind.
+    """
+
+    def __init__(self, layout: RolloutLayout, num_slots: int, context: BaseContext):
+        if num_slots < 1:
+            raise ValueError(f"At least one rollout slot is required, got {num_slots}.")
+        self.layout = layout
+        self.memory = torch.zeros((num_slots, layout.nbytes), dtype=torch.uint8)
+        self.memory.share_memory_()
+        self.free: Queue[int] = context.Queue()  # type: ignore[attr-defined]
+        self.full: Queue[int] = context.Queue()  # type: ignore[attr-defined]
+        for slot in range(num_slots):
+            self.free.put(slot)
+
+    def buffer(self, slot: int) -> NDArrayUInt8:
+        return self.memory[slot].numpy()
+
+    def views(self, slot: int) -> RolloutViews:
+        return self.layout.views(self.buffer(slot))
+
+
+class SharedWeights:
+    """Parameters of a module in shared memory, published by the learner to actors.
+
+    The parameters are copied into one flat tensor, along with a sequence number
+    that is odd while they are written. Readers copy the tensor and retry if the
+    sequence number changed meanwhile, so neither side takes a lock, and no state
+    dict is pickled.
+    """
+
+    def __init__(self, module: nn.Module, context: BaseContext) -> None:
+        self.flat = torch.zeros(_num_parameters(module)).share_memory_()
+        self.sequence = context.RawValue("q", 0)  # type: ignore[attr-defined]
+
+    @property
+    def version(self) -> int:
+        """Number of times weights were published."""
+        return int(self.sequence.value) // 2
+
+    def publish(self, module: nn.Module) -> None:
+        self.sequence.value += 1
+        with torch.no_grad():
+            for param, view in zip(module.parameters(), _flat_views(module, self.flat)):
+                view.copy_(param)
+        self.sequence.value += 1
+
+    def snapshot(self) -> tuple[int, torch.Tensor]:
+        """A consistent copy of the flat parameters, and their version."""
+        while True:
+            sequence = self.sequence.value
+            if sequence % 2 == 0:
+                flat = self.flat.clone()
+                if self.sequence.value == sequence:
+                    return sequence // 2, flat
+            time.sleep(0)
+
+    def pull(self, module: nn.Module, version: int) -> int:
+        """Load the parameters into `module` if newer than `version`, return theirs."""
+        if self.version == version:
+            return version
+        version, flat = self.snapshot()
+        load_flat_parameters(module, flat)
+        return version
+
+
+def load_flat_parameters(module: nn.Module, flat: torch.Tensor) -> None:
+    with torch.no_grad():
+        for param, view in zip(module.parameters(), _flat_views(module, flat)):
+            param.copy_(view)
+
+
+def collect_rollout(
+    policy: BasePolicy,
+    env: BaseVectorEnv,
+    obs: NDArrayFloat32,
+    views: RolloutViews,
+) -> NDArrayFloat32:
+    """Step `env` from `obs` with actions sampled from `policy`, into a rollout.
+
+    Finished envs are reset right away. Returns the observations to start the next
+    rollout from.
+    """
+    for step in range(len(views["act"])):
+        views["obs"][step] = obs
+        with torch.no_grad():
+            act = policy(Batch(obs=obs, info={})).act.cpu().numpy()
+        obs, rew, done, _ = env.step(act)
+        views["act"][step] = act
+        views["rew"][step] = rew
+        views["done"][step] = done
+        if done.any():
+            env_ids = np.flatnonzero(done)
+            obs[env_ids] = env.reset(env_ids)
+    views["obs"][-1] = obs
+    return obs
+
+
+def run_actor(
+    actor_id: int,
+    env_fn: EnvFn,
+    policy_fn: PolicyFn,
+    rollouts: SharedRollouts,
+    weights: SharedWeights,
+    stop: Event,
+) -> None:
+    """Collect rollouts into `rollouts` until `stop` is set, in an actor process."""
+    # pylint: disable=too-many-arguments
+    torch.set_num_threads(1)  # the learner needs the cores more
+    env = _to_vector_env(env_fn())
+    try:
+        layout = _env_layout(env, rollouts.layout.rollout_length)
+        if layout != rollouts.layout:
+            raise ValueError(f"Actor {actor_id} has a {layout}, not a {rollouts.layout}.")
+        policy = policy_fn(env)
+        policy.train()  # sample actions
+        version = weights.pull(policy.actor, -1)
+
+        obs = env.reset()
+        while True:
+            start = time.perf_counter()
+            slot = _get(rollouts.free, stop)
+            if slot is None:
+                return
+            wait_time = time.perf_counter() - start
+
+            views = rollouts.views(slot)
+            obs = collect_rollout(policy, env, obs, views)
+            views["meta"][:] = (actor_id, version, wait_time)
+            rollouts.full.put(slot)
+            version = weights.pull(policy.actor, version)
+    finally:
+        env.close()
+
+
+class RolloutServer:
+    """Accept actors of other nodes over sockets, and hand their rollouts over.
+
+    Each connected actor is served by a thread, which receives its rollouts
+    straight into free slots of `rollouts`, and sends it the weights before each
+    rollout when they changed. Messages are raw bytes, nothing is pickled.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        rollouts: SharedRollouts,
+        weights: SharedWeights,
+        first_actor_id: int,
+        authkey: bytes | None = None,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self.rollouts = rollouts
+        self.weights = weights
+        self.next_actor_id = first_actor_id
+        self.num_connected = 0
+
+        self.listener = Listener(address, authkey=authkey)
+        self._stop = threading.Event()
+        self._connections: list[Connection] = []
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self.listener.address  # type: ignore[no-any-return]
+
+    def close(self) -> None:
+        self._stop.set()
+        self.listener.close()
+        for conn in self._connections:
+            conn.close()
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn = self.listener.accept()
+            except AuthenticationError:
+                logger.warning("Refused an actor with the wrong authentication key.")
+                continue
+            except OSError:
+                return  # closed
+
+            self._connections.append(conn)
+            actor_id = self.next_actor_id
+            self.next_actor_id += 1
+            threading.Thread(
+                target=self._serve,
+                args=(conn, actor_id),
+                daemon=True,
+            ).start()
+
+    def _serve(self, conn: Connection, actor_id: int) -> None:
+        try:
+            if self._accept_actor(conn, actor_id):
+                self._receive_rollouts(conn, actor_id)
+        except (EOFError, OSError):
+            logger.info("Actor %d disconnected.", actor_id)
+        finally:
+            conn.close()
+
+    def _accept_actor(self, conn: Connection, actor_id: int) -> bool:
+        """Check that the actor sends rollouts of the expected layout, give it its id."""
+        layout = self.rollouts.layout
+        request = json.loads(conn.recv_bytes())
+        if RolloutLayout(*request["layout"]) != layout:
+            error = f"The learner expects a {layout}, got {request['layout']}."
+            conn.send_bytes(json.dumps({"error": error}).encode())
+            return False
+        conn.send_bytes(json.dumps({"actor_id": actor_id}).encode())
+        self.num_connected += 1
+        logger.info("Actor %d connected.", actor_id)
+        return True
+
+    def _receive_rollouts(self, conn: Connection, actor_id: int) -> None:
+        version = -1
+        while True:
+            slot = _get(self.rollouts.free, self._stop)
+            if slot is None:
+                return
+            try:
+                version = _send_weights(conn, self.weights, version)
+                size = conn.recv_bytes_into(self.rollouts.buffer(slot))
+                if size != self.rollouts.layout.nbytes:
+                    raise ValueError(f"Actor {actor_id} sent a rollout of {size} bytes.")
+            except BaseException:
+                self.rollouts.free.put(slot)
+                raise
+            self.rollouts.full.put(slot)
+
+
+class EpisodeTracker:
+    """Returns and lengths of the episodes of each actor env, across rollouts."""
+
+    def __init__(self, num_envs: int) -> None:
+        self.num_envs = num_envs
+        self.num_finished = 0
+        self.returns: dict[int, NDArrayFloat64] = {}
+        self.lengths: dict[int, NDArrayInt64] = {}
+
+    def add(
+        self, actor_id: int, rew: NDArrayFloat32, done: NDArrayBool
+    ) -> tuple[list[float], list[int]]:
+        """Add a rollout of `actor_id`, return the episodes it finished."""
+        returns = self.returns.setdefault(actor_id, np.zeros(self.num_envs))
+        lengths = self.lengths.setdefault(actor_id, np.zeros(self.num_envs, "int64"))
+        finished_returns, finished_lengths = [], []
+        for step_rew, step_done in zip(rew, done):
+            returns += step_rew
+            lengths += 1
+            finished_returns += returns[step_done].tolist()
+            finished_lengths += lengths[step_done].tolist()
+            returns[step_done] = 0.0
+            lengths[step_done] = 0
+        self.num_finished += len(finished_returns)
+        return finished_returns, finished_lengths
+
+
+class GatheredRollouts(NamedTuple):
+    """Rollouts gathered by the learner for an update of the policy."""
+
+    buffer: VectorReplayBuffer
+    num_received: int
+    num_dropped: int  # collected with weights too old
+    wait_time: float  # seconds the learner waited for rollouts
+    returns: list[float]  # of the episodes they finished
+    lengths: list[int]
+    lags: list[int]  # policy versions behind the learner, of those kept
+    actor_waits: list[float]  # seconds their actors waited for a free slot
+
+
+def start_actors(
+    env_fns: Sequence[EnvFn],
+    policy_fn: PolicyFn,
+    rollouts: SharedRollouts,
+    weights: SharedWeights,
+    stop: Event,
+    context: BaseContext,
+) -> list[BaseProcess]:
+    """Start a local actor process collecting rollouts for each of `env_fns`."""
+    # pylint: disable=too-many-arguments
+    actors = [
+        context.Process(  # type: ignore[attr-defined]
+            target=run_actor,
+            args=(actor_id, env_fn, policy_fn, rollouts, weights, stop),
+            name=f"actor-{actor_id}",
+            daemon=True,
+        )
+        for actor_id, env_fn in enumerate(env_fns)
+    ]
+    for actor in actors:
+        actor.start()
+    return actors
+
+
+def stop_actors(actors: list[BaseProcess], server: RolloutServer | None) -> None:
+    """Wait for the local actors to exit once stopped, and disconnect remote ones."""
+    if server is not None:
+        server.close()
+    for actor in actors:
+        actor.join(timeout=10)
+        if actor.is_alive():
+            actor.terminate()
+
+
+def gather_rollouts(
+    rollouts: SharedRollouts,
+    weights: SharedWeights,
+    actors: list[BaseProcess],
+    episodes: EpisodeTracker,
+    num_rollouts: int,
+    max_policy_lag: int,
+) -> GatheredRollouts:
+    """Take rollouts from the actors until `num_rollouts` recent enough are kept."""
+    # pylint: disable=too-many-arguments,too-many-locals
+    layout = rollouts.layout
+    buffer = VectorReplayBuffer(
+        num_rollouts * layout.rollout_length * layout.num_envs,
+        num_rollouts * layout.num_envs,
+    )
+    returns: list[float] = []
+    lengths: list[int] = []
+    lags: list[int] = []
+    actor_waits: list[float] = []
+    num_received = 0
+    wait_time = 0.0
+    while len(lags) < num_rollouts:
+        wait_start = time.perf_counter()
+        slot = _next_rollout(rollouts, actors)
+        wait_time += time.perf_counter() - wait_start
+        num_received += 1
+
+        views = rollouts.views(slot)
+        actor_id, version, actor_wait = views["meta"]
+        finished = episodes.add(int(actor_id), views["rew"], views["done"])
+        returns += finished[0]
+        lengths += finished[1]
+        actor_waits.append(actor_wait)
+        lag = weights.version - int(version)
+        if lag <= max_policy_lag:
+            _add_rollout(buffer, views, len(lags) * layout.num_envs)
+            lags.append(lag)
+        rollouts.free.put(slot)
+
+    num_dropped = num_received - num_rollouts
+    return GatheredRollouts(
+        buffer,
+        num_received,
+        num_dropped,
+        wait_time,
+        returns,
+        lengths,
+        lags,
+        actor_waits,
+    )
+
+
+def update_policy(
+    policy: BasePolicy,
+    buffer: VectorReplayBuffer,
+    batch_size: int,
+    repeat: int,
+) -> tuple[dict[str, Any], int]:
+    """Update `policy` on the rollouts of `buffer`, return its losses and steps."""
+    losses = policy.update(0, buffer, batch_size=batch_size, repeat=repeat)
+    num_gradient_steps = max(
+        [1] + [len(value) for value in losses.values() if isinstance(value, list)]
+    )
+    return losses, num_gradient_steps
+
+
+def run_remote_actor(
+    address: tuple[str, int],
+    env_fn: EnvFn,
+    policy_fn: PolicyFn,
+    rollout_length: int,
+    authkey: bytes | None = None,
+) -> int:
+    """Collect rollouts for the learner listening at `address`, until it stops.
+
+    Returns the number of rollouts sent.
+    """
+    env = _to_vector_env(env_fn())
+    try:
+        layout = _env_layout(env, rollout_length)
+        policy = policy_fn(env)
+        policy.train()
+        with Client(address, authkey=authkey) as conn:
+            actor_id = _connect(conn, layout)
+            return _send_rollouts(conn, actor_id, policy, env, layout)
+    finally:
+        env.close()
+
+
+def _connect(conn: Connection, layout: RolloutLayout) -> int:
+    """Introduce an actor of rollouts of `layout` to the learner, return its id."""
+    conn.send_bytes(json.dumps({"layout": list(layout)}).encode())
+    reply = json.loads(conn.recv_bytes())
+    if "error" in reply:
+        raise ValueError(reply["error"])
+    return int(reply["actor_id"])
+
+
+def _send_rollouts(
+    conn: Connection,
+    actor_id: int,
+    policy: BasePolicy,
+    env: BaseVectorEnv,
+    layout: RolloutLayout,
+) -> int:
+    """Send rollouts to the learner until it closes `conn`, return their number."""
+    flat = torch.zeros(_num_parameters(policy.actor))
+    buffer = np.zeros(layout.nbytes, dtype="uint8")
+    views = layout.views(buffer)
+
+    version = -1
+    num_rollouts = 0
+    obs = env.reset()
+    while True:
+        start = time.perf_counter()
+        try:
+            version = _receive_weights(conn, policy.actor, flat, version)
+        except (EOFError, OSError):
+            return num_rollouts  # the learner is done
+        wait_time = time.perf_counter() - start
+
+        obs = collect_rollout(policy, env, obs, views)
+        views["meta"][:] = (actor_id, version, wait_time)
+        try:
+            conn.send_bytes(buffer)
+        except OSError:
+            return num_rollouts
+        num_rollouts += 1
+
+
+def _send_weights(conn: Connection, weights: SharedWeights, version: int) -> int:
+    """Send the version of the weights, then the weights if newer than `version`."""
+    latest, flat = weights.snapshot()
+    conn.send_bytes(np.int64(latest).tobytes())
+    if latest != version:
+        conn.send_bytes(flat.numpy())
+    return latest
+
+
+def _receive_weights(
+    conn: Connection, module: nn.Module, flat: torch.Tensor, version: int
+) -> int:
+    latest = int(np.frombuffer(conn.recv_bytes(), dtype="int64")[0])
+    if latest != version:
+        conn.recv_bytes_into(flat.numpy())
+        load_flat_parameters(module, flat)
+    return latest
+
+
+def _next_rollout(rollouts: SharedRollouts, actors: list[BaseProcess]) -> int:
+    """Wait for a full rollout slot, failing if a local actor died meanwhile."""
+    while True:
+        try:
+            return rollouts.full.get(timeout=1.0)
+        except queue.Empty as err:
+            for actor in actors:
+                if not actor.is_alive():
+                    raise RuntimeError(
+                        f"{actor.name} exited with code {actor.exitcode}.",
+                    ) from err
+
+
+def _add_rollout(
+    buffer: VectorReplayBuffer,
+    views: RolloutViews,
+    first_buffer_id: int,
+) -> None:
+    """Copy a rollout to the sub-buffers from `first_buffer_id`, one per env."""
+    obs = views["obs"]
+    buffer_ids = np.arange(first_buffer_id, first_buffer_id + obs.shape[1])
+    for step in range(len(views["act"])):
+        buffer.add(
+            Batch(
+                obs=obs[step],
+                act=views["act"][step],
+                rew=views["rew"][step],
+                done=views["done"][step],
+                obs_next=obs[step + 1],
+                info={},
+            ),
+            buffer_ids=buffer_ids,
+        )
+
+
+def _get(slots: Queue[int], stop: Event | threading.Event) -> int | None:
+    """A slot of `slots`, or None once `stop` is set."""
+    while not stop.is_set():
+        with contextlib.suppress(queue.Empty):
+            return slots.get(timeout=0.1)
+    return None
+
+
+def _env_layout(env: BaseVectorEnv, rollout_length: int) -> RolloutLayout:
+    obs_space = env.observation_space[0]
+    if len(obs_space.shape) != 1:
+        raise ValueError("Actors need envs with flat observations.")
+    return RolloutLayout(rollout_length, len(env), obs_space.shape[0])
+
+
+def _to_vector_env(env: gym.Env | BaseVectorEnv) -> BaseVectorEnv:
+    return env if isinstance(env, BaseVectorEnv) else DummyVectorEnv([lambda: env])
+
+
+def _num_parameters(module: nn.Module) -> int:
+    return sum(param.numel() for param in module.parameters())
+
+
+def _flat_views(module: nn.Module, flat: torch.Tensor) -> list[torch.Tensor]:
+    views = []
+    offset = 0
+    for param in module.parameters():
+        end = offset + param.numel()
+        views.append(flat[offset:end].view_as(param))
+        offset = end
+    return views
+
+
+def _align(nbytes: int) -> int:
+    return -(-nbytes // _ALIGNMENT) * _ALIGNMENT
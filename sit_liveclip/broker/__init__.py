@@ -0,0 +1,18 @@
+from sit_liveclip.broker.mailbox import (
+    MAX_SESSIONS,
+    DEFAULT_SESSION,
+    Slot,
+    Mailbox,
+    MailboxRegistry,
+    SessionLimitError,
+)
+
+
+__all__ = [
+    "Slot",
+    "Mailbox",
+    "MailboxRegistry",
+    "SessionLimitError",
+    "DEFAULT_SESSION",
+    "MAX_SESSIONS",
+]
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+from typing import Any
+
+import json
+import time
+import asyncio
+
+from aiohttp import WSMsgType, web
+
+from sit_liveclip.core import wire
+from sit_liveclip.utils.timing import TIMERS, format_metrics
+from sit_liveclip.broker.mailbox import (
+    MAX_SESSIONS,
+    Slot,
+    MailboxRegistry,
+    SessionLimitError,
+)
+from sit_liveclip.broker.protocol import (
+    STEP_TIMEOUT,
+    MAX_POLL_TIMEOUT,
+    StateType,
+    json_state,
+    timed_state,
+    binary_state,
+    prefers_binary,
+    preprocess_player_state,
+)
+
+
+MAILBOXES_KEY: web.AppKey[MailboxRegistry[AsyncMailbox]] = web.AppKey("mailboxes")
+
+
+class AsyncMailbox:
+    """`Mailbox` counterpart living in one asyncio event loop.
+
+    Waiting for a message suspends the request instead of holding a thread, so
+    thousands of idle long-polls and WebSockets cost a few kilobytes each.
+    """
+
+    def __init__(self, capacity: int = 1) -> None:
+        self.actions: Slot[int] = Slot(capacity)
+        self.states: Slot[StateType] = Slot(capacity)
+        self.num_waiters = 0
+        self._action_posted = asyncio.Event()
+        self._state_posted = asyncio.Event()
+
+    def post_action(self, action: int) -> None:
+        self.actions.post(action)
+        self._action_posted.set()
+
+    def post_state(self, state: StateType) -> None:
+        self.states.post(state)
+        self._state_posted.set()
+
+    def post_step(self, action: int) -> None:
+        """Post an action, discarding the pending states as `Mailbox.post_step` does."""
+        self.states.discard()
+        self.post_action(action)
+
+    async def take_action(self, timeout: float = 0.0) -> int | None:
+        action: int | None = await self._take(self.actions, self._action_posted, timeout)
+        return action
+
+    async def take_state(self, timeout: float = 0.0) -> StateType | None:
+        state: StateType | None = await self._take(
+            self.states,
+            self._state_posted,
+            timeout,
+        )
+        return state
+
+    def return_action(self, action: int) -> None:
+        """Put back an action that was not delivered, unless a newer one is pending."""
+        if len(self.actions) == 0:
+            self.post_action(action)
+
+    def stats(self) -> dict[str, Any]:
+        return {"actions": self.actions.stats(), "states": self.states.stats()}
+
+    async def _take(
+        self,
+        slot: Slot[Any],
+        posted: asyncio.Event,
+        timeout: float,
+    ) -> Any | None:
+        self.num_waiters += 1
+        try:
+            return await _take(slot, posted, timeout)
+        finally:
+            self.num_waiters -= 1
+
+
+def make_app(capacity: int = 1, max_sessions: int = MAX_SESSIONS) -> web.Application:
+    """Build the asyncio broker, serving the routes of `server.py` plus `/ws`."""
+    app = web.Application()
+    app[MAILBOXES_KEY] = MailboxRegistry(capacity, max_sessions, AsyncMailbox)
+    app.add_routes(
+        [
+            web.get("/", handle_index_route),
+            web.get("/state", handle_get_state_route),
+            web.post("/state", handle_post_state_route),
+            web.get("/action", handle_get_action_route),
+            web.post("/action", handle_post_action_route),
+            web.post(r"/action/{action:-?\d+}", handle_post_action_route),
+            web.post("/step", handle_step_route),
+            web.get("/stats", handle_stats_route),
+            web.get("/metrics", handle_metrics_route),
+            web.get("/ws", handle_player_socket_route),
+        ],
+    )
+    return app
+
+
+def run(
+    host: str = "127.0.0.1",
+    port: int = 1234,
+    timing: bool = False,
+    **kwargs: Any,
+) -> None:
+    TIMERS.enabled = timing
+    web.run_app(make_app(**kwargs), host=host, port=port)
+
+
+async def handle_index_route(_: web.Request) -> web.StreamResponse:
+    return web.Response(text="Hello, World!")
+
+
+async def handle_get_state_route(request: web.Request) -> web.StreamResponse:
+    """Get the latest player state, long-polling with the same rules as `server.py`."""
+    timeout = _get_float(request, "timeout", 0.0)
+    state = await _wait_for_state(_get_mailbox(request), min(timeout, MAX_POLL_TIMEOUT))
+    if state is None:
+        return web.Response(status=204 if timeout > 0 else 404)
+    return _make_state_response(request, *state)
+
+
+async def handle_post_state_route(request: web.Request) -> web.StreamResponse:
+    mailbox = _get_mailbox(request)
+    if request.content_type == wire.STATE_MEDIA_TYPE:
+        mailbox.post_state(await request.read())
+    else:
+        mailbox.post_state(preprocess_player_state(await request.json()))
+    return web.json_response(mailbox.states.stats())
+
+
+async def handle_get_action_route(request: web.Request) -> web.StreamResponse:
+    timeout = _get_float(request, "timeout", 0.0)
+    action = await _get_mailbox(request).take_action(min(timeout, MAX_POLL_TIMEOUT))
+    if action is None:
+        return web.Response(status=204 if timeout > 0 else 404)
+    return web.json_response({"action": action})
+
+
+async def handle_post_action_route(request: web.Request) -> web.StreamResponse:
+    mailbox = _get_mailbox(request)
+    if "action" in request.match_info:
+        mailbox.post_action(int(request.match_info["action"]))
+    else:
+        mailbox.post_action(int((await request.json())["action"]))
+    return web.json_response(mailbox.actions.stats())
+
+
+async def handle_step_route(request: web.Request) -> web.StreamResponse:
+    """Queue an action and answer with the next player state in the same request."""
+    mailbox = _get_mailbox(request)
+    mailbox.post_step(int((await request.json())["action"]))
+
+    timeout = _get_float(request, "timeout", STEP_TIMEOUT)
+    state = await _wait_for_state(mailbox, min(timeout, STEP_TIMEOUT))
+    if state is None:
+        return web.Response(status=504)
+    return _make_state_response(request, *state)
+
+
+async def handle_stats_route(request: web.Request) -> web.StreamResponse:
+    return web.json_response(request.app[MAILBOXES_KEY].stats())
+
+
+async def handle_metrics_route(request: web.Request) -> web.StreamResponse:
+    """Report the mailbox counters and the broker timers as plain text."""
+    counters = request.app[MAILBOXES_KEY].counters()
+    return web.Response(text=format_metrics(TIMERS, counters))
+
+
+async def handle_player_socket_route(request: web.Request) -> web.StreamResponse:
+    """Push actions to a player and receive its states over a single WebSocket.
+
+    Actions are sent as `{"action": ...}` text messages. States are received as
+    binary messages in the wire format, or as JSON text messages.
+    """
+    mailbox = _get_mailbox(request)
+    socket = web.WebSocketResponse(heartbeat=MAX_POLL_TIMEOUT)
+    await socket.prepare(request)
+
+    pusher = asyncio.create_task(_push_actions(socket, mailbox))
+    try:
+        async for message in socket:
+            if message.type == WSMsgType.BINARY:
+                mailbox.post_state(message.data)
+            elif message.type == WSMsgType.TEXT:
+                mailbox.post_state(preprocess_player_state(json.loads(message.data)))
+    finally:
+        pusher.cancel()
+
+    return socket
+
+
+async def _push_actions(socket: web.WebSocketResponse, mailbox: AsyncMailbox) -> None:
+    while not socket.closed:
+        action = await mailbox.take_action(MAX_POLL_TIMEOUT)
+        if action is not None and not await _send_action(socket, action):
+            # the socket closed while the action was taken, keep it for the next one
+            mailbox.return_action(action)
+            return
+
+
+async def _send_action(socket: web.WebSocketResponse, action: int) -> bool:
+    if socket.closed:
+        return False
+    try:
+        await socket.send_json({"action": action})
+    except ConnectionResetError:
+        return False
+    return True
+
+
+async def _take(slot: Slot[Any], posted: asyncio.Event, timeout: float) -> Any | None:
+    deadline = time.monotonic() + timeout
+    while len(slot) == 0:
+        posted.clear()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            await asyncio.wait_for(posted.wait(), remaining)
+        except asyncio.TimeoutError:
+            return None
+    return slot.take()
+
+
+async def _wait_for_state(
+    mailbox: AsyncMailbox,
+    timeout: float,
+) -> tuple[StateType, float] | None:
+    start = time.perf_counter()
+    return timed_state(await mailbox.take_state(timeout), start)
+
+
+def _get_mailbox(request: web.Request) -> AsyncMailbox:
+    mailboxes = request.app[MAILBOXES_KEY]
+    try:
+        return mailboxes.get(
+            request.headers.get("X-Session-Id") or request.query.get("session"),
+        )
+    except SessionLimitError as error:
+        raise web.HTTPServiceUnavailable(text=str(error)) from error
+
+
+def _get_float(request: web.Request, name: str, default: float) -> float:
+    try:
+        return float(request.query[name])
+    except (KeyError, ValueError):
+        return default
+
+
+@TIMERS.timed("broker/respond")
+def _make_state_response(
+    request: web.Request,
+    state: StateType,
+    wait_time: float,
+) -> web.StreamResponse:
+    """Answer in the binary format if the client prefers it, in JSON otherwise."""
+    if prefers_binary(request.headers.get("Accept", "")):
+        return web.Response(
+            body=binary_state(state),
+            content_type=wire.STATE_MEDIA_TYPE,
+            headers={"X-Wait-Time": str(wait_time)},
+        )
+    return web.json_response(json_state(state, wait_time))
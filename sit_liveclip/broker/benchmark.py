@@ -0,0 +1,257 @@
+"""Load-test a broker with many simultaneous player sessions.
+
+Every session pairs an agent, sending actions with `POST /step`, with a player
+answering each action with a binary state, over a WebSocket (`--transport ws`) or
+by long-polling `GET /action` (`--transport http`, the only one `server.py`
+supports). Without `--url`, the asyncio broker is started in a child process.
+The load is generated by `--workers` processes, so that the client is not the
+bottleneck.
+
+    python -m sit_liveclip.broker.benchmark --sessions 2000 --steps 20 --workers 4
+    python -m sit_liveclip.broker.benchmark --url http://127.0.0.1:1234 --transport http
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import time
+import socket
+import asyncio
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import aiohttp
+
+from sit_liveclip.core import wire
+from sit_liveclip.utils import console
+from sit_liveclip.broker import aio
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from sit_liveclip.types import NDArrayFloat64
+
+
+class BenchmarkResult(NamedTuple):
+    num_sessions: int
+    num_steps: int
+    num_failed: int
+    duration: float
+    latencies: NDArrayFloat64  # seconds, one per successful step
+
+    @classmethod
+    def merge(cls, results: list[BenchmarkResult]) -> BenchmarkResult:
+        """Combine the results of load generators that ran side by side."""
+        return cls(
+            num_sessions=sum(result.num_sessions for result in results),
+            num_steps=results[0].num_steps,
+            num_failed=sum(result.num_failed for result in results),
+            duration=max(result.duration for result in results),
+            latencies=np.concatenate([result.latencies for result in results]),
+        )
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.duration
+
+    def summary(self) -> dict[str, Any]:
+        p50, p99 = (
+            np.percentile(self.latencies, [50, 99]) if len(self.latencies) else (0, 0)
+        )
+        return {
+            "sessions": self.num_sessions,
+            "steps": self.num_steps,
+            "failed": self.num_failed,
+            "duration_s": round(self.duration, 3),
+            "steps_per_s": round(self.throughput, 1),
+            "latency_p50_ms": round(float(p50) * 1e3, 3),
+            "latency_p99_ms": round(float(p99) * 1e3, 3),
+        }
+
+
+async def run_benchmark(
+    url: str,
+    num_sessions: int,
+    num_steps: int,
+    transport: str = "ws",
+    first_session: int = 0,
+) -> BenchmarkResult:
+    """Run `num_steps` round trips in each of `num_sessions` concurrent sessions."""
+    state = _make_state()
+    session_ids = [f"bench-{first_session + idx}" for idx in range(num_sessions)]
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=60)
+
+    async with aiohttp.ClientSession(
+        url,
+        connector=connector,
+        timeout=timeout,
+    ) as session:
+        play = _play_over_socket if transport == "ws" else _play_over_http
+        players = [
+            asyncio.create_task(play(session, session_id, state))
+            for session_id in session_ids
+        ]
+        # let the players connect before the clock starts
+        await asyncio.sleep(min(5.0, 0.001 * num_sessions + 0.2))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(_drive(session, session_id, num_steps) for session_id in session_ids),
+        )
+        duration = time.perf_counter() - start
+
+        for player in players:
+            player.cancel()
+        await asyncio.gather(*players, return_exceptions=True)
+
+    latencies = np.concatenate([latency for latency, _ in results])
+    return BenchmarkResult(
+        num_sessions=num_sessions,
+        num_steps=num_steps,
+        num_failed=sum(num_failed for _, num_failed in results),
+        duration=duration,
+        latencies=latencies,
+    )
+
+
+async def _drive(
+    session: aiohttp.ClientSession,
+    session_id: str,
+    num_steps: int,
+) -> tuple[NDArrayFloat64, int]:
+    headers = {"X-Session-Id": session_id, "Accept": wire.STATE_MEDIA_TYPE}
+    latencies = []
+    num_failed = 0
+    for step in range(num_steps):
+        start = time.perf_counter()
+        async with session.post(
+            "/step", json={"action": step % 4}, headers=headers
+        ) as res:
+            await res.read()
+            if res.status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                num_failed += 1
+    return np.asarray(latencies, dtype="float64"), num_failed
+
+
+async def _play_over_socket(
+    session: aiohttp.ClientSession,
+    session_id: str,
+    state: bytes,
+) -> None:
+    async with session.ws_connect("/ws", params={"session": session_id}) as socket:
+        async for message in socket:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                await socket.send_bytes(state)
+
+
+async def _play_over_http(
+    session: aiohttp.ClientSession,
+    session_id: str,
+    state: bytes,
+) -> None:
+    headers = {"X-Session-Id": session_id}
+    while True:
+        async with session.get("/action", params={"timeout": 30}, headers=headers) as res:
+            await res.read()
+            if res.status != 200:
+                continue
+        async with session.post(
+            "/state",
+            data=state,
+            headers={**headers, "Content-Type": wire.STATE_MEDIA_TYPE},
+        ) as res:
+            await res.read()
+
+
+def _make_state(history_size: int = 8, sliding_window_size: int = 3) -> bytes:
+    history = [0.0] * history_size
+    window = [0.0] * sliding_window_size
+    return wire.encode_state(
+        {
+            "status": False,
+            "wastage_cost": 0.0,
+            "download_speed": history,
+            "user_staying_time": history,
+            "play_progress": 0.0,
+            "current_staying_time": 0.0,
+            "replay_round": 0.0,
+            "list_video_bitrate": window,
+            "list_video_length": window,
+            "list_buffered_content": window,
+            "list_time_spent_downloading_videos": window,
+            "list_completed_videos": window,
+        },
+    )
+
+
+def _run_worker(
+    url: str,
+    num_sessions: int,
+    num_steps: int,
+    transport: str,
+    first_session: int,
+) -> BenchmarkResult:
+    return asyncio.run(
+        run_benchmark(url, num_sessions, num_steps, transport, first_session),
+    )
+
+
+def _start_broker() -> tuple[mp.Process, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    broker = mp.Process(target=aio.run, kwargs={"port": port}, daemon=True)
+    broker.start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    return broker, f"http://127.0.0.1:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Broker to load, started locally if omitted")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--transport", choices=["ws", "http"], default="ws")
+    args = parser.parse_args()
+
+    broker, url = (None, args.url) if args.url is not None else _start_broker()
+    shares = np.array_split(np.arange(args.sessions), args.workers)
+    try:
+        with ProcessPoolExecutor(args.workers) as executor:
+            futures = [
+                executor.submit(
+                    _run_worker,
+                    url,
+                    len(share),
+                    args.steps,
+                    args.transport,
+                    int(share[0]),
+                )
+                for share in shares
+                if len(share) > 0
+            ]
+            result = BenchmarkResult.merge([future.result() for future in futures])
+    finally:
+        if broker is not None:
+            broker.terminate()
+
+    console.print(result.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Generic, TypeVar, Protocol
+
+import threading
+from collections import OrderedDict, deque
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+
+DEFAULT_SESSION = "default"
+# sessions kept by each broker, a few kilobytes each when idle
+MAX_SESSIONS = 16384
+
+
+class SessionMailbox(Protocol):
+    num_waiters: int  # requests blocked on the mailbox
+
+    def stats(self) -> dict[str, Any]:
+        ...
+
+
+T = TypeVar("T")
+M = TypeVar("M", bound=SessionMailbox)
+
+
+class SessionLimitError(RuntimeError):
+    """Raised for a new session when every mailbox of the registry is waited on."""
+
+
+class Slot(Generic[T]):
+    """Bounded, latest-wins queue of messages sent one way between two peers.
+
+    When the slot is full, posting evicts the oldest message, which is counted as
+    dropped. Taking returns the newest message and discards the older ones, which
+    are counted as stale. The slot is not thread-safe by itself, `Mailbox` guards it.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError(f"Slot capacity must be positive, got {capacity}.")
+
+        self.messages: deque[T] = deque(maxlen=capacity)
+        self.num_posted = 0
+        self.num_taken = 0
+        self.num_dropped = 0
+        self.num_stale = 0
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def post(self, message: T) -> None:
+        if len(self.messages) == self.messages.maxlen:
+            self.num_dropped += 1
+        self.messages.append(message)
+        self.num_posted += 1
+
+    def take(self) -> T:
+        message = self.messages.pop()
+        self.discard()
+        self.num_taken += 1
+        return message
+
+    def discard(self) -> None:
+        """Drop the pending messages, counted as stale."""
+        self.num_stale += len(self.messages)
+        self.messages.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self.messages),
+            "posted": self.num_posted,
+            "taken": self.num_taken,
+            "dropped": self.num_dropped,
+            "stale": self.num_stale,
+        }
+
+
+class Mailbox(Generic[T]):
+    """Latest-wins action and state slots of one player session.
+
+    Every method is thread-safe, and `take_*` can block until a message arrives.
+    """
+
+    def __init__(self, capacity: int = 1) -> None:
+        self.actions: Slot[int] = Slot(capacity)
+        self.states: Slot[T] = Slot(capacity)
+        self.num_waiters = 0
+        self._changed = threading.Condition()
+
+    def post_action(self, action: int) -> None:
+        self._post(self.actions, action)
+
+    def post_state(self, state: T) -> None:
+        self._post(self.states, state)
+
+    def post_step(self, action: int) -> None:
+        """Post an action whose answer is the next state posted from now on.
+
+        Pending states answer earlier actions, e.g. a late reply to a timed-out
+        step, so they are discarded instead of being taken as the answer.
+        """
+        with self._changed:
+            self.states.discard()
+            self.actions.post(action)
+            self._changed.notify_all()
+
+    def take_action(self, timeout: float = 0.0) -> int | None:
+        return self._take(self.actions, timeout)
+
+    def take_state(self, timeout: float = 0.0) -> T | None:
+        return self._take(self.states, timeout)
+
+    def stats(self) -> dict[str, Any]:
+        with self._changed:
+            return {"actions": self.actions.stats(), "states": self.states.stats()}
+
+    def _post(self, slot: Slot[Any], message: Any) -> None:
+        with self._changed:
+            slot.post(message)
+            self._changed.notify_all()
+
+    def _take(self, slot: Slot[Any], timeout: float) -> Any | None:
+        with self._changed:
+            self.num_waiters += 1
+            try:
+                if not self._changed.wait_for(lambda: len(slot) > 0, timeout):
+                    return None
+                return slot.take()
+            finally:
+                self.num_waiters -= 1
+
+
+class MailboxRegistry(Generic[M]):
+    """Thread-safe map from session ids to their mailbox, created on first use.
+
+    At most `max_sessions` mailboxes are kept: the least recently used one that no
+    request waits on is evicted to make room, so memory stays constant however many
+    players come and go. When every mailbox is waited on, new sessions are refused
+    with `SessionLimitError`. `mailbox_factory` builds a mailbox from the slot
+    capacity, `Mailbox` by default.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1,
+        max_sessions: int = MAX_SESSIONS,
+        mailbox_factory: Callable[[int], M] = Mailbox,  # type: ignore[assignment]
+    ) -> None:
+        self.capacity = capacity
+        self.max_sessions = max_sessions
+        self.mailbox_factory = mailbox_factory
+        self.num_evicted = 0
+        self.num_rejected = 0
+        self._mailboxes: OrderedDict[str, M] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._mailboxes)
+
+    def get(self, session_id: str | None) -> M:
+        session_id = session_id or DEFAULT_SESSION
+        with self._lock:
+            mailbox = self._mailboxes.get(session_id)
+            if mailbox is not None:
+                self._mailboxes.move_to_end(session_id)
+                return mailbox
+
+            if len(self._mailboxes) >= self.max_sessions:
+                self._evict_idle()
+            mailbox = self.mailbox_factory(self.capacity)
+            self._mailboxes[session_id] = mailbox
+            return mailbox
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            mailboxes = list(self._mailboxes.items())
+            num_evicted, num_rejected = self.num_evicted, self.num_rejected
+
+        return {
+            "num_sessions": len(mailboxes),
+            "num_evicted": num_evicted,
+            "num_rejected": num_rejected,
+            "sessions": {
+                session_id: mailbox.stats() for session_id, mailbox in mailboxes
+            },
+        }
+
+    def counters(self) -> dict[str, int]:
+        """Totals of `stats` over all sessions, e.g. `states_dropped`."""
+        stats = self.stats()
+        counters = {
+            "sessions": stats["num_sessions"],
+            "evicted": stats["num_evicted"],
+            "rejected": stats["num_rejected"],
+        }
+        for session_stats in stats["sessions"].values():
+            for slot, slot_stats in session_stats.items():
+                for key, value in slot_stats.items():
+                    name = f"{slot}_{key}"
+                    counters[name] = counters.get(name, 0) + value
+        return counters
+
+    def _evict_idle(self) -> None:
+        for session_id, mailbox in self._mailboxes.items():
+            if mailbox.num_waiters == 0:
+                del self._mailboxes[session_id]
+                self.num_evicted += 1
+                return
+
+        self.num_rejected += 1
+        raise SessionLimitError(
+            f"All {self.max_sessions} sessions are waited on, try again later."
+        )
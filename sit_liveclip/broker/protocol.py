@@ -0,0 +1,87 @@
+"""Route rules shared by the Flask broker of `server.py` and the asyncio one."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Union
+
+import time
+
+from sit_liveclip.core import wire
+from sit_liveclip.utils.timing import TIMERS
+
+
+if TYPE_CHECKING:
+    from sit_liveclip.broker.mailbox import Mailbox
+
+
+StateType = Union[dict[str, Any], bytes]
+
+STEP_TIMEOUT = 60
+MAX_POLL_TIMEOUT = 60
+
+
+def preprocess_player_state(state: Any) -> dict[str, Any]:
+    return {"state": state}
+
+
+def wait_for_state(
+    mailbox: Mailbox[StateType],
+    timeout: float,
+) -> tuple[StateType, float] | None:
+    """Take the next state of `mailbox` and the seconds waited for it."""
+    start = time.perf_counter()
+    return timed_state(mailbox.take_state(timeout), start)
+
+
+def timed_state(state: StateType | None, start: float) -> tuple[StateType, float] | None:
+    """Pair a state taken since `start` with its wait, added to `broker/state_wait`."""
+    if state is None:
+        return None
+
+    wait_time = time.perf_counter() - start
+    if TIMERS.enabled:
+        TIMERS.add("broker/state_wait", wait_time)
+    return state, wait_time
+
+
+def binary_state(state: StateType) -> bytes:
+    """Body of a state response in the binary format."""
+    return state if isinstance(state, bytes) else wire.encode_state(state["state"])
+
+
+def json_state(state: StateType, wait_time: float) -> dict[str, Any]:
+    """Body of a state response in JSON."""
+    if isinstance(state, bytes):
+        state = preprocess_player_state(wire.state_to_json(state))
+    return {**state, "wait_time": wait_time}
+
+
+def prefers_binary(accept: str) -> bool:
+    """Whether the `Accept` header ranks the binary format above JSON.
+
+    Malformed quality values count as 1.
+
+    >>> prefers_binary("application/x-liveclip-state, application/json;q=0.9")
+    True
+    >>> prefers_binary("application/x-liveclip-state;q=high, application/json")
+    False
+    """
+    quality = {}
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        quality[media_type] = 1.0
+        for param in params:
+            if param.startswith("q="):
+                quality[media_type] = _parse_quality(param[2:])
+
+    wildcard = max(quality.get("*/*", 0.0), quality.get("application/*", 0.0))
+    return quality.get(wire.STATE_MEDIA_TYPE, wildcard) > quality.get(
+        wire.JSON_MEDIA_TYPE,
+        wildcard,
+    )
+
+
+def _parse_quality(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 1.0
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import os
+import threading
+
+import torch
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from pathlib import Path
+
+
+CHECKPOINT_FILE = "checkpoint.pth"
+
+
+class Checkpoint(NamedTuple):
+    epoch: int
+    env_step: int
+    gradient_step: int
+    policy: dict[str, Any]  # state dict of the policy
+    optim: dict[str, Any]  # state dict of its optimizer
+
+
+def load_checkpoint(checkpoint_file: Path) -> Checkpoint:
+    """Load a checkpoint on the CPU, `load_state_dict` moves it to the right device."""
+    return Checkpoint(**torch.load(checkpoint_file, map_location="cpu"))
+
+
+class CheckpointWriter:
+    """Write training checkpoints to `out_file` from a background thread.
+
+    `save` copies the state dicts to the CPU, which is quick, and returns while the
+    copy is serialized and written. A checkpoint is written to a temporary file
+    then renamed, so `out_file` always holds a complete checkpoint. When the next
+    checkpoint comes before the previous one is written, only the latest is kept.
+    """
+
+    def __init__(self, out_file: Path) -> None:
+        self.out_file = out_file
+        self.num_written = 0
+        self.num_skipped = 0
+
+        self._pending: Checkpoint | None = None
+        self._closing = False
+        self._error: Exception | None = None
+        self._changed = threading.Condition()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        self._raise_error()
+        snapshot = _copy_to_cpu(checkpoint)
+        with self._changed:
+            if self._pending is not None:
+                self.num_skipped += 1
+            self._pending = snapshot
+            self._changed.notify()
+
+    def close(self) -> None:
+        """Write the pending checkpoint, if any, and stop the background thread."""
+        with self._changed:
+            self._closing = True
+            self._changed.notify()
+        self.thread.join()
+        self._raise_error()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._pending is not None or self._closing)
+                checkpoint, self._pending = self._pending, None
+            if checkpoint is None:
+                return
+
+            try:
+                self._write(checkpoint)
+            except Exception as err:  # pylint: disable=broad-except
+                self._error = err
+                return
+
+    def _write(self, checkpoint: Checkpoint) -> None:
+        tmp_file = self.out_file.with_name(f"{self.out_file.name}.tmp")
+        torch.save(checkpoint._asdict(), tmp_file)
+        os.replace(tmp_file, self.out_file)
+        self.num_written += 1
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Could not write {self.out_file}.") from self._error
+
+
+def _copy_to_cpu(value: Any) -> Any:
+    """Copy the tensors of nested state dicts, so training can go on modifying them."""
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, Checkpoint):
+        return Checkpoint(*(_copy_to_cpu(item) for item in value))
+    if isinstance(value, dict):
+        copied = type(value)((key, _copy_to_cpu(item)) for key, item in value.items())
+        if hasattr(value, "_metadata"):  # module versions of `state_dict`
+            copied._metadata = value._metadata  # pylint: disable=protected-access
+        return copied
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy_to_cpu(item) for item in value)
+    return value
@@ -1,11 +1,50 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import os
+import time
 import logging
 from pathlib import Path
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
+
+from sit_liveclip import __version__
+from sit_liveclip.utils import TIMERS, console
+from sit_liveclip.config import Config, load_config, override_config, parse_overrides
+
+
+# Subcommands import what they need when they run, so that `--help`, `--version`
+# and argument errors do not wait for torch, tianshou and gym to load.
+# pylint: disable=import-outside-toplevel
+
+
+if TYPE_CHECKING:
+    from typing import Callable, Sequence
+
+    from argparse import Namespace
+
+    import gym
+
+    from tianshou.env import BaseVectorEnv
 
-from sit_liveclip import experiment, __version__
-from sit_liveclip.config import Config
-from sit_liveclip.core.env import LiveClipEnv, DummyLiveClipEnv
-from sit_liveclip.core.player_connection import PlayerConnection
+    from sit_liveclip.core.env import BaseLiveClipEnv
+    from sit_liveclip.core.observation import ObservationLayout
+
+
+ENVS = ("dummy", "sim", "live", "replay")
+ACTOR_ENVS = ("dummy", "sim", "live")
+
+# argument of the main parser -> config field it overrides, when given
+_CONFIG_FLAGS = {
+    "num_players": "num_players",
+    "legacy_protocol": "player_conn_legacy_protocol",
+    "flat_observation": "flat_observation",
+    "timing": "timing",
+    "episodes": "episode_per_test",
+    "num_threads": "serving_num_threads",
+    "bandwidth_traces": "sim_bandwidth_traces",
+    "staying_time_traces": "sim_staying_time_traces",
+}
 
 
 def main() -> None:
@@ -15,27 +54,482 @@ def main() -> None:
     logging.basicConfig(filename=f"{args.command}.log", level=logging.DEBUG)
     logging.getLogger("numba").setLevel(logging.WARNING)
 
-    config = Config()
+    # invalid configs, recordings and combinations of flags are usage errors
+    try:
+        args.func(args)
+    except (ArgumentTypeError, ValueError) as err:
+        parser.error(str(err))
+
+
+def _configure(args: Namespace) -> Config:
+    """Config of `--config`, overridden by the flags then by `-s`, timers enabled."""
+    config = Config() if args.config_file is None else load_config(args.config_file)
+
+    flags = {}
+    for arg, field in _CONFIG_FLAGS.items():
+        value = getattr(args, arg, None)
+        if value is not None and value is not False:  # `store_true` flags not given
+            flags[field] = str(value) if isinstance(value, Path) else value
+    config = override_config(config, flags)
+    config = override_config(config, parse_overrides(args.overrides))
+
+    TIMERS.enabled = config.timing
+    return config
+
+
+def _require_env(args: Namespace, envs: Sequence[str] = ENVS, what: str = "") -> None:
+    """Raise a usage error unless `-e/--env` is one of the `envs` that `what` run on."""
+    if args.env is None:
+        raise ArgumentTypeError("the following arguments are required: -e/--env")
+    if args.env not in envs:
+        names = ", ".join(f"'{env}'" for env in envs[:-1])
+        raise ArgumentTypeError(f"{what} run on the {names} or '{envs[-1]}' environment")
 
-    env = (
-        DummyLiveClipEnv(
-            config.history_size,
-            config.sliding_window_size,
+
+def _train(args: Namespace) -> None:
+    from sit_liveclip import experiment
+
+    config = _configure(args)
+    _require_env(args)
+    if args.resume and args.logdir is None:
+        raise ArgumentTypeError("--resume requires the --logdir of the run to resume")
+    if args.num_actors is not None or args.listen is not None:
+        _require_env(args, ACTOR_ENVS, "actors")
+        _train_actor_learner(args, config)
+        return
+
+    env = _build_env(args, config)
+    experiment.train(env, args.logdir, config, resume=args.resume)
+    _print_deadline_stats(env, args, config)
+
+
+def _evaluate(args: Namespace) -> None:
+    from sit_liveclip import experiment
+
+    config = _configure(args)
+    _require_env(args)
+
+    env = _build_env(args, config)
+    experiment.evaluate(env, args.model, config, out_file=args.output)
+    _print_deadline_stats(env, args, config)
+
+
+def _build_env(args: Namespace, config: Config) -> gym.Env | BaseVectorEnv:
+    from sit_liveclip import experiment
+    from sit_liveclip.core.reward import RewardWeights
+    from sit_liveclip.core.deadline import DeadlinePolicy
+    from sit_liveclip.core.vector_env import (
+        build_player_specs,
+        make_live_vector_env,
+        make_replay_vector_env,
+    )
+
+    if args.env in ("dummy", "sim"):
+        return experiment.make_local_env(args.env, config)
+
+    if args.env == "replay":
+        if args.recording_dir is None:
+            raise ValueError("Replaying requires a recording, see --recording.")
+        return make_replay_vector_env(
+            args.recording_dir,
             config.segment_size,
+            flat_observation=config.flat_observation,
         )
-        if args.env == "dummy"
-        else LiveClipEnv(
-            player_conn=PlayerConnection(base_url=config.player_conn_base_url),
+
+    return make_live_vector_env(
+        players=build_player_specs(
+            base_urls=args.player_urls or [config.player_conn_base_url],
+            num_players=config.num_players,
+            legacy_protocol=config.player_conn_legacy_protocol,
+        ),
+        history_size=config.history_size,
+        sliding_window_size=config.sliding_window_size,
+        segment_size=config.segment_size,
+        flat_observation=config.flat_observation,
+        record_dir=args.record_dir,
+        reward_weights=RewardWeights.from_config(config),
+        deadline=DeadlinePolicy.from_config(config),
+    )
+
+
+def _print_deadline_stats(
+    env: gym.Env | BaseVectorEnv,
+    args: Namespace,
+    config: Config,
+) -> None:
+    from sit_liveclip.core.deadline import deadline_rows
+
+    if args.env != "live" or config.decision_deadline is None:
+        return
+
+    # live environments are always vector ones
+    stats = env.get_env_attr("deadline_stats")  # type: ignore[union-attr]
+    columns, rows = deadline_rows(stats)
+    console.print_table(
+        f"Decisions with a {config.decision_deadline}s deadline",
+        columns,
+        rows,
+    )
+
+
+def _train_actor_learner(args: Namespace, config: Config) -> None:
+    from sit_liveclip import experiment
+
+    env_fns, num_envs = _build_actor_env_fns(args, config, args.num_actors or 0)
+    experiment.train_actor_learner(
+        env_fns,
+        num_envs,
+        args.logdir,
+        config,
+        resume=args.resume,
+        listen=args.listen,
+        authkey=None if args.authkey is None else args.authkey.encode(),
+    )
+
+
+def _run_remote_actor(args: Namespace) -> None:
+    from sit_liveclip import experiment
+
+    config = _configure(args)
+    _require_env(args, ACTOR_ENVS, "actors")
+    env_fns, _ = _build_actor_env_fns(args, config, 1)
+    console.print("Collecting rollouts for the learner at", args.connect)
+    num_rollouts = experiment.run_remote_actor(
+        env_fns[0],
+        args.connect,
+        config,
+        authkey=None if args.authkey is None else args.authkey.encode(),
+    )
+    console.print("The learner stopped after", num_rollouts, "rollouts")
+
+
+def _build_actor_env_fns(
+    args: Namespace, config: Config, num_actors: int
+) -> tuple[list[Callable[[], gym.Env | BaseVectorEnv]], int]:
+    """Env builders of `num_actors` actors, and the number of envs of each actor.
+
+    Live players are split evenly over the actors. Without local actors, the number
+    of envs is the one a single actor would have.
+    """
+    from functools import partial
+
+    from sit_liveclip import experiment
+    from sit_liveclip.core.reward import RewardWeights
+    from sit_liveclip.core.deadline import DeadlinePolicy
+    from sit_liveclip.core.vector_env import build_player_specs, make_live_vector_env
+
+    config = config._replace(flat_observation=True)
+    if args.env in ("dummy", "sim"):
+        num_envs = config.sim_num_sessions if args.env == "sim" else 1
+        return [
+            partial(experiment.make_local_env, args.env, config)
+        ] * num_actors, num_envs
+
+    players = build_player_specs(
+        base_urls=args.player_urls or [config.player_conn_base_url],
+        num_players=config.num_players,
+        legacy_protocol=config.player_conn_legacy_protocol,
+    )
+    if len(players) % max(num_actors, 1) != 0:
+        raise ValueError(
+            f"{len(players)} players cannot be split evenly over {num_actors} actors."
+        )
+    env_fns: list[Callable[[], gym.Env | BaseVectorEnv]] = [
+        partial(
+            make_live_vector_env,
+            players=players[actor_id::num_actors],
             history_size=config.history_size,
             sliding_window_size=config.sliding_window_size,
             segment_size=config.segment_size,
+            flat_observation=True,
+            record_dir=(
+                None if args.record_dir is None else args.record_dir / f"actor-{actor_id}"
+            ),
+            reward_weights=RewardWeights.from_config(config),
+            deadline=DeadlinePolicy.from_config(config),
         )
+        for actor_id in range(num_actors)
+    ]
+    return env_fns, len(players) // max(num_actors, 1)
+
+
+def _pack_traces(args: Namespace) -> None:
+    """Pack the traces of `.npy`, `.pkl` or `.json` files into one trace store."""
+    from sit_liveclip.utils.serializer import deserialize
+    from sit_liveclip.utils.trace_store import pack_traces
+
+    num_traces = pack_traces(
+        args.output,
+        (trace for input_file in args.inputs for trace in deserialize(input_file)),
+    )
+    console.print("Packed", num_traces, "traces into", args.output)
+
+
+def _export(args: Namespace) -> None:
+    """Export the actor of a trained policy to TorchScript."""
+    from sit_liveclip import experiment
+    from sit_liveclip.serving import quantize_int8, export_decision_model
+
+    config = _configure(args)
+    actor = experiment.load_actor(_build_spec_env(config), args.model, config)
+    if args.quantize:
+        actor = quantize_int8(actor)
+    export_decision_model(actor, _get_layout(config), args.output)
+    console.print("Exported the actor of", args.model, "to", args.output)
+
+
+def _quantize_report(args: Namespace) -> None:
+    """Compare the int8 actors with the fp32 one on recorded observations."""
+    import numpy as np
+
+    from sit_liveclip import experiment
+    from sit_liveclip.serving import (
+        DecisionModel,
+        report_rows,
+        quantize_int8,
+        compare_models,
+        set_num_threads,
     )
+    from sit_liveclip.core.recorder import Recording
 
-    if args.command == "train":
-        experiment.train(env, args.logdir, config)
-    elif args.command == "eval":
-        experiment.evaluate(env, args.model, config)
+    config = _configure(args)
+    set_num_threads(config.serving_num_threads)
+    actor = experiment.load_actor(_build_spec_env(config), args.model, config)
+
+    recordings = Recording.find(args.recording_dir)
+    if len(recordings) == 0:
+        raise ValueError(f"No recording found in `{args.recording_dir}`.")
+    observations = np.concatenate(
+        [Recording(recording).columns["obs"] for recording in recordings],
+    )
+
+    reports = compare_models(
+        DecisionModel(actor).eval(),
+        {
+            "int8 (MLP)": DecisionModel(quantize_int8(actor, include_preprocess=False)),
+            "int8 (MLP + preprocess)": DecisionModel(quantize_int8(actor)),
+        },
+        observations,
+    )
+    columns, rows = report_rows(reports)
+    console.print_table(f"{len(observations)} recorded observations", columns, rows)
+
+
+def _distill(args: Namespace) -> None:
+    """Fit a decision tree to the actions of a trained policy on recorded observations."""
+    import numpy as np
+
+    from sit_liveclip import experiment
+    from sit_liveclip.serving import (
+        DecisionModel,
+        save_tree,
+        distill_tree,
+        fidelity_rows,
+        fidelity_report,
+    )
+    from sit_liveclip.core.recorder import Recording
+
+    config = _configure(args)
+    if not 0 <= args.holdout < 1:
+        raise ValueError(f"--holdout should be in [0, 1), got {args.holdout}.")
+    recordings = Recording.find(args.recording_dir)
+    if len(recordings) == 0:
+        raise ValueError(f"No recording found in `{args.recording_dir}`.")
+    observations = np.concatenate(
+        [Recording(recording).columns["obs"] for recording in recordings],
+    )
+    is_held_out = np.random.default_rng(0).random(len(observations)) < args.holdout
+
+    actor = experiment.load_actor(_build_spec_env(config), args.model, config)
+    model = DecisionModel(actor).eval()
+    tree = distill_tree(
+        model,
+        observations[~is_held_out],
+        config.history_size,
+        config.sliding_window_size,
+        max_depth=args.max_depth,
+        min_samples_leaf=args.min_samples_leaf,
+    )
+    save_tree(tree, args.output)
+
+    splits = {"distilled on": observations[~is_held_out]}
+    if is_held_out.any():
+        splits["held out"] = observations[is_held_out]
+    columns, rows = fidelity_rows(fidelity_report(tree, model, splits))
+    console.print_table(
+        f"Tree of depth {tree.depth} with {len(tree.left)} nodes",
+        columns,
+        rows,
+    )
+    console.print(
+        "Saved the tree to",
+        args.output,
+        f"({args.output.stat().st_size / 1024:.1f} KiB)",
+    )
+
+
+def _offline_eval(args: Namespace) -> None:
+    """Score a trained policy on recorded sessions, without any player."""
+    from sit_liveclip import experiment
+    from sit_liveclip.offline import estimate_rows, evaluate_offline
+    from sit_liveclip.serving import DecisionModel, set_num_threads
+    from sit_liveclip.core.recorder import Recording
+
+    config = _configure(args)
+    set_num_threads(config.serving_num_threads or os.cpu_count())
+    recordings = Recording.find(args.recording_dir)
+    if len(recordings) == 0:
+        raise ValueError(f"No recording found in `{args.recording_dir}`.")
+
+    spec_env = _build_spec_env(config)
+    model = DecisionModel(experiment.load_actor(spec_env, args.model, config)).eval()
+    behavior_model = None
+    if args.behavior_model is not None:
+        behavior_actor = experiment.load_actor(spec_env, args.behavior_model, config)
+        behavior_model = DecisionModel(behavior_actor).eval()
+
+    estimate = evaluate_offline(
+        model,
+        recordings,
+        behavior_model=behavior_model,
+        greedy=not args.stochastic,
+        chunk_size=args.chunk_size,
+    )
+    columns, rows = estimate_rows(estimate)
+    console.print_table(f"{estimate.num_decisions} recorded decisions", columns, rows)
+    console.print(f"Agreement with the logged actions: {estimate.agreement:.2%}")
+    console.print(
+        f"Effective sample size: {estimate.effective_sample_size:.0f}",
+        f"({estimate.effective_sample_size / estimate.num_decisions:.2%})",
+    )
+
+
+def _relabel(args: Namespace) -> None:
+    """Score the transitions of every recording with the reward weights of `config`."""
+    from sit_liveclip.core.reward import RewardWeights
+    from sit_liveclip.core.recorder import Recording, relabel_recording
+    from sit_liveclip.utils.serializer import deserialize
+
+    config = _configure(args)
+    recordings = Recording.find(args.recording_dir)
+    if len(recordings) == 0:
+        raise ValueError(f"No recording found in `{args.recording_dir}`.")
+    weights = RewardWeights.from_config(config)
+
+    rows = []
+    start = time.perf_counter()
+    for recording in recordings:
+        num_rows = relabel_recording(
+            recording,
+            recording / args.out_name,
+            config.segment_size,
+            weights,
+            chunk_size=args.chunk_size,
+        )
+        recorded = Recording(recording).columns["reward"]
+        relabeled = deserialize(recording / args.out_name, mmap_mode="r")
+        rows.append(
+            [
+                str(recording),
+                str(num_rows),
+                f"{recorded.mean():.4f}",
+                f"{relabeled.mean():.4f}",
+            ],
+        )
+    duration = time.perf_counter() - start
+
+    columns = ["recording", "transitions", "recorded reward", "relabeled reward"]
+    console.print_table(f"Relabeled in {duration:.2f}s with {weights}", columns, rows)
+
+
+def _sweep(args: Namespace) -> None:
+    """Train one policy per combination of the `--grid` values, on every core."""
+    from sit_liveclip.sweep import run_sweep, sweep_rows, expand_grid, sample_grid
+
+    config = _configure(args)
+    _require_env(args, ("dummy", "sim"), "sweeps")
+    space = parse_overrides(args.grid)
+    if args.num_samples is None:
+        variants = expand_grid(space)
+    else:
+        variants = sample_grid(space, args.num_samples, seed=args.seed)
+
+    runs = run_sweep(
+        args.env,
+        config,
+        variants,
+        args.out_dir,
+        max_workers=args.num_workers,
+        threads_per_run=args.threads_per_run,
+    )
+    columns, rows = sweep_rows(runs)
+    console.print_table(f"{len(runs)} runs on '{args.env}'", columns, rows)
+    console.print("Saved the summary to", args.out_dir / "summary.jsonl")
+
+
+def _serve(args: Namespace) -> None:
+    from sit_liveclip import experiment
+    from sit_liveclip.serving import (
+        MicroBatcher,
+        DecisionModel,
+        app,
+        quantize_int8,
+        set_num_threads,
+        load_decision_model,
+    )
+
+    config = _configure(args)
+    if args.max_batch_size is not None:
+        config = config._replace(serving_max_batch_size=args.max_batch_size)
+    if args.max_wait_ms is not None:
+        config = config._replace(serving_max_wait=args.max_wait_ms / 1e3)
+    set_num_threads(config.serving_num_threads)
+
+    if args.scripted_model is not None:
+        model = load_decision_model(args.scripted_model)
+    else:
+        actor = experiment.load_actor(_build_spec_env(config), args.model, config)
+        if args.quantize:
+            actor = quantize_int8(actor)
+        model = DecisionModel(actor).eval()
+
+    layout = _get_layout(config)
+    batcher = MicroBatcher(
+        model,
+        layout.size,
+        max_batch_size=config.serving_max_batch_size,
+        max_wait=config.serving_max_wait,
+    )
+    app.run(batcher, layout, host=args.host, port=args.port)
+
+
+def _build_spec_env(config: Config) -> BaseLiveClipEnv:
+    from sit_liveclip.core.env import BaseLiveClipEnv
+
+    return BaseLiveClipEnv(
+        config.history_size,
+        config.sliding_window_size,
+        config.segment_size,
+        flat_observation=True,
+    )
+
+
+def _get_layout(config: Config) -> ObservationLayout:
+    from sit_liveclip.core.observation import get_observation_layout
+
+    return get_observation_layout(config.history_size, config.sliding_window_size)
+
+
+def _parse_address(address: str) -> tuple[str, int]:
+    """Parse a `HOST:PORT` argument.
+
+    >>> _parse_address("127.0.0.1:6000")
+    ('127.0.0.1', 6000)
+    """
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ArgumentTypeError(f"expected HOST:PORT, got '{address}'")
+    return host, int(port)
 
 
 def _build_parser() -> ArgumentParser:
@@ -44,11 +538,108 @@ def _build_parser() -> ArgumentParser:
     parser.add_argument(
         "-e",
         "--env",
-        help="Environment ['dummy', 'live']",
-        choices=["dummy", "live"],
+        help=f"Environment {list(ENVS)}",
+        choices=ENVS,
         dest="env",
         metavar="ENV",
-        required=True,
+        default=None,
+    )
+
+    parser.add_argument(
+        "-n",
+        "--players",
+        help="Number of live players to drive concurrently through one base URL",
+        dest="num_players",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+
+    parser.add_argument(
+        "-u",
+        "--player-url",
+        help="Base URL of a live player, repeat to drive several players",
+        action="append",
+        dest="player_urls",
+        metavar="URL",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--legacy-protocol",
+        help="Use separate /action and /state requests for players without /step",
+        action="store_true",
+        dest="legacy_protocol",
+    )
+
+    parser.add_argument(
+        "--flat-obs",
+        help="Hand observations out as one flat float32 vector instead of a dict",
+        action="store_true",
+        dest="flat_observation",
+    )
+
+    parser.add_argument(
+        "--bandwidth-traces",
+        help="Trace store of bandwidth traces for the simulator",
+        dest="bandwidth_traces",
+        metavar="TRACE_STORE",
+        default=None,
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--staying-time-traces",
+        help="Trace store of user staying time traces for the simulator",
+        dest="staying_time_traces",
+        metavar="TRACE_STORE",
+        default=None,
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--record",
+        help="Record the transitions of live players to this directory",
+        dest="record_dir",
+        metavar="RECORDING_DIR",
+        default=None,
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--recording",
+        help="Recording directory to play back with the 'replay' environment",
+        dest="recording_dir",
+        metavar="RECORDING_DIR",
+        default=None,
+        type=Path,
+    )
+
+    parser.add_argument(
+        "-c",
+        "--config",
+        help="JSON file of config fields, the missing ones keep their default",
+        dest="config_file",
+        metavar="CONFIG_FILE",
+        default=None,
+        type=Path,
+    )
+
+    parser.add_argument(
+        "-s",
+        "--set",
+        help="Override a config field with a JSON value, e.g. -s learning_rate=3e-4",
+        action="append",
+        dest="overrides",
+        metavar="FIELD=VALUE",
+        default=[],
+    )
+
+    parser.add_argument(
+        "--timing",
+        help="Time the player round trips, env steps and policy updates",
+        action="store_true",
+        dest="timing",
     )
 
     parser.add_argument(
@@ -59,9 +650,10 @@ def _build_parser() -> ArgumentParser:
         help="Print version info",
     )
 
-    subparsers = parser.add_subparsers(dest="command")
+    subparsers = parser.add_subparsers(dest="command", required=True)
 
     parser_train = subparsers.add_parser("train", help="Training mode")
+    parser_train.set_defaults(func=_train)
     parser_train.add_argument(
         "--logdir",
         help="Log dir",
@@ -69,8 +661,52 @@ def _build_parser() -> ArgumentParser:
         default=None,
         type=Path,
     )
+    parser_train.add_argument(
+        "--resume",
+        help="Resume training from the last checkpoint in --logdir",
+        action="store_true",
+    )
+    parser_train.add_argument(
+        "--actors",
+        help="Collect rollouts in N actor processes while the policy is updated",
+        dest="num_actors",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+    parser_train.add_argument(
+        "--listen",
+        help="Also train on the rollouts of actors connecting to this address",
+        metavar="HOST:PORT",
+        default=None,
+        type=_parse_address,
+    )
+    parser_train.add_argument(
+        "--authkey",
+        help="Secret that actors connecting to --listen must share",
+        default=None,
+    )
+
+    parser_actor = subparsers.add_parser(
+        "actor",
+        help="Collect rollouts for a learner started with train --listen",
+    )
+    parser_actor.set_defaults(func=_run_remote_actor)
+    parser_actor.add_argument(
+        "--connect",
+        help="Address the learner listens at",
+        metavar="HOST:PORT",
+        required=True,
+        type=_parse_address,
+    )
+    parser_actor.add_argument(
+        "--authkey",
+        help="Secret shared with the learner",
+        default=None,
+    )
 
     parser_eval = subparsers.add_parser("eval", help="Evaluation mode")
+    parser_eval.set_defaults(func=_evaluate)
     parser_eval.add_argument(
         "--model",
         help="Saved model path",
@@ -78,5 +714,317 @@ def _build_parser() -> ArgumentParser:
         required=True,
         type=Path,
     )
+    parser_eval.add_argument(
+        "--episodes",
+        help="Number of episodes, spread over the environments "
+        "(default: episode_per_test)",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+    parser_eval.add_argument(
+        "--output",
+        help="Save the statistics and every episode to a .json or .pkl file",
+        metavar="OUTPUT_FILE",
+        default=None,
+        type=Path,
+    )
+
+    parser_sweep = subparsers.add_parser(
+        "sweep",
+        help="Train and evaluate policies over a grid of config values, in parallel",
+    )
+    parser_sweep.set_defaults(func=_sweep)
+    parser_sweep.add_argument(
+        "--grid",
+        help="Values to sweep for a config field, e.g. --grid batch_size=[64,256]",
+        action="append",
+        required=True,
+        metavar="FIELD=VALUES",
+    )
+    parser_sweep.add_argument(
+        "--samples",
+        help="Run this many random combinations of the grid instead of all of them",
+        dest="num_samples",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+    parser_sweep.add_argument("--seed", default=0, type=int)
+    parser_sweep.add_argument(
+        "--out",
+        help="Directory of the run logs and of the summary",
+        dest="out_dir",
+        metavar="OUT_DIR",
+        default=Path("sweep"),
+        type=Path,
+    )
+    parser_sweep.add_argument(
+        "--workers",
+        help="Number of concurrent runs, cores / threads per run by default",
+        dest="num_workers",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+    parser_sweep.add_argument(
+        "--threads-per-run",
+        help="Torch threads of each run",
+        dest="threads_per_run",
+        metavar="N",
+        default=1,
+        type=int,
+    )
+
+    parser_pack = subparsers.add_parser(
+        "pack-traces",
+        help="Pack bandwidth or user staying time traces into a trace store",
+    )
+    parser_pack.set_defaults(func=_pack_traces)
+    parser_pack.add_argument(
+        "--input",
+        help="Trace files, each holding a list of 1-D traces",
+        metavar="TRACE_FILE",
+        dest="inputs",
+        nargs="+",
+        required=True,
+        type=Path,
+    )
+    parser_pack.add_argument(
+        "--output",
+        help="Trace store file",
+        metavar="OUT_FILE",
+        required=True,
+        type=Path,
+    )
+
+    parser_export = subparsers.add_parser(
+        "export",
+        help="Export the actor of a trained policy to TorchScript for serving",
+    )
+    parser_export.set_defaults(func=_export)
+    parser_export.add_argument(
+        "--model",
+        help="Saved model path",
+        metavar="MODEL_PATH",
+        required=True,
+        type=Path,
+    )
+    parser_export.add_argument(
+        "--output",
+        help="TorchScript file",
+        metavar="OUT_FILE",
+        required=True,
+        type=Path,
+    )
+    parser_export.add_argument(
+        "--quantize",
+        help="Quantize the actor to int8 for CPU inference",
+        action="store_true",
+    )
+
+    parser_serve = subparsers.add_parser(
+        "serve",
+        help="Serve batched decisions of a trained actor over HTTP and WebSockets",
+    )
+    parser_serve.set_defaults(func=_serve)
+    parser_serve_model = parser_serve.add_mutually_exclusive_group(required=True)
+    parser_serve_model.add_argument(
+        "--model",
+        help="Saved model path",
+        metavar="MODEL_PATH",
+        type=Path,
+    )
+    parser_serve_model.add_argument(
+        "--scripted-model",
+        help="TorchScript file written by the export command",
+        metavar="SCRIPTED_MODEL_PATH",
+        type=Path,
+    )
+    parser_serve.add_argument(
+        "--max-batch",
+        help="Largest number of decisions computed in one model call",
+        dest="max_batch_size",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+    parser_serve.add_argument(
+        "--max-wait-ms",
+        help="Longest time a decision waits for its batch to fill up",
+        metavar="MS",
+        default=None,
+        type=float,
+    )
+    parser_serve.add_argument(
+        "--quantize",
+        help="Quantize the actor of --model to int8 for CPU inference",
+        action="store_true",
+    )
+    parser_serve.add_argument(
+        "--threads",
+        help="Number of torch intra-op threads",
+        dest="num_threads",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--port", default=1235, type=int)
+
+    parser_quantize = subparsers.add_parser(
+        "quantize-report",
+        help="Compare int8 and fp32 actors on recorded observations",
+    )
+    parser_quantize.set_defaults(func=_quantize_report)
+    parser_quantize.add_argument(
+        "--model",
+        help="Saved model path",
+        metavar="MODEL_PATH",
+        required=True,
+        type=Path,
+    )
+    parser_quantize.add_argument(
+        "--recording",
+        help="Recording directory holding the observations",
+        dest="recording_dir",
+        metavar="RECORDING_DIR",
+        required=True,
+        type=Path,
+    )
+    parser_quantize.add_argument(
+        "--threads",
+        help="Number of torch intra-op threads",
+        dest="num_threads",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+
+    parser_distill = subparsers.add_parser(
+        "distill",
+        help="Distill a trained policy into a decision tree that players run locally",
+    )
+    parser_distill.set_defaults(func=_distill)
+    parser_distill.add_argument(
+        "--model",
+        help="Saved model path",
+        metavar="MODEL_PATH",
+        required=True,
+        type=Path,
+    )
+    parser_distill.add_argument(
+        "--recording",
+        help="Recording directory holding the observations to distill on",
+        dest="recording_dir",
+        metavar="RECORDING_DIR",
+        required=True,
+        type=Path,
+    )
+    parser_distill.add_argument(
+        "--output",
+        help="Tree file, .json or compact .npz",
+        metavar="OUT_FILE",
+        required=True,
+        type=Path,
+    )
+    parser_distill.add_argument(
+        "--max-depth",
+        help="Maximum depth of the tree",
+        metavar="N",
+        default=8,
+        type=int,
+    )
+    parser_distill.add_argument(
+        "--min-samples-leaf",
+        help="Minimum number of observations in a leaf",
+        metavar="N",
+        default=20,
+        type=int,
+    )
+    parser_distill.add_argument(
+        "--holdout",
+        help="Fraction of the observations held out for the fidelity report",
+        metavar="FRACTION",
+        default=0.2,
+        type=float,
+    )
+
+    parser_offline = subparsers.add_parser(
+        "offline-eval",
+        help="Estimate the reward of a trained policy from recorded sessions",
+    )
+    parser_offline.set_defaults(func=_offline_eval)
+    parser_offline.add_argument(
+        "--model",
+        help="Saved model path",
+        metavar="MODEL_PATH",
+        required=True,
+        type=Path,
+    )
+    parser_offline.add_argument(
+        "--recording",
+        help="Recording directory, or directory of recordings",
+        dest="recording_dir",
+        metavar="RECORDING_DIR",
+        required=True,
+        type=Path,
+    )
+    parser_offline.add_argument(
+        "--behavior-model",
+        help="Saved model of the policy that played the recorded sessions, "
+        "whose actions are assumed to follow their logged frequencies otherwise",
+        metavar="MODEL_PATH",
+        default=None,
+        type=Path,
+    )
+    parser_offline.add_argument(
+        "--stochastic",
+        help="Evaluate the sampled actions of the policy instead of its greedy ones",
+        action="store_true",
+    )
+    parser_offline.add_argument(
+        "--chunk-size",
+        help="Number of decisions read and scored at once",
+        metavar="N",
+        default=1 << 16,
+        type=int,
+    )
+    parser_offline.add_argument(
+        "--threads",
+        help="Number of torch intra-op threads (default: all cores)",
+        dest="num_threads",
+        metavar="N",
+        default=None,
+        type=int,
+    )
+
+    parser_relabel = subparsers.add_parser(
+        "relabel",
+        help="Score recorded transitions with the reward weights of the config",
+    )
+    parser_relabel.set_defaults(func=_relabel)
+    parser_relabel.add_argument(
+        "--recording",
+        help="Recording directory, or directory of recordings",
+        dest="recording_dir",
+        metavar="RECORDING_DIR",
+        required=True,
+        type=Path,
+    )
+    parser_relabel.add_argument(
+        "--output",
+        help="Name of the reward column written next to each recording",
+        dest="out_name",
+        metavar="FILE_NAME",
+        default="reward-relabeled.npy",
+    )
+    parser_relabel.add_argument(
+        "--chunk-size",
+        help="Number of transitions scored at once",
+        metavar="N",
+        default=1 << 20,
+        type=int,
+    )
 
     return parser
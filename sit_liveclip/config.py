@@ -1,13 +1,43 @@
 from __future__ import annotations
 
-from typing import NamedTuple
+from typing import TYPE_CHECKING, NamedTuple
+
+import json
+
+from sit_liveclip.utils.serializer import deserialize
+
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable
+
+    from pathlib import Path
 
 
 class Config(NamedTuple):
     player_conn_base_url: str = "http://localhost:1996"
+    player_conn_legacy_protocol: bool = False
+    num_players: int = 1
+    sim_num_sessions: int = 100
+    sim_episode_length: int = 200
+    sim_bandwidth_traces: str | None = None
+    sim_staying_time_traces: str | None = None
     history_size: int = 8
     sliding_window_size: int = 3
     segment_size: int = 2
+    flat_observation: bool = False
+    # penalties of the reward, -1 rebuffering for the former reward, see `core.reward`
+    reward_rebuffering_weight: float = 1.0
+    reward_wastage_weight: float = 1.0
+    decision_deadline: float | None = None  # seconds, see `sit_liveclip.core.deadline`
+    deadline_fallback_action: str = "CURRENT"  # name of an `Action`
+    breaker_max_misses: int = 5
+    breaker_cooldown: float = 30.0  # seconds
+    timing: bool = False  # time the hot paths, see `sit_liveclip.utils.timing`
+    serving_max_batch_size: int = 64
+    serving_max_wait: float = 0.002  # seconds
+    serving_num_threads: int | None = (
+        None  # torch intra-op threads, torch default if None
+    )
     conv1d_out: int = 4
     conv1d_kernel_size: int = 3
     actor_hidden_size: list[int] = [128, 128]
@@ -22,3 +52,43 @@ class Config(NamedTuple):
     repeat_per_collect: int = 5
     batch_size: int = 256
     step_per_collect: int = 2000
+    checkpoint_interval: int = 1  # epochs
+    # actor-learner training, see `sit_liveclip.actor_learner`
+    actor_rollout_length: int = 32  # steps of each env
+    actor_num_slots: int = 8  # rollouts in shared memory
+    actor_max_policy_lag: int = 2  # updates, older rollouts are dropped
+
+
+def load_config(config_file: Path) -> Config:
+    """Load the fields of a `.json` file, the missing ones keep their default."""
+    overrides = deserialize(config_file)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"`{config_file}` should hold an object of `Config` fields.")
+    return override_config(Config(), overrides)
+
+
+def override_config(config: Config, overrides: dict[str, Any]) -> Config:
+    unknown = sorted(set(overrides) - set(Config._fields))
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown config fields: {', '.join(unknown)}.")
+    return config._replace(**overrides)
+
+
+def parse_overrides(assignments: Iterable[str]) -> dict[str, Any]:
+    """Parse `field=value` assignments, whose values are JSON or plain strings.
+
+    >>> parse_overrides(["learning_rate=3e-4", "actor_hidden_size=[64, 64]"])
+    {'learning_rate': 0.0003, 'actor_hidden_size': [64, 64]}
+    >>> parse_overrides(["sim_bandwidth_traces=traces.lct"])
+    {'sim_bandwidth_traces': 'traces.lct'}
+    """
+    overrides = {}
+    for assignment in assignments:
+        field, sep, value = assignment.partition("=")
+        if sep == "" or field.strip() == "":
+            raise ValueError(f"Expected `field=value`, got `{assignment}`.")
+        try:
+            overrides[field.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[field.strip()] = value
+    return overrides
@@ -1,15 +1,65 @@
-from sit_liveclip.core.env import LiveClipEnv, DummyLiveClipEnv
-from sit_liveclip.core.action import Action
-from sit_liveclip.core.network import PreprocessNet
-from sit_liveclip.core.observation import Observation
-from sit_liveclip.core.player_connection import PlayerConnection
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from sit_liveclip.utils.lazy import lazy_exports
+
+
+# exported by `__getattr__` on first access, see `sit_liveclip.utils.lazy`
+if TYPE_CHECKING:
+    from sit_liveclip.core.env import (  # noqa: TC004
+        LiveClipEnv,
+        DummyLiveClipEnv,
+        ReplayLiveClipEnv,
+    )
+    from sit_liveclip.core.action import Action  # noqa: TC004
+    from sit_liveclip.core.network import PreprocessNet  # noqa: TC004
+    from sit_liveclip.core.recorder import Recording, TransitionRecorder  # noqa: TC004
+    from sit_liveclip.core.simulator import (  # noqa: TC004
+        PlayerSimulator,
+        SimulatedLiveClipEnv,
+    )
+    from sit_liveclip.core.vector_env import (  # noqa: TC004
+        PlayerSpec,
+        make_live_vector_env,
+        make_replay_vector_env,
+    )
+    from sit_liveclip.core.observation import Observation  # noqa: TC004
+    from sit_liveclip.core.player_connection import PlayerConnection  # noqa: TC004
 
 
 __all__ = [
     "LiveClipEnv",
     "DummyLiveClipEnv",
+    "ReplayLiveClipEnv",
     "Action",
     "PreprocessNet",
+    "PlayerSimulator",
+    "SimulatedLiveClipEnv",
     "Observation",
     "PlayerConnection",
+    "PlayerSpec",
+    "make_live_vector_env",
+    "make_replay_vector_env",
+    "Recording",
+    "TransitionRecorder",
 ]
+
+# the environments and the network pull in gym, tianshou and torch
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "sit_liveclip.core.env": ["LiveClipEnv", "DummyLiveClipEnv", "ReplayLiveClipEnv"],
+        "sit_liveclip.core.action": ["Action"],
+        "sit_liveclip.core.network": ["PreprocessNet"],
+        "sit_liveclip.core.simulator": ["PlayerSimulator", "SimulatedLiveClipEnv"],
+        "sit_liveclip.core.observation": ["Observation"],
+        "sit_liveclip.core.recorder": ["Recording", "TransitionRecorder"],
+        "sit_liveclip.core.vector_env": [
+            "PlayerSpec",
+            "make_live_vector_env",
+            "make_replay_vector_env",
+        ],
+        "sit_liveclip.core.player_connection": ["PlayerConnection"],
+    },
+)
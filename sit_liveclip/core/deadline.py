@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import time
+
+from sit_liveclip.core.action import Action
+
+
+if TYPE_CHECKING:
+    from typing import Callable, Sequence
+
+    from sit_liveclip.config import Config
+
+
+# counters of `LiveClipEnv.deadline_stats`
+DEADLINE_STATS = (
+    "decisions",  # steps taken with a deadline
+    "missed",  # steps that missed it, for any of the reasons below
+    "late_decisions",  # the policy acted after the deadline, the fallback was sent
+    "player_timeouts",  # the player did not answer before the deadline
+    "skipped",  # steps not sent to the player while the circuit was open
+    "circuit_trips",  # times the circuit opened
+    "after_timeout",  # steps answered right after a timeout, maybe by a late state
+)
+
+
+class DeadlinePolicy(NamedTuple):
+    """Latency budget of each decision of a `LiveClipEnv`.
+
+    A step misses its deadline when the policy acts more than `deadline` seconds
+    after it got the previous observation, in which case `fallback_action`
+    is sent instead, or when the player does not answer within `deadline` seconds.
+    Players missing `max_misses` answers in a row are not waited on for `cooldown`
+    seconds, see `CircuitBreaker`.
+    """
+
+    deadline: float  # seconds
+    fallback_action: Action = Action.CURRENT
+    max_misses: int = 5
+    cooldown: float = 30.0  # seconds
+
+    @classmethod
+    def from_config(cls, config: Config) -> DeadlinePolicy | None:
+        """The policy set by `config`, or None to wait on players as long as needed."""
+        if config.decision_deadline is None:
+            return None
+        if config.decision_deadline <= 0:
+            raise ValueError(
+                f"decision_deadline must be positive, got {config.decision_deadline}."
+            )
+        names = [action.name for action in Action if action != Action.RESET]
+        if config.deadline_fallback_action not in names:
+            raise ValueError(
+                f"Unknown deadline_fallback_action `{config.deadline_fallback_action}`,"
+                f" expected one of {names}."
+            )
+        return cls(
+            config.decision_deadline,
+            Action[config.deadline_fallback_action],
+            config.breaker_max_misses,
+            config.breaker_cooldown,
+        )
+
+
+class CircuitBreaker:
+    """Stop waiting on a player that keeps missing its deadlines.
+
+    After `max_misses` consecutive misses the circuit opens, and `allow` refuses
+    requests for `cooldown` seconds. The next request then probes the player: the
+    circuit closes if it is answered in time, and opens again otherwise.
+
+    >>> breaker = CircuitBreaker(max_misses=2, cooldown=60.0)
+    >>> breaker.record(missed=True)
+    >>> breaker.record(missed=True)
+    >>> breaker.is_open, breaker.allow()
+    (True, False)
+    """
+
+    def __init__(
+        self,
+        max_misses: int,
+        cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_misses < 1:
+            raise ValueError(f"max_misses must be positive, got {max_misses}.")
+        self.max_misses = max_misses
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self.num_misses = 0  # consecutive
+        self.num_trips = 0
+        self.opened_at: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether the next request should be sent to the player."""
+        return self.opened_at is None or self.clock() - self.opened_at >= self.cooldown
+
+    def record(self, missed: bool) -> None:
+        if not missed:
+            self.num_misses = 0
+            self.opened_at = None
+            return
+
+        self.num_misses += 1
+        if self.opened_at is not None or self.num_misses >= self.max_misses:
+            # a failed probe restarts the cooldown without counting a new trip
+            self.num_trips += self.opened_at is None
+            self.opened_at = self.clock()
+
+
+def deadline_rows(stats: Sequence[dict[str, int]]) -> tuple[list[str], list[list[str]]]:
+    """Columns and rows of the `deadline_stats` of each env, for `console.print_table`."""
+    columns = ["env", *DEADLINE_STATS, "miss rate"]
+    rows = []
+    for env_id, env_stats in enumerate(stats):
+        rows.append(
+            [
+                str(env_id),
+                *(str(env_stats[name]) for name in DEADLINE_STATS),
+                f"{env_stats['missed'] / max(env_stats['decisions'], 1):.2%}",
+            ],
+        )
+    return columns, rows
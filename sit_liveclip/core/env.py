@@ -2,19 +2,37 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-import copy
+import time
 import random
 
 import gym
+import numpy as np
+import requests
 from gym import spaces
 
 from sit_liveclip.core.action import Action
+from sit_liveclip.core.reward import (
+    DEFAULT_REWARD_WEIGHTS,
+    compute_reward,
+    is_rebuffering,
+)
+from sit_liveclip.utils.timing import TIMERS
+from sit_liveclip.core.deadline import DEADLINE_STATS, CircuitBreaker
+from sit_liveclip.core.recorder import RESET_ACTION, Recording, Transition
+from sit_liveclip.core.observation import OBSERVATION_FIELDS, get_observation_layout
 
 
 if TYPE_CHECKING:
     from typing import Any
 
+    from pathlib import Path
+
     from sit_liveclip.core import Observation, PlayerConnection
+    from sit_liveclip.core.reward import RewardWeights
+    from sit_liveclip.core.deadline import DeadlinePolicy
+    from sit_liveclip.core.recorder import TransitionRecorder
+    from sit_liveclip.core.observation import EnvObservation, ObservationLayout
+    from sit_liveclip.core.player_connection import PlayerResponse
 
 
 class BaseLiveClipEnv(gym.Env):
@@ -24,8 +42,13 @@ class BaseLiveClipEnv(gym.Env):
         history_size: int,
         sliding_window_size: int,
         segment_size: int,
+        flat_observation: bool = False,
+        reward_weights: RewardWeights = DEFAULT_REWARD_WEIGHTS,
     ) -> None:
         self.segment_size = segment_size
+        self.flat_observation = flat_observation
+        self.reward_weights = reward_weights
+        self.layout = get_observation_layout(history_size, sliding_window_size)
         self.state: Observation | None = None
 
         self.observation_space = spaces.Dict(
@@ -81,16 +104,24 @@ class BaseLiveClipEnv(gym.Env):
                 ),
             },
         )
+        if flat_observation:
+            self.observation_space = _flatten_space(self.layout, self.observation_space)
         self.action_space = spaces.Discrete(4)
 
+    def _observe(self, obs: Observation) -> EnvObservation:
+        """Hand out read-only views of `obs`, or its flat vector."""
+        if self.flat_observation:
+            return self.layout.flatten(obs)
+        return self.layout.readonly_views(obs)
+
 
 class DummyLiveClipEnv(BaseLiveClipEnv):
     # pylint: disable=abstract-method
-    def reset(self) -> Observation:
-        obs: Observation = self.observation_space.sample()
+    def reset(self) -> EnvObservation:
+        obs: EnvObservation = self.observation_space.sample()
         return obs
 
-    def step(self, _: Action) -> tuple[Observation, float, bool, dict[str, Any]]:
+    def step(self, _: Action) -> tuple[EnvObservation, float, bool, dict[str, Any]]:
         return (
             self.observation_space.sample(),
             -10 * random.random(),
@@ -100,48 +131,258 @@ class DummyLiveClipEnv(BaseLiveClipEnv):
 
 
 class LiveClipEnv(BaseLiveClipEnv):
-    # pylint: disable=abstract-method
+    """Drive a live player over HTTP.
+
+    By default each step waits on the player as long as it takes. With a
+    `deadline`, a policy acting late has the fallback action sent instead, which is
+    the one recorded, and a player not answering in time is given up on: the step
+    returns the last observation again with a reward of 0 and is not recorded.
+    Steps missing the deadline are marked with `info["deadline_missed"]` and counted
+    in `deadline_stats`. Resets always wait on the player.
+
+    The policy is late when it acts more than `deadline` seconds after it got the
+    observation, at `observed_at` on the `time.monotonic` clock. Vector envs set it
+    to when they handed out the whole batch, see `DecisionClock`.
+
+    A player that timed out may still answer the action it was sent. States carry
+    no step id to match them to their action: the broker drops a late state still
+    pending when the next action is posted, but one posted after it answers the
+    next step. Steps answered right after a timeout are marked with
+    `info["after_timeout"]` and counted in `deadline_stats`.
+    """
+
+    # pylint: disable=abstract-method,too-many-arguments
     def __init__(
         self,
         player_conn: PlayerConnection,
         history_size: int,
         sliding_window_size: int,
         segment_size: int,
+        flat_observation: bool = False,
+        recorder: TransitionRecorder | None = None,
+        reward_weights: RewardWeights = DEFAULT_REWARD_WEIGHTS,
+        deadline: DeadlinePolicy | None = None,
     ) -> None:
-        super().__init__(history_size, sliding_window_size, segment_size)
+        super().__init__(
+            history_size,
+            sliding_window_size,
+            segment_size,
+            flat_observation,
+            reward_weights,
+        )
         self.player_conn = player_conn
+        self.recorder = recorder
 
-    def reset(self) -> Observation:
-        self.player_conn.post_action(Action.RESET)
-        self.state, *_ = self.player_conn.get_state()
-        return copy.deepcopy(self.state)
+        self.deadline = deadline
+        self.breaker = (
+            None
+            if deadline is None
+            else CircuitBreaker(deadline.max_misses, deadline.cooldown)
+        )
+        self.deadline_stats = dict.fromkeys(DEADLINE_STATS, 0)
+        self.observed_at = 0.0  # when the policy got the last observation
+        self.timed_out = False  # whether the last step sent timed out
 
-    def step(self, action: Action) -> tuple[Observation, float, bool, dict[str, Any]]:
+    def reset(self) -> EnvObservation:
+        start = time.perf_counter()
+        res = self.player_conn.step(Action.RESET)
+        self.state = res.obs
+
+        if self.recorder is not None:
+            self.recorder.record(
+                Transition(
+                    obs=self.layout.flatten(self.state),
+                    action=RESET_ACTION,
+                    reward=0.0,
+                    done=False,
+                    wastage_cost=res.wastage_cost,
+                    wait_time=res.wait_time,
+                    step_time=time.perf_counter() - start,
+                ),
+            )
+
+        self.observed_at = time.monotonic()
+        return self._observe(self.state)
+
+    @TIMERS.timed("env/step")
+    def step(self, action: Action) -> tuple[EnvObservation, float, bool, dict[str, Any]]:
         assert self.action_space.contains(int(action))
         assert self.state is not None, "Call reset before using step method."
 
-        self.player_conn.post_action(action)
-        self.state, done, wastage_cost = self.player_conn.get_state()
-        reward = self._compute_reward(self.state, wastage_cost)
+        start = time.perf_counter()
+        info: dict[str, Any] = {}
+        if self.deadline is None:
+            res = self.player_conn.step(action)
+        else:
+            action, res, info = self._step_within_deadline(action, start)
+            if res is None:
+                self.observed_at = time.monotonic()
+                return self._observe(self.state), 0.0, False, info
+        self.state = res.obs
+        reward = self._compute_reward(self.state, res.wastage_cost)
+
+        if self.recorder is not None:
+            self.recorder.record(
+                Transition(
+                    obs=self.layout.flatten(self.state),
+                    action=int(action),
+                    reward=reward,
+                    done=res.done,
+                    wastage_cost=res.wastage_cost,
+                    wait_time=res.wait_time,
+                    step_time=time.perf_counter() - start,
+                ),
+            )
+
+        info.update(
+            wait_time=res.wait_time,
+            wastage_cost=res.wastage_cost,
+            rebuffering=self._is_rebuffering(self.state),
+        )
+        self.observed_at = time.monotonic()
+        return self._observe(self.state), reward, res.done, info
+
+    def _step_within_deadline(
+        self, action: Action, start: float
+    ) -> tuple[Action, PlayerResponse | None, dict[str, Any]]:
+        """Send `action`, or the fallback one if it came late, to a responsive player.
+
+        The policy has `deadline` seconds from the last observation to act, and the
+        player as much to answer. Returns the action to record, the player response,
+        or None if the player was skipped or timed out, and the deadline infos.
+        """
+        assert self.deadline is not None and self.breaker is not None
+        stats = self.deadline_stats
+        stats["decisions"] += 1
+
+        late = time.monotonic() - self.observed_at > self.deadline.deadline
+        if late:
+            stats["late_decisions"] += 1
+            action = self.deadline.fallback_action
+
+        after_timeout = self.timed_out
+        sent = self.breaker.allow()
+        res = self._send_within_deadline(action) if sent else None
+        answered_after_timeout = after_timeout and res is not None
 
-        return copy.deepcopy(self.state), reward, done, {}
+        stats["skipped"] += not sent
+        stats["missed"] += late or res is None
+        stats["after_timeout"] += answered_after_timeout
+        info: dict[str, Any] = {
+            "deadline_missed": late or res is None,
+            "after_timeout": answered_after_timeout,
+            "circuit_open": self.breaker.is_open,
+            "sent_action": int(action) if sent else -1,
+        }
+        if res is None:
+            info.update(
+                wait_time=time.perf_counter() - start,
+                wastage_cost=0.0,
+                rebuffering=False,
+            )
+        return action, res, info
 
+    def _send_within_deadline(self, action: Action) -> PlayerResponse | None:
+        """Send `action` to the player, None if it did not answer within the deadline."""
+        assert self.deadline is not None and self.breaker is not None
+        num_trips = self.breaker.num_trips
+        res = None
+        try:
+            res = self.player_conn.step(action, timeout=self.deadline.deadline)
+        except (requests.Timeout, requests.ConnectionError):
+            self.deadline_stats["player_timeouts"] += 1
+        self.breaker.record(missed=res is None)
+        self.deadline_stats["circuit_trips"] += self.breaker.num_trips - num_trips
+        self.timed_out = res is None
+        return res
+
+    def close(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+        self.player_conn.close()
+
+    @TIMERS.timed("env/reward")
     def _compute_reward(self, obs: Observation, wastage_cost: float) -> float:
+        return float(
+            compute_reward(self._is_rebuffering(obs), wastage_cost, self.reward_weights),
+        )
+
+    def _is_rebuffering(self, obs: Observation) -> bool:
         current_video = 0
+        return bool(
+            is_rebuffering(
+                obs["list_buffered_content"][current_video],
+                obs["play_progress"],
+                obs["list_video_length"][current_video],
+                self.segment_size,
+            ),
+        )
+
+
+class ReplayLiveClipEnv(BaseLiveClipEnv):
+    """Play back a recording of a live session at full speed.
+
+    Episodes are replayed in the recorded order and the actions taken by the agent
+    are ignored: observations, rewards and `done` flags are the recorded ones, so
+    runs over a recording are deterministic. The recorded action is reported as
+    `info["recorded_action"]`.
+    """
+
+    # pylint: disable=abstract-method
+    def __init__(
+        self,
+        recording_dir: Path,
+        segment_size: int,
+        flat_observation: bool = False,
+    ) -> None:
+        self.recording = Recording(recording_dir)
+        super().__init__(
+            self.recording.history_size,
+            self.recording.sliding_window_size,
+            segment_size,
+            flat_observation,
+        )
+        self.reset_rows = self.recording.reset_rows()
+        if len(self.reset_rows) == 0:
+            raise ValueError(f"`{recording_dir}` holds no recorded episode.")
 
-        # QoE
-        no_rebuffering_event = (
-            obs["list_buffered_content"][current_video] - obs["play_progress"]
-            >= self.segment_size
-            or obs["list_buffered_content"][current_video]
-            == obs["list_video_length"][current_video]
+        self.episode = -1
+        self.cursor = 0
+
+    def reset(self) -> EnvObservation:
+        self.episode = (self.episode + 1) % len(self.reset_rows)
+        self.cursor = int(self.reset_rows[self.episode])
+        return self._replay_obs()
+
+    def step(self, _: Action) -> tuple[EnvObservation, float, bool, dict[str, Any]]:
+        columns = self.recording.columns
+        self.cursor += 1
+
+        # the recording may stop in the middle of an episode
+        if self.cursor >= len(self.recording) or columns["action"][self.cursor] < 0:
+            self.cursor -= 1
+            return self._replay_obs(), 0.0, True, {"recorded_action": RESET_ACTION}
+
+        return (
+            self._replay_obs(),
+            float(columns["reward"][self.cursor]),
+            bool(columns["done"][self.cursor]),
+            {"recorded_action": int(columns["action"][self.cursor])},
         )
-        penalty_qoe = 0 if no_rebuffering_event else 1
 
-        # Wastage cost
-        penalty_wastage = wastage_cost
+    def _replay_obs(self) -> EnvObservation:
+        obs = self.recording.columns["obs"][self.cursor]
+        if self.flat_observation:
+            return obs  # type: ignore[no-any-return]
+        return self.layout.views(obs)
 
-        # total penalty
-        total_penalty = -penalty_qoe + penalty_wastage
 
-        return -total_penalty
+def _flatten_space(
+    layout: ObservationLayout, observation_space: spaces.Dict
+) -> spaces.Box:
+    low = np.empty(layout.size, dtype="float32")
+    high = np.empty(layout.size, dtype="float32")
+    for field in OBSERVATION_FIELDS:
+        low[layout.slices[field]] = observation_space[field].low.ravel()
+        high[layout.slices[field]] = observation_space[field].high.ravel()
+    return spaces.Box(low, high, dtype="float32")
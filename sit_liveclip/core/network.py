@@ -2,15 +2,30 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 import torch
 from torch import nn
 
+from sit_liveclip.core.observation import OBSERVATION_FIELDS, get_observation_layout
+
 
 if TYPE_CHECKING:
     from typing import Any, Literal
 
+    from sit_liveclip.types import NDArrayFloat32
+
 
 class PreprocessNet(nn.Module):
+    """Encode observations into the features shared by the actor and the critic.
+
+    In eval mode, both weight-normalized convolutions are folded together with the
+    pass-through features into one `(layout.size, output_dim)` matrix, so a batch
+    is encoded by a single matrix multiplication. The folded matrix is rebuilt
+    whenever the parameters change, and kept apart for `torch.inference_mode`.
+    Calls recorded by autograd use the convolutions, so gradients reach them.
+    """
+
     def __init__(
         self,
         history_size: int,
@@ -21,6 +36,7 @@ class PreprocessNet(nn.Module):
     ):
         super().__init__()
         self.device = device
+        self.layout = get_observation_layout(history_size, sliding_window_size)
         self.output_dim = (
             2 * conv1d_out * (history_size - conv1d_kernel_size + 1)
             + 3
@@ -50,12 +66,20 @@ class PreprocessNet(nn.Module):
             nn.Dropout(0.2),
         )
 
+        # inference mode -> parameter versions, folded weight and bias
+        self._fused: dict[bool, tuple[tuple[int, ...], torch.Tensor, torch.Tensor]] = {}
+        self._obs_buffer: NDArrayFloat32 | None = None
+
     def forward(
         self,
         obs: Any,
         state: Any,
         _: dict[str, Any] | None = None,
     ) -> tuple[torch.Tensor, Any]:
+        if not self.training and not self._records_grad():
+            return self._forward_fused(obs), state
+        if isinstance(obs, (np.ndarray, torch.Tensor)):
+            return self._forward_flat(obs), state
 
         # historical information
         obs_download_speed = torch.as_tensor(  # noqa
@@ -69,17 +93,6 @@ class PreprocessNet(nn.Module):
             dtype=torch.float32,
         )
 
-        batch_size = obs_download_speed.shape[0]
-
-        download_speed_feat = self.download_speed_conv(obs_download_speed).reshape(
-            batch_size,
-            -1,
-        )
-        user_behavior_feat = self.user_behavior_conv(obs_user_staying_time).reshape(
-            batch_size,
-            -1,
-        )
-
         # current playback state
         obs_play_progress = torch.as_tensor(  # noqa
             obs.play_progress,
@@ -105,16 +118,216 @@ class PreprocessNet(nn.Module):
         )
 
         return (
-            torch.cat(
-                (
-                    download_speed_feat,
-                    user_behavior_feat,
-                    obs_play_progress,
-                    obs_current_stay_time,
-                    obs_current_video_length,
-                    obs_buffered_content,
-                ),
-                1,
+            self._encode(
+                obs_download_speed,
+                obs_user_staying_time,
+                obs_play_progress,
+                obs_current_stay_time,
+                obs_current_video_length,
+                obs_buffered_content,
             ),
             state,
         )
+
+    def _forward_flat(self, obs: Any) -> torch.Tensor:
+        """Encode a batch of flat observations with a single tensor conversion."""
+        obs_flat = torch.as_tensor(  # noqa
+            obs,
+            device=self.device,  # type: ignore
+            dtype=torch.float32,
+        )
+        slices = self.layout.slices
+        video_length_start = slices["list_video_length"].start
+        current_video_length = slice(video_length_start, video_length_start + 1)
+
+        return self._encode(
+            obs_flat[:, slices["download_speed"]].unsqueeze(1),
+            obs_flat[:, slices["user_staying_time"]].unsqueeze(1),
+            obs_flat[:, slices["play_progress"]],
+            obs_flat[:, slices["current_staying_time"]],
+            obs_flat[:, current_video_length],
+            obs_flat[:, slices["list_buffered_content"]],
+        )
+
+    def _encode(
+        self,
+        obs_download_speed: torch.Tensor,
+        obs_user_staying_time: torch.Tensor,
+        obs_play_progress: torch.Tensor,
+        obs_current_stay_time: torch.Tensor,
+        obs_current_video_length: torch.Tensor,
+        obs_buffered_content: torch.Tensor,
+    ) -> torch.Tensor:
+        # pylint: disable=too-many-arguments
+        batch_size = obs_download_speed.shape[0]
+
+        download_speed_feat = self.download_speed_conv(obs_download_speed).reshape(
+            batch_size,
+            -1,
+        )
+        user_behavior_feat = self.user_behavior_conv(obs_user_staying_time).reshape(
+            batch_size,
+            -1,
+        )
+
+        return torch.cat(
+            (
+                download_speed_feat,
+                user_behavior_feat,
+                obs_play_progress,
+                obs_current_stay_time,
+                obs_current_video_length,
+                obs_buffered_content,
+            ),
+            1,
+        )
+
+    def fold(self) -> FoldedPreprocessNet:
+        """Freeze the eval-mode encoding into a standalone `nn.Linear` module."""
+        with torch.no_grad():
+            weight, bias = self._fuse()
+        return FoldedPreprocessNet(self, weight, bias)
+
+    def _forward_fused(self, obs: Any) -> torch.Tensor:
+        """Encode a batch with the folded weights, see the class docstring."""
+        weight, bias = self._get_fused_weights()
+        obs_flat = torch.as_tensor(  # noqa
+            obs if isinstance(obs, (np.ndarray, torch.Tensor)) else self._stack(obs),
+            device=self.device,  # type: ignore
+            dtype=torch.float32,
+        )
+        features = torch.addmm(bias, obs_flat, weight)
+        features[:, : self._conv_size].clamp_(min=0)
+        return features
+
+    def _records_grad(self) -> bool:
+        """Whether autograd records this call, which the folded weights do not support."""
+        return (
+            torch.is_grad_enabled()
+            and not torch.jit.is_tracing()
+            and any(param.requires_grad for param in self.parameters())
+        )
+
+    @property
+    def _conv_size(self) -> int:
+        return self.output_dim - 3 - self.layout.sliding_window_size
+
+    def _stack(self, obs: Any) -> NDArrayFloat32:
+        """Copy a batch of dict observations into one reused flat array."""
+        batch_size = len(obs.download_speed)
+        if self._obs_buffer is None or len(self._obs_buffer) < batch_size:
+            self._obs_buffer = np.empty((batch_size, self.layout.size), dtype="float32")
+
+        obs_flat = self._obs_buffer[:batch_size]
+        for field in OBSERVATION_FIELDS:
+            obs_flat[:, self.layout.slices[field]] = obs[field].reshape(batch_size, -1)
+        return obs_flat
+
+    def _get_fused_weights(self) -> tuple[torch.Tensor, torch.Tensor]:
+        versions = tuple(param._version for param in self.parameters())  # noqa
+        # tensors made in inference mode cannot be used by autograd outside of it
+        inference = torch.is_inference_mode_enabled()
+        fused = self._fused.get(inference)
+        if fused is None or fused[0] != versions:
+            with torch.no_grad():
+                fused = (versions, *self._fuse())
+            self._fused[inference] = fused
+        return fused[1], fused[2]
+
+    def _fuse(self) -> tuple[torch.Tensor, torch.Tensor]:
+        """Fold both convolutions and the pass-through features into one matrix.
+
+        A convolution over a history is a matrix product with a banded (Toeplitz)
+        matrix of its kernel, and the pass-through features are a selection of the
+        observation, so the pre-activation features are `obs @ weight + bias`.
+        """
+        slices = self.layout.slices
+        weight = torch.zeros(self.layout.size, self.output_dim)
+        bias = torch.zeros(self.output_dim)
+
+        offset = 0
+        for field, conv_block in (
+            ("download_speed", self.download_speed_conv),
+            ("user_staying_time", self.user_behavior_conv),
+        ):
+            conv = conv_block[0]
+            kernel = _fold_weight_norm(conv)[:, 0, :].cpu()
+            out_channels, kernel_size = kernel.shape
+            out_length = self.layout.history_size - kernel_size + 1
+
+            for channel in range(out_channels):
+                for pos in range(out_length):
+                    start = slices[field].start + pos
+                    stop = start + kernel_size
+                    column = offset + channel * out_length + pos
+                    weight[start:stop, column] = kernel[channel]
+            columns = slice(offset, offset + out_channels * out_length)
+            bias[columns] = conv.bias.detach().cpu().repeat_interleave(out_length)
+            offset += out_channels * out_length
+
+        rows = [
+            slices["play_progress"].start,
+            slices["current_staying_time"].start,
+            slices["list_video_length"].start,
+            *range(
+                slices["list_buffered_content"].start,
+                slices["list_buffered_content"].stop,
+            ),
+        ]
+        for column, row in enumerate(rows, start=offset):
+            weight[row, column] = 1.0
+
+        device = self.device  # type: ignore
+        return weight.to(device), bias.to(device)
+
+
+class FoldedPreprocessNet(nn.Module):
+    """Eval-mode `PreprocessNet` as a single `nn.Linear`, see `PreprocessNet.fold`.
+
+    Being made of standard layers, it can be quantized with
+    `torch.ao.quantization.quantize_dynamic`.
+    """
+
+    def __init__(self, net: PreprocessNet, weight: torch.Tensor, bias: torch.Tensor):
+        super().__init__()
+        self.device = net.device
+        self.layout = net.layout
+        self.output_dim = net.output_dim
+        self.conv_size = net._conv_size  # pylint: disable=protected-access
+
+        self.linear = nn.Linear(self.layout.size, self.output_dim, device=self.device)
+        with torch.no_grad():
+            self.linear.weight.copy_(weight.T)
+            self.linear.bias.copy_(bias)
+
+    def forward(
+        self,
+        obs: Any,
+        state: Any,
+        _: dict[str, Any] | None = None,
+    ) -> tuple[torch.Tensor, Any]:
+        if not isinstance(obs, (np.ndarray, torch.Tensor)):
+            obs = np.concatenate(
+                [obs[field].reshape(len(obs), -1) for field in OBSERVATION_FIELDS],
+                axis=1,
+            )
+        obs_flat = torch.as_tensor(  # noqa
+            obs,
+            device=self.device,  # type: ignore
+            dtype=torch.float32,
+        )
+
+        features = self.linear(obs_flat)
+        features[:, : self.conv_size].clamp_(min=0)
+        return features, state
+
+
+def _fold_weight_norm(conv: nn.Conv1d) -> torch.Tensor:
+    """Plain weight of a convolution, with its weight norm applied once."""
+    if not hasattr(conv, "weight_v"):
+        return conv.weight.detach()
+
+    weight_v = conv.weight_v.detach()
+    weight_g = conv.weight_g.detach()
+    norm = weight_v.norm(dim=tuple(range(1, weight_v.dim())), keepdim=True)
+    return weight_v * (weight_g / norm)
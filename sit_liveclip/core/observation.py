@@ -2,8 +2,14 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, TypedDict
 
+from functools import lru_cache
+
+import numpy as np
+
 
 if TYPE_CHECKING:
+    from typing import Union, TypeAlias
+
     from sit_liveclip.types import NDArrayFloat32
 
 
@@ -22,3 +28,84 @@ class Observation(TypedDict):
     list_buffered_content: NDArrayFloat32  # seconds, Continuous([0, 60])
     list_time_spent_downloading_videos: NDArrayFloat32  # ???
     list_completed_videos: NDArrayFloat32  # ???
+
+
+HISTORY_FIELDS = ("download_speed", "user_staying_time")
+PLAYBACK_FIELDS = ("play_progress", "current_staying_time", "replay_round")
+SLIDING_WINDOW_FIELDS = (
+    "list_video_bitrate",
+    "list_video_length",
+    "list_buffered_content",
+    "list_time_spent_downloading_videos",
+    "list_completed_videos",
+)
+OBSERVATION_FIELDS = HISTORY_FIELDS + PLAYBACK_FIELDS + SLIDING_WINDOW_FIELDS
+
+if TYPE_CHECKING:
+    # either a dict of fields or the flat vector of `ObservationLayout`
+    EnvObservation: TypeAlias = Union[Observation, NDArrayFloat32]
+
+
+class ObservationLayout:
+    """Position of every `Observation` field in one flat float32 vector.
+
+    Fields are laid out in `OBSERVATION_FIELDS` order, so an observation can be
+    stored in a single contiguous buffer and each field read back as a view.
+    """
+
+    def __init__(self, history_size: int, sliding_window_size: int) -> None:
+        self.history_size = history_size
+        self.sliding_window_size = sliding_window_size
+
+        self.shapes: dict[str, tuple[int, ...]] = {
+            **{field: (1, history_size) for field in HISTORY_FIELDS},
+            **{field: (1,) for field in PLAYBACK_FIELDS},
+            **{field: (sliding_window_size,) for field in SLIDING_WINDOW_FIELDS},
+        }
+
+        self.slices: dict[str, slice] = {}
+        offset = 0
+        for field in OBSERVATION_FIELDS:
+            size = self._field_size(field)
+            self.slices[field] = slice(offset, offset + size)
+            offset += size
+        self.size = offset
+
+    def views(self, buffer: NDArrayFloat32) -> Observation:
+        """Split a flat buffer into per-field views, without copying."""
+        obs: Observation = {  # type: ignore[assignment]
+            field: buffer[self.slices[field]].reshape(self.shapes[field])
+            for field in OBSERVATION_FIELDS
+        }
+        return obs
+
+    def readonly_views(self, obs: Observation) -> Observation:
+        """Hand out an observation whose fields cannot be written through."""
+        frozen: Observation = {}  # type: ignore[typeddict-item]
+        for field in OBSERVATION_FIELDS:
+            view = obs[field].view()  # type: ignore[literal-required]
+            view.flags.writeable = False
+            frozen[field] = view  # type: ignore[literal-required]
+        return frozen
+
+    def flatten(self, obs: Observation) -> NDArrayFloat32:
+        """Copy an observation into one contiguous float32 vector."""
+        buffer = np.empty(self.size, dtype="float32")
+        for field in OBSERVATION_FIELDS:
+            values = obs[field]  # type: ignore[literal-required]
+            buffer[self.slices[field]] = values.ravel()
+        return buffer
+
+    def _field_size(self, field: str) -> int:
+        size = 1
+        for dim in self.shapes[field]:
+            size *= dim
+        return size
+
+
+@lru_cache(maxsize=None)
+def get_observation_layout(
+    history_size: int,
+    sliding_window_size: int,
+) -> ObservationLayout:
+    return ObservationLayout(history_size, sliding_window_size)
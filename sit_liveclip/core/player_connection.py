@@ -2,120 +2,188 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, NamedTuple
 
+import time
+from http import HTTPStatus
 from urllib.parse import urljoin
 
-import numpy as np
 import requests
 from requests.adapters import Retry
 from requests.sessions import HTTPAdapter
 
-from sit_liveclip.core.observation import Observation
+from sit_liveclip.core import wire
+from sit_liveclip.utils.timing import TIMERS
 
 
 if TYPE_CHECKING:
     from typing import Any, Literal
 
     from sit_liveclip.core.action import Action
+    from sit_liveclip.core.observation import Observation
 
 
 class PlayerResponse(NamedTuple):
     obs: Observation
     done: bool
     wastage_cost: float
+    wait_time: float = 0.0
 
 
 class PlayerConnection:
-    def __init__(self, base_url: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        session_id: str | None = None,
+        legacy_protocol: bool = False,
+    ) -> None:
         self.base_url = base_url
+        self.session_id = session_id
+        self.legacy_protocol = legacy_protocol
 
-        self.session = requests.Session()
-        self.session.headers.update({"Content-Type": "application/json"})
-
-        adapter = HTTPAdapter(
-            max_retries=Retry(
+        self.session = self._make_session(
+            Retry(
                 total=50,
                 backoff_factor=0.1,
-                status_forcelist=[429, 500, 502, 503, 504, 404],
+                status_forcelist=[429, 500, 502, 503, 504],
             ),
         )
-        self.session.mount("http://", adapter)
+        # requests with a deadline fail fast instead of being retried
+        self.deadline_session = self._make_session(Retry(total=0, read=False))
 
         self.timeout = 10 * 60
+        self.poll_timeout = 30.0
+        self.poll_interval = 0.05
 
     def close(self) -> None:
         self.session.close()
-
-    def get_state(self) -> PlayerResponse:
-        res = self._do_request("get", "/state")
-        data = res.json()
-
-        done = data["status"]
-        wastage_cost = data["wastage_cost"]
-        obs = Observation(
-            download_speed=np.asarray(
-                data["download_speed"],
-                dtype="float32",
-            ).reshape(1, -1),
-            user_staying_time=np.asarray(
-                data["user_staying_time"],
-                dtype="float32",
-            ).reshape(1, -1),
-            #
-            # current playback state of the player
-            play_progress=np.asarray(
-                [data["play_progress"]],
-                dtype="float32",
-            ),
-            current_staying_time=np.asarray(
-                [data["current_staying_time"]],
-                dtype="float32",
-            ),
-            replay_round=np.asarray(
-                [data["replay_round"]],
-                dtype="float32",
-            ),
-            #
-            # videos in the sliding window
-            list_video_bitrate=np.asarray(
-                data["list_video_bitrate"],
-                dtype="float32",
-            ),
-            list_video_length=np.asarray(
-                data["list_video_length"],
-                dtype="float32",
-            ),
-            list_buffered_content=np.asarray(
-                data["list_buffered_content"],
-                dtype="float32",
-            ),
-            list_time_spent_downloading_videos=np.asarray(
-                data["list_time_spent_downloading_videos"],
-                dtype="float32",
-            ),
-            list_completed_videos=np.asarray(
-                data["list_completed_videos"],
-                dtype="float32",
-            ),
+        self.deadline_session.close()
+
+    def step(self, action: Action, timeout: float | None = None) -> PlayerResponse:
+        """Send an action and receive the next state in a single round trip.
+
+        Players that do not serve the `/step` route yet are driven with the
+        `post_action` + `get_state` pair instead. With a `timeout` in seconds, the
+        requests are not retried and `requests.Timeout` is raised once it is spent.
+        """
+        if self.legacy_protocol:
+            start = time.perf_counter()
+            self.post_action(action, timeout=timeout)
+            if timeout is not None:
+                timeout = max(timeout - (time.perf_counter() - start), 0.0)
+            return self.get_state(timeout=timeout)
+
+        start = time.perf_counter()
+        res = self._do_request(
+            "post",
+            "/step",
+            data={"action": _to_player_action(action)},
+            timeout=timeout,
+        )
+        return self._parse_state(res, wait_time=time.perf_counter() - start)
+
+    def get_state(self, timeout: float | None = None) -> PlayerResponse:
+        """Wait for the next player state, for `timeout` seconds at most.
+
+        The player holds the request open until a state is posted or `poll_timeout`
+        seconds pass, in which case it answers 204 and the request is re-issued.
+        Players that answer 404 right away are polled every `poll_interval` seconds.
+        """
+        start = time.perf_counter()
+        deadline = start + (self.timeout if timeout is None else timeout)
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise requests.Timeout(
+                    f"No player state received in {deadline - start}s."
+                )
+            res = self._send_request(
+                "get",
+                "/state",
+                params={"timeout": min(self.poll_timeout, remaining)},
+                timeout=None if timeout is None else remaining,
+            )
+            if res.status_code not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_FOUND):
+                res.raise_for_status()
+                break
+
+            if res.status_code == HTTPStatus.NOT_FOUND:
+                time.sleep(
+                    min(self.poll_interval, max(deadline - time.perf_counter(), 0))
+                )
+
+        return self._parse_state(res, wait_time=time.perf_counter() - start)
+
+    def post_action(self, action: Action, timeout: float | None = None) -> None:
+        self._do_request(
+            "post",
+            "/action",
+            data={"action": _to_player_action(action)},
+            timeout=timeout,
         )
 
-        return PlayerResponse(obs=obs, done=done, wastage_cost=wastage_cost)
-
-    def post_action(self, action: Action) -> None:
-        player_action = int(action) - 1
-        self._do_request("post", "/action", data={"action": player_action})
+    @staticmethod
+    @TIMERS.timed("player/decode")
+    def _parse_state(res: requests.Response, wait_time: float) -> PlayerResponse:
+        if res.headers.get("Content-Type", "").startswith(wire.STATE_MEDIA_TYPE):
+            decoded = wire.decode_state(res.content)
+        else:
+            decoded = wire.decode_state_json(res.json())
+
+        return PlayerResponse(
+            obs=decoded.obs,
+            done=decoded.done,
+            wastage_cost=decoded.wastage_cost,
+            wait_time=wait_time,
+        )
 
     def _do_request(
         self,
         method: Literal["get", "post"],
         route: str,
         data: dict[str, Any] | None = None,
+        timeout: float | None = None,
     ) -> requests.Response:
+        res = self._send_request(method, route, data=data, timeout=timeout)
+        res.raise_for_status()
+        return res
+
+    @TIMERS.timed("player/round_trip")
+    def _send_request(
+        self,
+        method: Literal["get", "post"],
+        route: str,
+        data: dict[str, Any] | None = None,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> requests.Response:
+        """Send a request to the player.
+
+        Without `timeout`, failures are retried for `self.timeout` seconds, otherwise
+        the request is tried once and fails after `timeout` seconds.
+        """
         url = urljoin(self.base_url, route)
-        res = self.session.request(
+        session = self.session if timeout is None else self.deadline_session
+        return session.request(
             method,
             url,
             json=data,
-            timeout=self.timeout,
+            params=params,
+            timeout=self.timeout if timeout is None else timeout,
         )
-        res.raise_for_status()
-        return res
+
+    def _make_session(self, retry: Retry) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(
+            {
+                "Content-Type": wire.JSON_MEDIA_TYPE,
+                "Accept": f"{wire.STATE_MEDIA_TYPE}, {wire.JSON_MEDIA_TYPE};q=0.9",
+            },
+        )
+        if self.session_id is not None:
+            session.headers.update({"X-Session-Id": self.session_id})
+        session.mount("http://", HTTPAdapter(max_retries=retry))
+        return session
+
+
+def _to_player_action(action: Action) -> int:
+    return int(action) - 1
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from sit_liveclip.core.reward import (
+    DEFAULT_REWARD_WEIGHTS,
+    compute_reward,
+    flat_is_rebuffering,
+)
+from sit_liveclip.core.observation import get_observation_layout
+from sit_liveclip.utils.serializer import NpyAppender, serialize, deserialize
+
+
+if TYPE_CHECKING:
+    from sit_liveclip.types import NDArrayInt64, NDArrayFloat32
+    from sit_liveclip.core.reward import RewardWeights
+    from sit_liveclip.core.observation import ObservationLayout
+
+
+RESET_ACTION = -1
+
+
+class Transition(NamedTuple):
+    obs: NDArrayFloat32  # flat observation returned by reset or step
+    action: int  # RESET_ACTION for rows recorded by reset
+    reward: float
+    done: bool
+    wastage_cost: float
+    wait_time: float
+    step_time: float
+
+
+# column name -> dtype, the observation column has one flat observation per row
+RECORDING_COLUMNS = {
+    "obs": "float32",
+    "action": "int64",
+    "reward": "float32",
+    "done": "bool",
+    "wastage_cost": "float32",
+    "wait_time": "float32",
+    "step_time": "float32",
+}
+
+
+class TransitionRecorder:
+    """Stream transitions to an append-only columnar log on disk.
+
+    Every column of `RECORDING_COLUMNS` is an `.npy` file in `out_dir` that grows
+    as transitions arrive, next to a `meta.json` holding the observation layout.
+    Writing happens in a background thread: `record` only enqueues, and drops the
+    transition rather than blocking when `max_pending` transitions are waiting.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        layout: ObservationLayout,
+        flush_every: int = 1000,
+        max_pending: int = 100_000,
+    ) -> None:
+        self.out_dir = out_dir
+        self.flush_every = flush_every
+        self.num_dropped = 0
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        serialize(
+            out_dir / "meta.json",
+            {
+                "history_size": layout.history_size,
+                "sliding_window_size": layout.sliding_window_size,
+            },
+        )
+        self.columns = {
+            name: NpyAppender(
+                out_dir / f"{name}.npy",
+                dtype,
+                row_shape=(layout.size,) if name == "obs" else (),
+            )
+            for name, dtype in RECORDING_COLUMNS.items()
+        }
+
+        self.queue: queue.Queue[Transition | None] = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, transition: Transition) -> None:
+        try:
+            self.queue.put_nowait(transition)
+        except queue.Full:
+            self.num_dropped += 1
+
+    def close(self) -> None:
+        """Write the pending transitions and close the log."""
+        if not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join()
+
+    def _write_loop(self) -> None:
+        closing = False
+        while not closing:
+            pending, closing = self._next_batch()
+            self._write(pending)
+
+        for column in self.columns.values():
+            column.close()
+
+    def _next_batch(self) -> tuple[list[Transition], bool]:
+        """Wait for transitions and take up to `flush_every`, and whether to close."""
+        pending: list[Transition] = []
+        item = self.queue.get()
+        while item is not None:
+            pending.append(item)
+            if len(pending) >= self.flush_every:
+                break
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+        return pending, item is None
+
+    def _write(self, transitions: list[Transition]) -> None:
+        if len(transitions) == 0:
+            return
+
+        for idx, name in enumerate(Transition._fields):
+            self.columns[name].append([transition[idx] for transition in transitions])
+        for column in self.columns.values():
+            column.flush()
+
+
+class Recording:
+    """Read-only, memory-mapped view of a log written by `TransitionRecorder`."""
+
+    def __init__(self, recording_dir: Path) -> None:
+        meta = deserialize(recording_dir / "meta.json")
+        self.history_size: int = meta["history_size"]
+        self.sliding_window_size: int = meta["sliding_window_size"]
+
+        columns = {
+            name: deserialize(recording_dir / f"{name}.npy", mmap_mode="r")
+            for name in RECORDING_COLUMNS
+        }
+        # columns are flushed together, but a crash may leave them uneven
+        self.num_rows = min(len(column) for column in columns.values())
+        self.columns = {name: column[: self.num_rows] for name, column in columns.items()}
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    @staticmethod
+    def find(recording_dir: Path) -> list[Path]:
+        """List the recordings in `recording_dir`, which may hold one per env."""
+        if (recording_dir / "meta.json").exists():
+            return [recording_dir]
+        return sorted(path.parent for path in Path(recording_dir).glob("*/meta.json"))
+
+    def reset_rows(self) -> NDArrayInt64:
+        return np.flatnonzero(self.columns["action"] == RESET_ACTION)
+
+
+def relabel_recording(
+    recording_dir: Path,
+    out_file: Path,
+    segment_size: float,
+    weights: RewardWeights = DEFAULT_REWARD_WEIGHTS,
+    chunk_size: int = 1 << 20,
+) -> int:
+    """Score every transition of a recording with `weights`, into the `.npy` `out_file`.
+
+    The recording is streamed from its memory map `chunk_size` rows at a time, so
+    memory does not grow with its length. Rows recorded by reset get a zero reward,
+    as in the recording. An existing `out_file` is replaced. Returns the number of
+    rows written.
+    """
+    if out_file.resolve() in {
+        (recording_dir / f"{name}.npy").resolve() for name in RECORDING_COLUMNS
+    }:
+        raise ValueError(f"`{out_file}` is a column of the recording being relabeled.")
+    out_file.unlink(missing_ok=True)
+
+    recording = Recording(recording_dir)
+    layout = get_observation_layout(recording.history_size, recording.sliding_window_size)
+    columns = recording.columns
+
+    with NpyAppender(out_file, "float32") as appender:
+        for start in range(0, len(recording), chunk_size):
+            rows = slice(start, start + chunk_size)
+            reward = compute_reward(
+                flat_is_rebuffering(columns["obs"][rows], layout, segment_size),
+                columns["wastage_cost"][rows],
+                weights,
+            )
+            reward[columns["action"][rows] == RESET_ACTION] = 0.0
+            appender.append(reward)
+    return len(recording)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from sit_liveclip.types import NDArrayBool, NDArrayFloat32
+    from sit_liveclip.config import Config
+    from sit_liveclip.core.observation import ObservationLayout
+
+
+class RewardWeights(NamedTuple):
+    """Penalties of a rebuffering event and of a unit of wastage cost.
+
+    The reward is `-(rebuffering * penalty_qoe + wastage * wastage_cost)`, where
+    `penalty_qoe` is 1 on a rebuffering event, so positive weights penalize both.
+    Policies trained with the former reward, `penalty_qoe - wastage_cost`, which
+    rewarded rebuffering events, get it back with `rebuffering=-1`.
+    """
+
+    rebuffering: float = 1.0
+    wastage: float = 1.0
+
+    @classmethod
+    def from_config(cls, config: Config) -> RewardWeights:
+        return cls(config.reward_rebuffering_weight, config.reward_wastage_weight)
+
+
+DEFAULT_REWARD_WEIGHTS = RewardWeights()
+
+
+def is_rebuffering(
+    buffered_content: Any,
+    play_progress: Any,
+    video_length: Any,
+    segment_size: float,
+) -> NDArrayBool:
+    """Whether less than a segment is buffered ahead of the current video.
+
+    Takes the buffered content and length of the current video, as scalars or
+    batches.
+
+    >>> is_rebuffering(np.array([10.0, 3.0, 60.0]), 2.0, 60.0, segment_size=2)
+    array([False,  True, False])
+    """
+    no_rebuffering_event = (
+        np.subtract(buffered_content, play_progress) >= segment_size
+    ) | (np.equal(buffered_content, video_length))
+    return np.logical_not(no_rebuffering_event)
+
+
+def flat_is_rebuffering(
+    obs: NDArrayFloat32,
+    layout: ObservationLayout,
+    segment_size: float,
+) -> NDArrayBool:
+    """`is_rebuffering` over a batch of flat observations laid out by `layout`."""
+    current_video = 0
+    return is_rebuffering(
+        obs[..., layout.slices["list_buffered_content"].start + current_video],
+        obs[..., layout.slices["play_progress"].start],
+        obs[..., layout.slices["list_video_length"].start + current_video],
+        segment_size,
+    )
+
+
+def compute_reward(
+    rebuffering: Any,
+    wastage_cost: Any,
+    weights: RewardWeights = DEFAULT_REWARD_WEIGHTS,
+) -> NDArrayFloat32:
+    """Reward of a batch of steps, from their rebuffering flags and wastage costs."""
+    # QoE
+    penalty_qoe = weights.rebuffering * np.asarray(rebuffering, dtype="float32")
+
+    # Wastage cost
+    penalty_wastage = weights.wastage * np.asarray(wastage_cost, dtype="float32")
+
+    # total penalty
+    total_penalty = penalty_qoe + penalty_wastage
+
+    reward: NDArrayFloat32 = np.negative(total_penalty, dtype="float32")
+    return reward
@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from tianshou.env import BaseVectorEnv
+from tianshou.data import Batch
+
+from sit_liveclip.core.env import BaseLiveClipEnv
+from sit_liveclip.core.action import Action
+from sit_liveclip.core.reward import (
+    DEFAULT_REWARD_WEIGHTS,
+    compute_reward,
+    flat_is_rebuffering,
+)
+from sit_liveclip.core.observation import (
+    OBSERVATION_FIELDS,
+    SLIDING_WINDOW_FIELDS,
+    get_observation_layout,
+)
+from sit_liveclip.utils.trace_store import TraceStore
+
+
+if TYPE_CHECKING:
+    from typing import Any, Union
+
+    from sit_liveclip.types import NDArrayInt, NDArrayFloat32
+    from sit_liveclip.core.reward import RewardWeights
+
+    EnvIds = Union[int, list[int], NDArrayInt, None]
+
+
+class PlayerSimulator:
+    """Vectorized model of many short-video players.
+
+    Every session keeps a sliding window of clips, fills their buffers from a
+    bandwidth trace, plays the current clip, and swipes to the next clip once the
+    user's staying time is reached. All sessions are stored as rows of one
+    float32 array laid out by `ObservationLayout`, so a step over thousands of
+    sessions is a handful of NumPy operations.
+
+    On reset, every session draws an episode-long window of bandwidth (kbps, one
+    value per second) and, if given, of user staying times (seconds, one value per
+    clip) from a `TraceStore`. Without staying time traces, staying times follow an
+    exponential distribution.
+    """
+
+    def __init__(
+        self,
+        num_sessions: int,
+        history_size: int,
+        sliding_window_size: int,
+        segment_size: int,
+        episode_length: int = 200,
+        mean_staying_time: float = 20.0,
+        video_length: float = 60.0,
+        video_bitrate: float = 1000.0,
+        bandwidth_traces: TraceStore | NDArrayFloat32 | None = None,
+        staying_time_traces: TraceStore | None = None,
+        seed: int | None = None,
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self.num_sessions = num_sessions
+        self.segment_size = segment_size
+        self.episode_length = episode_length
+        self.mean_staying_time = mean_staying_time
+        self.video_length = video_length
+        self.video_bitrate = video_bitrate
+        self.rng = np.random.default_rng(seed)
+
+        if bandwidth_traces is None:
+            bandwidth_traces = self._generate_bandwidth_traces(
+                num_sessions=64,
+                duration=3600,
+            )
+        self.bandwidth_traces = (
+            bandwidth_traces
+            if isinstance(bandwidth_traces, TraceStore)
+            else TraceStore.from_traces(bandwidth_traces)
+        )
+        self.staying_time_traces = staying_time_traces
+
+        self.layout = get_observation_layout(history_size, sliding_window_size)
+        self.obs = np.zeros((num_sessions, self.layout.size), dtype="float32")
+
+        # hidden state
+        self.bandwidth = np.zeros(
+            (num_sessions, episode_length * segment_size),
+            dtype="float32",
+        )
+        self.staying_time = np.zeros(
+            (num_sessions, episode_length if staying_time_traces else 0),
+            dtype="float32",
+        )
+        self.planned_staying_time = np.zeros(num_sessions, dtype="float32")
+        self.clip_count = np.zeros(num_sessions, dtype="int64")
+        self.step_count = np.zeros(num_sessions, dtype="int64")
+
+    def seed(self, seed: int | None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, ids: NDArrayInt) -> NDArrayFloat32:
+        obs = np.zeros((len(ids), self.layout.size), dtype="float32")
+        self._field(obs, "list_video_bitrate")[:] = self.video_bitrate
+        self._field(obs, "list_video_length")[:] = self.video_length
+        self.obs[ids] = obs
+
+        self.bandwidth[ids] = self.bandwidth_traces.sample_windows(
+            self.rng,
+            len(ids),
+            self.bandwidth.shape[1],
+        )
+        if self.staying_time_traces is not None:
+            self.staying_time[ids] = self.staying_time_traces.sample_windows(
+                self.rng,
+                len(ids),
+                self.staying_time.shape[1],
+            )
+
+        self.clip_count[ids] = 0
+        self.step_count[ids] = 0
+        self.planned_staying_time[ids] = self._next_staying_time(ids)
+
+        return obs
+
+    def step(
+        self,
+        actions: NDArrayInt,
+        ids: NDArrayInt,
+    ) -> tuple[NDArrayFloat32, NDArrayFloat32, NDArrayFloat32]:
+        """Advance the sessions `ids` by one decision of `segment_size` seconds.
+
+        Returns the new observations, the wastage cost of the step, and the seconds
+        spent rebuffering.
+        """
+        obs = self.obs[ids]
+
+        self._download(obs, actions, self._read_bandwidth(ids))
+        rebuffering_time = self._play(obs)
+        wastage_cost = self._swipe(obs, ids)
+
+        self.obs[ids] = obs
+        self.step_count[ids] += 1
+
+        return obs, wastage_cost, rebuffering_time
+
+    def is_done(self, ids: NDArrayInt) -> NDArrayInt:
+        return self.step_count[ids] >= self.episode_length  # type: ignore
+
+    def _read_bandwidth(self, ids: NDArrayInt) -> NDArrayFloat32:
+        seconds = self.step_count[ids, None] * self.segment_size + np.arange(
+            self.segment_size,
+        )
+        bandwidth: NDArrayFloat32 = self.bandwidth[ids[:, None], seconds]
+        return bandwidth
+
+    def _download(
+        self,
+        obs: NDArrayFloat32,
+        actions: NDArrayInt,
+        bandwidth: NDArrayFloat32,
+    ) -> None:
+        rows = np.arange(len(obs))
+        downloading = actions != Action.PAUSE
+        target = np.clip(actions - Action.CURRENT, 0, self.layout.sliding_window_size - 1)
+
+        buffered_content = self._field(obs, "list_buffered_content")
+        video_length = self._field(obs, "list_video_length")
+        video_bitrate = self._field(obs, "list_video_bitrate")
+
+        downloaded = bandwidth.sum(axis=1) / video_bitrate[rows, target]
+        remaining = video_length[rows, target] - buffered_content[rows, target]
+        buffered_content[rows, target] += downloading * np.minimum(downloaded, remaining)
+
+        time_spent = self._field(obs, "list_time_spent_downloading_videos")
+        time_spent[rows, target] += downloading * self.segment_size
+        self._field(obs, "list_completed_videos")[:] = buffered_content >= video_length
+
+        self._push_history(self._field(obs, "download_speed"), bandwidth.mean(axis=1))
+
+    def _play(self, obs: NDArrayFloat32) -> NDArrayFloat32:
+        play_progress = self._field(obs, "play_progress")[:, 0]
+        available = self._field(obs, "list_buffered_content")[:, 0] - play_progress
+        watched = np.clip(available, 0, self.segment_size)
+
+        play_progress += watched
+        self._field(obs, "current_staying_time")[:, 0] += watched
+
+        rebuffering_time: NDArrayFloat32 = self.segment_size - watched
+        return rebuffering_time
+
+    def _swipe(self, obs: NDArrayFloat32, ids: NDArrayInt) -> NDArrayFloat32:
+        """Move swiping sessions to the next clip and return the wastage cost."""
+        play_progress = self._field(obs, "play_progress")[:, 0]
+        current_staying_time = self._field(obs, "current_staying_time")[:, 0]
+        buffered_content = self._field(obs, "list_buffered_content")
+
+        swiped = (current_staying_time >= self.planned_staying_time[ids]) | (
+            play_progress >= self._field(obs, "list_video_length")[:, 0]
+        )
+
+        # megabits downloaded but never watched
+        wastage_cost: NDArrayFloat32 = (
+            swiped
+            * (buffered_content[:, 0] - play_progress)
+            * self._field(obs, "list_video_bitrate")[:, 0]
+            / 1000
+        )
+        if not swiped.any():
+            return wastage_cost
+
+        swiped_obs = obs[swiped]
+        self._push_history(
+            self._field(swiped_obs, "user_staying_time"),
+            self._field(swiped_obs, "current_staying_time")[:, 0],
+        )
+        self._field(swiped_obs, "play_progress")[:] = 0
+        self._field(swiped_obs, "current_staying_time")[:] = 0
+
+        for field in SLIDING_WINDOW_FIELDS:
+            window = self._field(swiped_obs, field)
+            window[:, :-1] = window[:, 1:].copy()
+        self._field(swiped_obs, "list_video_bitrate")[:, -1] = self.video_bitrate
+        self._field(swiped_obs, "list_video_length")[:, -1] = self.video_length
+        self._field(swiped_obs, "list_buffered_content")[:, -1] = 0
+        self._field(swiped_obs, "list_time_spent_downloading_videos")[:, -1] = 0
+        self._field(swiped_obs, "list_completed_videos")[:, -1] = 0
+
+        obs[swiped] = swiped_obs
+        self.clip_count[ids[swiped]] += 1
+        self.planned_staying_time[ids[swiped]] = self._next_staying_time(ids[swiped])
+
+        return wastage_cost
+
+    def _field(self, obs: NDArrayFloat32, field: str) -> NDArrayFloat32:
+        return obs[:, self.layout.slices[field]]
+
+    def _next_staying_time(self, ids: NDArrayInt) -> NDArrayFloat32:
+        if self.staying_time_traces is not None:
+            clip_idx = np.minimum(self.clip_count[ids], self.staying_time.shape[1] - 1)
+            staying_time = self.staying_time[ids, clip_idx]
+        else:
+            staying_time = self.rng.exponential(self.mean_staying_time, size=len(ids))
+        return np.clip(staying_time, 1, self.video_length).astype("float32")
+
+    def _generate_bandwidth_traces(
+        self,
+        num_sessions: int,
+        duration: int,
+    ) -> NDArrayFloat32:
+        """Random-walk throughput traces in kbps, used when none are given."""
+        log_bandwidth = np.log(2000) + np.cumsum(
+            self.rng.normal(0, 0.1, size=(num_sessions, duration)),
+            axis=1,
+        )
+        return np.clip(np.exp(log_bandwidth), 100, 17000).astype("float32")
+
+    @staticmethod
+    def _push_history(history: NDArrayFloat32, values: NDArrayFloat32) -> None:
+        history[:, :-1] = history[:, 1:].copy()
+        history[:, -1] = values
+
+
+class SimulatedLiveClipEnv(BaseVectorEnv):
+    """Vector env over `PlayerSimulator` sessions, usable by the tianshou Collector.
+
+    Observations and rewards match `LiveClipEnv`, but every call advances all the
+    requested sessions at once instead of going through one environment per worker.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        history_size: int,
+        sliding_window_size: int,
+        segment_size: int,
+        flat_observation: bool = False,
+        reward_weights: RewardWeights = DEFAULT_REWARD_WEIGHTS,
+        **simulator_kwargs: Any,
+    ) -> None:
+        # pylint: disable=super-init-not-called
+        self.simulator = PlayerSimulator(
+            num_envs,
+            history_size,
+            sliding_window_size,
+            segment_size,
+            **simulator_kwargs,
+        )
+        self.spec_env = BaseLiveClipEnv(
+            history_size,
+            sliding_window_size,
+            segment_size,
+            flat_observation,
+            reward_weights,
+        )
+
+        self.env_num = num_envs
+        self.wait_num = num_envs
+        self.timeout = None
+        self.is_async = False
+        self.is_closed = False
+
+    def get_env_attr(self, key: str, id: EnvIds = None) -> list[Any]:
+        # pylint: disable=redefined-builtin
+        return [getattr(self.spec_env, key)] * len(self._wrap_id(id))
+
+    def set_env_attr(self, key: str, value: Any, id: EnvIds = None) -> None:
+        # pylint: disable=redefined-builtin
+        setattr(self.spec_env, key, value)
+
+    def reset(self, id: EnvIds = None) -> Any:
+        # pylint: disable=redefined-builtin
+        ids = np.asarray(self._wrap_id(id))
+        return self._make_obs(self.simulator.reset(ids))
+
+    def step(
+        self,
+        action: NDArrayInt,
+        id: EnvIds = None,
+    ) -> tuple[Any, NDArrayFloat32, NDArrayInt, Batch]:
+        # pylint: disable=redefined-builtin
+        ids = np.asarray(self._wrap_id(id))
+        obs, wastage_cost, rebuffering_time = self.simulator.step(np.asarray(action), ids)
+
+        rebuffering = flat_is_rebuffering(
+            obs,
+            self.simulator.layout,
+            self.simulator.segment_size,
+        )
+        reward = compute_reward(rebuffering, wastage_cost, self.spec_env.reward_weights)
+        done = self.simulator.is_done(ids)
+        info = Batch(
+            env_id=ids,
+            wastage_cost=wastage_cost,
+            rebuffering=rebuffering,
+            rebuffering_time=rebuffering_time,
+        )
+        return self._make_obs(obs), reward, done, info
+
+    def seed(self, seed: int | list[int] | None = None) -> list[int | None]:
+        first_seed = seed[0] if isinstance(seed, list) else seed
+        self.simulator.seed(first_seed)
+        return [first_seed] * self.env_num
+
+    def render(self, **kwargs: Any) -> list[Any]:
+        return [None] * self.env_num
+
+    def close(self) -> None:
+        self.is_closed = True
+
+    def _make_obs(self, obs: NDArrayFloat32) -> Any:
+        if self.spec_env.flat_observation:
+            return obs
+        layout = self.simulator.layout
+        return Batch(
+            {
+                field: obs[:, layout.slices[field]].reshape(-1, *layout.shapes[field])
+                for field in OBSERVATION_FIELDS
+            },
+        )
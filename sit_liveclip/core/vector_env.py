@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import time
+from functools import partial
+
+from tianshou.env import DummyVectorEnv, SubprocVectorEnv
+from tianshou.env.venv_wrappers import VectorEnvWrapper
+
+from sit_liveclip.core.env import LiveClipEnv, ReplayLiveClipEnv
+from sit_liveclip.core.reward import DEFAULT_REWARD_WEIGHTS
+from sit_liveclip.core.recorder import Recording, TransitionRecorder
+from sit_liveclip.core.observation import get_observation_layout
+from sit_liveclip.core.player_connection import PlayerConnection
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from pathlib import Path
+    from collections.abc import Sequence
+
+    import numpy as np
+
+    from tianshou.env import BaseVectorEnv
+
+    from sit_liveclip.core.reward import RewardWeights
+    from sit_liveclip.core.deadline import DeadlinePolicy
+
+
+class DecisionClock(VectorEnvWrapper):
+    """Tell the envs of `venv` when the policy got their last observations.
+
+    The policy gets the observations of every env at once, after the last `reset` or
+    `step` of the vector env returns. The decision deadlines of `LiveClipEnv` start
+    then, rather than when each env got its own player state, which would also
+    count the time spent waiting on the slower players of the batch.
+    """
+
+    def __init__(self, venv: BaseVectorEnv) -> None:
+        super().__init__(venv)
+        self.observed_at = time.monotonic()
+
+    def reset(self, id: Any = None) -> np.ndarray:  # pylint: disable=redefined-builtin
+        obs = super().reset(id)
+        self.observed_at = time.monotonic()
+        return obs
+
+    def step(
+        self,
+        action: np.ndarray,
+        id: Any = None,  # pylint: disable=redefined-builtin
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        self.venv.set_env_attr("observed_at", self.observed_at, id)
+        result = super().step(action, id)
+        self.observed_at = time.monotonic()
+        return result
+
+
+class PlayerSpec(NamedTuple):
+    base_url: str
+    session_id: str | None = None
+    legacy_protocol: bool = False
+
+
+def build_player_specs(
+    base_urls: Sequence[str],
+    num_players: int,
+    legacy_protocol: bool = False,
+) -> list[PlayerSpec]:
+    """Assign a player connection to each of the `num_players` environments.
+
+    If only one URL is given, every environment talks to it and players are told
+    apart by their session id. Otherwise, one environment is created per URL, and
+    `num_players` must be 1 or the number of URLs.
+    """
+    if len(base_urls) == 0:
+        raise ValueError("At least one player base URL is required.")
+
+    if len(base_urls) > 1:
+        if num_players not in (1, len(base_urls)):
+            raise ValueError(
+                f"Cannot drive {num_players} players through {len(base_urls)} URLs,"
+                " give either one URL or one URL per player."
+            )
+        return [
+            PlayerSpec(base_url=url, legacy_protocol=legacy_protocol) for url in base_urls
+        ]
+
+    if num_players == 1:
+        return [PlayerSpec(base_url=base_urls[0], legacy_protocol=legacy_protocol)]
+
+    return [
+        PlayerSpec(
+            base_url=base_urls[0],
+            session_id=f"player-{idx}",
+            legacy_protocol=legacy_protocol,
+        )
+        for idx in range(num_players)
+    ]
+
+
+def make_live_vector_env(
+    players: Sequence[PlayerSpec],
+    history_size: int,
+    sliding_window_size: int,
+    segment_size: int,
+    flat_observation: bool = False,
+    record_dir: Path | None = None,
+    reward_weights: RewardWeights = DEFAULT_REWARD_WEIGHTS,
+    deadline: DeadlinePolicy | None = None,
+) -> BaseVectorEnv:
+    """Drive one `LiveClipEnv` per player concurrently.
+
+    Each environment runs in its own worker process, so the HTTP round trips of all
+    players overlap and the collector receives one batch per step. With
+    `record_dir`, the transitions of the i-th environment are recorded to
+    `record_dir / "env-<i>"`. With a `deadline`, slow players are not waited on,
+    see `LiveClipEnv`, and decisions are timed by a `DecisionClock`.
+    """
+    env_fns = [
+        partial(
+            _make_live_env,
+            player,
+            history_size,
+            sliding_window_size,
+            segment_size,
+            flat_observation,
+            None if record_dir is None else record_dir / f"env-{idx}",
+            reward_weights,
+            deadline,
+        )
+        for idx, player in enumerate(players)
+    ]
+
+    venv = DummyVectorEnv(env_fns) if len(env_fns) == 1 else SubprocVectorEnv(env_fns)
+    return venv if deadline is None else DecisionClock(venv)
+
+
+def _make_live_env(
+    player: PlayerSpec,
+    history_size: int,
+    sliding_window_size: int,
+    segment_size: int,
+    flat_observation: bool,
+    record_dir: Path | None,
+    reward_weights: RewardWeights,
+    deadline: DeadlinePolicy | None,
+) -> LiveClipEnv:
+    recorder = (
+        None
+        if record_dir is None
+        else TransitionRecorder(
+            record_dir,
+            get_observation_layout(history_size, sliding_window_size),
+        )
+    )
+    return LiveClipEnv(
+        player_conn=PlayerConnection(
+            base_url=player.base_url,
+            session_id=player.session_id,
+            legacy_protocol=player.legacy_protocol,
+        ),
+        history_size=history_size,
+        sliding_window_size=sliding_window_size,
+        segment_size=segment_size,
+        flat_observation=flat_observation,
+        recorder=recorder,
+        reward_weights=reward_weights,
+        deadline=deadline,
+    )
+
+
+def make_replay_vector_env(
+    recording_dir: Path,
+    segment_size: int,
+    flat_observation: bool = False,
+) -> BaseVectorEnv:
+    """Replay every recording in `recording_dir`, one environment per recording."""
+    recordings = Recording.find(recording_dir)
+    if len(recordings) == 0:
+        raise ValueError(f"No recording found in `{recording_dir}`.")
+
+    return DummyVectorEnv(
+        [
+            partial(ReplayLiveClipEnv, recording, segment_size, flat_observation)
+            for recording in recordings
+        ],
+    )
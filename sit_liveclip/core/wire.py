@@ -0,0 +1,116 @@
+"""Wire formats of the player state.
+
+Besides JSON, a player state can be sent as a compact binary payload: a header of
+two little-endian uint32 (`history_size`, `sliding_window_size`) followed by
+little-endian float32 values `done`, `wastage_cost`, and the observation fields
+laid out as in `ObservationLayout`.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from sit_liveclip.core.observation import (
+    PLAYBACK_FIELDS,
+    OBSERVATION_FIELDS,
+    get_observation_layout,
+)
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from sit_liveclip.types import NDArrayFloat32
+    from sit_liveclip.core.observation import Observation, ObservationLayout
+
+
+STATE_MEDIA_TYPE = "application/x-liveclip-state"
+JSON_MEDIA_TYPE = "application/json"
+
+_HEADER_DTYPE = np.dtype("<u4")
+_HEADER_SIZE = 2 * _HEADER_DTYPE.itemsize
+_BODY_DTYPE = np.dtype("<f4")
+_META_SIZE = 2  # done, wastage_cost
+
+
+class DecodedState(NamedTuple):
+    obs: Observation
+    done: bool
+    wastage_cost: float
+
+
+def encode_state(state: dict[str, Any]) -> bytes:
+    """Encode a player state in JSON form into the binary format."""
+    layout = get_observation_layout(
+        len(state["download_speed"]),
+        len(state["list_video_bitrate"]),
+    )
+    header = np.asarray(
+        [layout.history_size, layout.sliding_window_size],
+        dtype=_HEADER_DTYPE,
+    )
+    return header.tobytes() + _fill_buffer(state, layout).tobytes()
+
+
+def decode_state(payload: bytes) -> DecodedState:
+    """Decode a binary player state.
+
+    The observation fields are views into the payload itself, so they are
+    read-only and no per-field arrays are allocated.
+    """
+    history_size, sliding_window_size = np.frombuffer(
+        payload,
+        dtype=_HEADER_DTYPE,
+        count=2,
+    )
+    layout = get_observation_layout(int(history_size), int(sliding_window_size))
+
+    buffer = np.frombuffer(
+        payload,
+        dtype=_BODY_DTYPE,
+        count=_META_SIZE + layout.size,
+        offset=_HEADER_SIZE,
+    )
+    return _split_buffer(buffer, layout)
+
+
+def decode_state_json(state: dict[str, Any]) -> DecodedState:
+    """Decode a player state in JSON form into a single float32 buffer."""
+    layout = get_observation_layout(
+        len(state["download_speed"]),
+        len(state["list_video_bitrate"]),
+    )
+    return _split_buffer(_fill_buffer(state, layout), layout)
+
+
+def state_to_json(payload: bytes) -> dict[str, Any]:
+    """Convert a binary player state back into its JSON form."""
+    decoded = decode_state(payload)
+    state: dict[str, Any] = {
+        "status": decoded.done,
+        "wastage_cost": decoded.wastage_cost,
+    }
+    for field in OBSERVATION_FIELDS:
+        value = decoded.obs[field].ravel().tolist()  # type: ignore[literal-required]
+        state[field] = value[0] if field in PLAYBACK_FIELDS else value
+    return state
+
+
+def _fill_buffer(state: dict[str, Any], layout: ObservationLayout) -> NDArrayFloat32:
+    buffer = np.empty(_META_SIZE + layout.size, dtype=_BODY_DTYPE)
+    buffer[0] = state["status"]
+    buffer[1] = state["wastage_cost"]
+
+    obs_buffer = buffer[_META_SIZE:]
+    for field in OBSERVATION_FIELDS:
+        obs_buffer[layout.slices[field]] = state[field]
+    return buffer
+
+
+def _split_buffer(buffer: NDArrayFloat32, layout: ObservationLayout) -> DecodedState:
+    return DecodedState(
+        obs=layout.views(buffer[_META_SIZE:]),
+        done=bool(buffer[0]),
+        wastage_cost=float(buffer[1]),
+    )
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import torch
+from tianshou.env import BaseVectorEnv, DummyVectorEnv
+from tianshou.data import Batch, to_numpy
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    import gym
+
+    from tianshou.policy import BasePolicy
+
+    from sit_liveclip.types import NDArrayInt64, NDArrayFloat64
+
+
+EPISODE_METRICS = ("reward", "rebuffering_rate", "wastage_cost", "length")
+
+
+def run_episodes(
+    policy: BasePolicy,
+    env: gym.Env | BaseVectorEnv,
+    num_episodes: int,
+) -> dict[str, NDArrayFloat64]:
+    """Play `num_episodes` episodes with `policy`, spread over the envs of `env`.
+
+    Every env plays its share of the episodes then stops, so the sample is not
+    biased toward short episodes as it would be by stopping all envs at once.
+    Returns one value per episode for each of `EPISODE_METRICS`, and the `env_id`
+    of the episode. `rebuffering_rate` is the fraction of steps with a rebuffering
+    event and `wastage_cost` the total wastage of the episode, both are NaN for
+    envs that do not report them in their info.
+    """
+    if not isinstance(env, BaseVectorEnv):
+        env = _to_vector_env(env)
+    if num_episodes < 1:
+        raise ValueError(f"num_episodes must be positive, got {num_episodes}.")
+
+    num_envs = len(env)
+    quotas = np.full(num_envs, num_episodes // num_envs)
+    quotas[: num_episodes % num_envs] += 1
+    active = np.flatnonzero(quotas > 0)
+
+    totals = {
+        metric: np.zeros(num_envs)
+        for metric in ("reward", "rebuffering", "wastage_cost", "length")
+    }
+    episodes: dict[str, list[float]] = {
+        metric: [] for metric in (*EPISODE_METRICS, "env_id")
+    }
+
+    policy.eval()
+    obs = env.reset(active)
+    while len(active) > 0:
+        with torch.no_grad():
+            act = policy(Batch(obs=obs, info=Batch())).act
+        obs, reward, done, info = env.step(policy.map_action(to_numpy(act)), active)
+
+        totals["reward"][active] += reward
+        totals["length"][active] += 1
+        totals["rebuffering"][active] += _info_column(info, "rebuffering", len(active))
+        totals["wastage_cost"][active] += _info_column(info, "wastage_cost", len(active))
+
+        done = np.asarray(done, dtype=bool)
+        for env_id in active[done]:
+            _end_episode(episodes, totals, env_id)
+            quotas[env_id] -= 1
+
+        restart = done & (quotas[active] > 0)
+        if restart.any():
+            obs[np.flatnonzero(restart)] = env.reset(active[restart])
+        keep = quotas[active] > 0
+        active, obs = active[keep], obs[keep]
+
+    return {
+        metric: np.asarray(values, dtype="float64") for metric, values in episodes.items()
+    }
+
+
+def summarize(
+    episodes: dict[str, NDArrayFloat64],
+    confidence: float = 0.95,
+    num_resamples: int = 1000,
+    seed: int = 0,
+) -> dict[str, dict[str, float]]:
+    """Mean, standard deviation, percentiles and confidence interval of each metric.
+
+    The confidence interval of the mean is a percentile bootstrap, which holds for
+    the skewed distributions of rebuffering rates. NaN values are left out.
+
+    >>> summary = summarize({"reward": np.array([1.0, 2.0, 3.0, np.nan])})
+    >>> summary["reward"]["mean"], summary["reward"]["count"]
+    (2.0, 3)
+    """
+    rng = np.random.default_rng(seed)
+    tail = 50 * (1 - confidence)
+
+    summary = {}
+    for metric in EPISODE_METRICS:
+        if metric not in episodes:
+            continue
+        values = episodes[metric][~np.isnan(episodes[metric])]
+        if len(values) == 0:
+            continue
+
+        means = [rng.choice(values, len(values)).mean() for _ in range(num_resamples)]
+        ci_low, ci_high = np.percentile(means, [tail, 100 - tail])
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        summary[metric] = {
+            "count": len(values),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "ci_low": float(ci_low),
+            "ci_high": float(ci_high),
+            "p5": float(p5),
+            "p50": float(p50),
+            "p95": float(p95),
+        }
+    return summary
+
+
+def summary_rows(
+    summary: dict[str, dict[str, float]],
+) -> tuple[list[str], list[list[str]]]:
+    """Columns and rows of `summary`, for `console.print_table`."""
+    columns = ["metric", "mean", "95% CI", "std", "p5", "p50", "p95"]
+    rows = []
+    for metric, stats in summary.items():
+        row = [
+            metric,
+            f"{stats['mean']:.3f}",
+            f"[{stats['ci_low']:.3f}, {stats['ci_high']:.3f}]",
+            f"{stats['std']:.3f}",
+            *(f"{stats[key]:.3f}" for key in ("p5", "p50", "p95")),
+        ]
+        rows.append(row)
+    return columns, rows
+
+
+def _to_vector_env(env: gym.Env) -> BaseVectorEnv:
+    return DummyVectorEnv([lambda: env])
+
+
+def _info_column(info: Any, key: str, size: int) -> NDArrayFloat64:
+    """Values of `key` in the info of a vector env step, NaN where it is missing."""
+    if isinstance(info, Batch):
+        if key not in info.keys():
+            return np.full(size, np.nan)
+        return np.asarray(info[key], dtype="float64")
+    return np.array([item.get(key, np.nan) for item in info], dtype="float64")
+
+
+def _end_episode(
+    episodes: dict[str, list[float]],
+    totals: dict[str, NDArrayFloat64],
+    env_id: NDArrayInt64,
+) -> None:
+    length = totals["length"][env_id]
+    episodes["reward"].append(totals["reward"][env_id])
+    episodes["rebuffering_rate"].append(totals["rebuffering"][env_id] / length)
+    episodes["wastage_cost"].append(totals["wastage_cost"][env_id])
+    episodes["length"].append(length)
+    episodes["env_id"].append(env_id)
+    for total in totals.values():
+        total[env_id] = 0.0
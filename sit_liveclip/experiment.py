@@ -2,74 +2,338 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import math
+import time
 from pathlib import Path
+from functools import partial
+from collections import deque
+
+import numpy as np
 
 import torch
 from torch.utils import tensorboard
-from tianshou.data import Collector, ReplayBuffer
+from tianshou.env import BaseVectorEnv
+from tianshou.data import Collector, VectorReplayBuffer
 from tianshou.utils import TensorboardLogger
 from tianshou.policy import A2CPolicy
 from tianshou.trainer import onpolicy_trainer
 from tianshou.utils.net.common import ActorCritic
 from tianshou.utils.net.discrete import Actor, Critic
 
-from sit_liveclip.core import PreprocessNet
-from sit_liveclip.utils import console
+from sit_liveclip import actor_learner
+from sit_liveclip.core import PreprocessNet, DummyLiveClipEnv, SimulatedLiveClipEnv
+from sit_liveclip.utils import TIMERS, TraceStore, console
+from sit_liveclip.core.env import BaseLiveClipEnv
+from sit_liveclip.checkpoint import (
+    CHECKPOINT_FILE,
+    Checkpoint,
+    CheckpointWriter,
+    load_checkpoint,
+)
+from sit_liveclip.evaluation import summarize, run_episodes, summary_rows
+from sit_liveclip.core.reward import RewardWeights
+from sit_liveclip.actor_learner import (
+    RolloutLayout,
+    RolloutServer,
+    SharedWeights,
+    EpisodeTracker,
+    SharedRollouts,
+    stop_actors,
+    start_actors,
+    update_policy,
+    gather_rollouts,
+)
+from sit_liveclip.utils.serializer import serialize
 
 
 if TYPE_CHECKING:
-    from typing import Literal
+    from typing import Any, Literal, Callable, Sequence
 
     import gym
+    from gym import spaces
 
     from sit_liveclip.config import Config
+    from sit_liveclip.actor_learner import GatheredRollouts
 
 
-def train(env: gym.Env, log_dir: Path | None, config: Config) -> None:
-    # pylint: disable=too-many-locals
-    device: Literal["cpu", "cuda"] = "cuda" if torch.cuda.is_available() else "cpu"
-    policy = _build_policy(env=env, config=config, device=device)
+class ExperimentLogger(TensorboardLogger):
+    """TensorBoard logger of `train`, with timers and checkpoint counters.
 
-    # logger
-    writer = tensorboard.SummaryWriter(log_dir)  # type: ignore
-    if log_dir is None:
-        log_dir = Path(writer.log_dir)
-    logger = TensorboardLogger(writer, train_interval=1, update_interval=1)
+    When `TIMERS` are enabled, every timer gets its percentiles as scalars and its
+    window as a histogram, in milliseconds, after each policy update. The timers
+    are then reset so each update reports its own window. Environments stepped in
+    worker processes, with several live players, keep their timers to themselves:
+    only the collection and the policy are reported then.
 
-    console.print_divider("Config")
-    console.print("log_dir:", log_dir)
-    console.print(config)
+    When resuming, the trainer counters come from `resumed_from` rather than the
+    event log, which may be ahead of the last checkpoint written.
+    """
 
-    console.print_divider("Model")
-    console.print(policy)
+    def __init__(
+        self,
+        *args: Any,
+        resumed_from: Checkpoint | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.resumed_from = resumed_from
+
+    def log_update_data(self, update_result: dict[str, Any], step: int) -> None:
+        super().log_update_data(update_result, step)
+        if not TIMERS.enabled:
+            return
+
+        for name, tracker in TIMERS.items():
+            self.writer.add_histogram(f"timing/{name}", 1e3 * tracker.values(), step)
+        self.write(
+            "timing/step",
+            step,
+            {
+                f"timing/{name}/{key}": value
+                for name, stats in TIMERS.summary().items()
+                for key, value in stats.items()
+                if key != "count"
+            },
+        )
+        TIMERS.reset()
+
+    def restore_data(self) -> tuple[int, int, int]:
+        if self.resumed_from is None:
+            return super().restore_data()
+
+        epoch, env_step, gradient_step, *_ = self.resumed_from
+        self.last_save_step = self.last_log_test_step = epoch
+        self.last_log_update_step = gradient_step
+        self.last_log_train_step = env_step
+        return epoch, env_step, gradient_step
+
+
+def make_local_env(env_name: str, config: Config) -> gym.Env:
+    """Build the `dummy` or `sim` environment, which need no player."""
+    if env_name == "dummy":
+        return DummyLiveClipEnv(
+            config.history_size,
+            config.sliding_window_size,
+            config.segment_size,
+            flat_observation=config.flat_observation,
+        )
+
+    if env_name == "sim":
+        return SimulatedLiveClipEnv(
+            config.sim_num_sessions,
+            config.history_size,
+            config.sliding_window_size,
+            config.segment_size,
+            flat_observation=config.flat_observation,
+            reward_weights=RewardWeights.from_config(config),
+            episode_length=config.sim_episode_length,
+            bandwidth_traces=_open_trace_store(config.sim_bandwidth_traces),
+            staying_time_traces=_open_trace_store(config.sim_staying_time_traces),
+        )
+
+    raise ValueError(f"`{env_name}` is not a local environment, use `dummy` or `sim`.")
+
+
+def train(
+    env: gym.Env | BaseVectorEnv,
+    log_dir: Path | None,
+    config: Config,
+    resume: bool = False,
+) -> dict[str, Any]:
+    """Train a policy, checkpointed to `log_dir` every `checkpoint_interval` epochs.
+
+    With `resume`, the policy, its optimizer and the trainer counters are restored
+    from the checkpoint of a previous run in `log_dir`.
+    """
+    device: Literal["cpu", "cuda"] = "cuda" if torch.cuda.is_available() else "cpu"
+    policy = _build_policy(env=env, config=config, device=device)
+    log_dir, logger, checkpoint_writer, _ = _start_run(policy, log_dir, config, resume)
+    save_checkpoint_fn = _make_save_checkpoint_fn(policy, checkpoint_writer)
 
     # training
     console.print_divider("Training")
-    train_collector = Collector(policy, env, ReplayBuffer(20000))
-    result = onpolicy_trainer(
+    train_collector = Collector(
         policy,
-        train_collector=train_collector,
-        test_collector=None,
-        max_epoch=config.max_epoch,
-        step_per_epoch=config.step_per_epoch,
-        repeat_per_collect=config.repeat_per_collect,
-        episode_per_test=config.episode_per_test,
-        batch_size=config.batch_size,
-        step_per_collect=config.step_per_epoch,
-        episode_per_collect=config.episode_per_collect,
-        stop_fn=lambda mean_rewards: mean_rewards >= config.reward_threshold,
-        logger=logger,
+        env,
+        VectorReplayBuffer(20000, _get_env_num(env)),
     )
+    if TIMERS.enabled:
+        _instrument(policy, train_collector)
+    try:
+        result = onpolicy_trainer(
+            policy,
+            train_collector=train_collector,
+            test_collector=None,
+            max_epoch=config.max_epoch,
+            step_per_epoch=config.step_per_epoch,
+            repeat_per_collect=config.repeat_per_collect,
+            episode_per_test=config.episode_per_test,
+            batch_size=config.batch_size,
+            step_per_collect=config.step_per_epoch,
+            episode_per_collect=config.episode_per_collect,
+            stop_fn=lambda mean_rewards: mean_rewards >= config.reward_threshold,
+            logger=logger,
+            save_checkpoint_fn=save_checkpoint_fn,
+            resume_from_log=resume,
+        )
+    finally:
+        checkpoint_writer.close()
 
-    # save model
-    console.print_divider("Training Result")
-    out_model_file = log_dir / "policy.pth"
-    torch.save(policy.state_dict(), out_model_file)
-    console.print("Saved trained model to", out_model_file)
-    console.print_dict(result)
+    _save_policy(policy, log_dir, result)
+    return result
+
+
+def train_actor_learner(
+    env_fns: Sequence[Callable[[], gym.Env | BaseVectorEnv]],
+    num_envs: int,
+    log_dir: Path | None,
+    config: Config,
+    resume: bool = False,
+    listen: tuple[str, int] | None = None,
+    authkey: bytes | None = None,
+) -> dict[str, Any]:
+    """Train a policy while actor processes keep collecting rollouts for it.
+
+    Each of `env_fns` builds the `num_envs` flat envs of a local actor. With
+    `listen`, actors of other nodes, see `run_remote_actor`, may connect to that
+    address too. Actors write rollouts of `config.actor_rollout_length` steps to
+    shared memory, and the policy is updated once `config.step_per_collect` steps
+    are gathered. The new weights are then published, and each actor picks them up
+    before its next rollout. Rollouts collected with weights older than
+    `config.actor_max_policy_lag` updates are dropped. Checkpoints, logs and the
+    saved policy are the ones of `train`.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals,too-many-statements
+    if len(env_fns) == 0 and listen is None:
+        raise ValueError("Training requires local actors or an address to listen at.")
+    device: Literal["cpu", "cuda"] = "cuda" if torch.cuda.is_available() else "cpu"
+    spec_env = BaseLiveClipEnv(
+        config.history_size,
+        config.sliding_window_size,
+        config.segment_size,
+        flat_observation=True,
+    )
+    policy = _build_policy(env=spec_env, config=config, device=device)
+    log_dir, logger, checkpoint_writer, checkpoint = _start_run(
+        policy, log_dir, config, resume
+    )
+    save_checkpoint_fn = _make_save_checkpoint_fn(policy, checkpoint_writer)
+
+    layout = RolloutLayout(config.actor_rollout_length, num_envs, spec_env.layout.size)
+    rollout_steps = layout.rollout_length * layout.num_envs
+    rollouts_per_update = max(1, math.ceil(config.step_per_collect / rollout_steps))
+    step_per_epoch = config.step_per_epoch or rollouts_per_update * rollout_steps
+
+    # forked actors would inherit the torch thread pools of the learner
+    context = torch.multiprocessing.get_context("spawn")
+    rollouts = SharedRollouts(layout, config.actor_num_slots, context)
+    weights = SharedWeights(policy.actor, context)
+    weights.publish(policy.actor)
+    stop = context.Event()
+
+    console.print_divider("Training")
+    policy_fn = partial(_build_policy, config=config, device="cpu")
+    actors = start_actors(env_fns, policy_fn, rollouts, weights, stop, context)
+    server = _start_rollout_server(listen, rollouts, weights, len(actors), authkey)
+
+    epoch, env_step, gradient_step = (0, 0, 0) if checkpoint is None else checkpoint[:3]
+    episodes = EpisodeTracker(num_envs)
+    recent_returns: deque[float] = deque(maxlen=100)
+    num_dropped = 0
+    learner_wait = 0.0
+    start = time.perf_counter()
+    policy.train()
+    try:
+        while epoch < config.max_epoch:
+            gathered = gather_rollouts(
+                rollouts,
+                weights,
+                actors,
+                episodes,
+                rollouts_per_update,
+                config.actor_max_policy_lag,
+            )
+            env_step += gathered.num_received * rollout_steps
+            num_dropped += gathered.num_dropped
+            learner_wait += gathered.wait_time
+
+            losses, num_gradient_steps = update_policy(
+                policy,
+                gathered.buffer,
+                config.batch_size,
+                config.repeat_per_collect,
+            )
+            weights.publish(policy.actor)
+            gradient_step += num_gradient_steps
+            recent_returns.extend(gathered.returns)
+            _log_update(
+                logger,
+                gathered,
+                losses,
+                env_step,
+                gradient_step,
+                num_dropped,
+                learner_busy=1 - learner_wait / (time.perf_counter() - start),
+            )
+
+            while env_step >= (epoch + 1) * step_per_epoch and epoch < config.max_epoch:
+                epoch += 1
+                logger.save_data(epoch, env_step, gradient_step, save_checkpoint_fn)
+            if gathered.returns and np.mean(gathered.returns) >= config.reward_threshold:
+                break
+    finally:
+        stop.set()
+        stop_actors(actors, server)
+        checkpoint_writer.close()
+
+    duration = time.perf_counter() - start
+    result = {
+        "epoch": epoch,
+        "env_step": env_step,
+        "gradient_step": gradient_step,
+        "episodes": episodes.num_finished,
+        "reward": float(np.mean(recent_returns)) if recent_returns else None,
+        "dropped_rollouts": num_dropped,
+        "remote_actors": 0 if server is None else server.num_connected,
+        "learner_busy": 1 - learner_wait / duration,
+        "duration": f"{duration:.2f}s",
+        "train_speed": f"{env_step / duration:.2f} step/s",
+    }
+    _save_policy(policy, log_dir, result)
+    return result
+
+
+def run_remote_actor(
+    env_fn: Callable[[], gym.Env | BaseVectorEnv],
+    address: tuple[str, int],
+    config: Config,
+    authkey: bytes | None = None,
+) -> int:
+    """Collect rollouts for `train_actor_learner` listening at `address`, until it ends.
 
+    Returns the number of rollouts sent.
+    """
+    policy_fn = partial(_build_policy, config=config, device="cpu")
+    return actor_learner.run_remote_actor(
+        address,
+        env_fn,
+        policy_fn,
+        config.actor_rollout_length,
+        authkey=authkey,
+    )
+
+
+def evaluate(
+    env: gym.Env | BaseVectorEnv,
+    model_path: Path,
+    config: Config,
+    out_file: Path | None = None,
+) -> dict[str, dict[str, float]]:
+    """Evaluate a trained policy over `config.episode_per_test` episodes.
 
-def evaluate(env: gym.Env, model_path: Path, config: Config) -> None:
+    The episodes are spread over the envs of `env`, and their QoE statistics are
+    returned, and saved with every episode to `out_file` when given.
+    """
     device: Literal["cpu", "cuda"] = "cuda" if torch.cuda.is_available() else "cpu"
     policy = _build_policy(env=env, config=config, device=device)
 
@@ -81,21 +345,43 @@ def evaluate(env: gym.Env, model_path: Path, config: Config) -> None:
 
     # evaluate
     console.print_divider("Evaluation")
-    test_collector = Collector(policy, env)
-    policy.load_state_dict(torch.load(model_path))  # type: ignore
-    policy.eval()
-    result = test_collector.collect(n_episode=1, render=False)
+    policy.load_state_dict(torch.load(model_path, map_location=device))  # type: ignore
+    episodes = run_episodes(policy, env, config.episode_per_test)
+    summary = summarize(episodes)
 
     # show result
     console.print_divider("Evaluation Result")
-    console.print_dict(result)
+    columns, rows = summary_rows(summary)
+    console.print_table(f"{len(episodes['reward'])} episodes", columns, rows)
+    if out_file is not None:
+        serialize(
+            out_file,
+            {
+                "summary": summary,
+                "episodes": {
+                    metric: values.tolist() for metric, values in episodes.items()
+                },
+            },
+        )
+        console.print("Saved the evaluation to", out_file)
+    return summary
+
+
+def load_actor(env: gym.Env | BaseVectorEnv, model_path: Path, config: Config) -> Actor:
+    """Rebuild the actor of a trained `policy.pth` on the CPU, in eval mode."""
+    policy = _build_policy(env=env, config=config, device="cpu")
+    policy.load_state_dict(torch.load(model_path, map_location="cpu"))  # type: ignore
+    policy.eval()
+    actor: Actor = policy.actor
+    return actor
 
 
 def _build_policy(
-    env: gym.Env,
+    env: gym.Env | BaseVectorEnv,
     config: Config,
     device: Literal["cpu", "cuda"],
 ) -> A2CPolicy:
+    action_space = _get_action_space(env)
     preprocess_net = PreprocessNet(
         history_size=config.history_size,
         sliding_window_size=config.sliding_window_size,
@@ -105,7 +391,7 @@ def _build_policy(
     )
     actor = Actor(
         preprocess_net,
-        env.action_space.n,
+        action_space.n,
         hidden_sizes=config.actor_hidden_size,
         device=device,
     ).to(device)
@@ -124,8 +410,146 @@ def _build_policy(
         critic,
         optim,
         dist,
-        action_space=env.action_space,
+        action_space=action_space,
         deterministic_eval=True,
     )
 
     return policy
+
+
+def _start_run(
+    policy: A2CPolicy,
+    log_dir: Path | None,
+    config: Config,
+    resume: bool,
+) -> tuple[Path, ExperimentLogger, CheckpointWriter, Checkpoint | None]:
+    """Restore `policy` from `log_dir` when resuming, and start logging to `log_dir`."""
+    checkpoint = None
+    if resume:
+        if log_dir is None:
+            raise ValueError("Resuming requires the log dir of the previous run.")
+        checkpoint = load_checkpoint(log_dir / CHECKPOINT_FILE)
+        policy.load_state_dict(checkpoint.policy)
+        policy.optim.load_state_dict(checkpoint.optim)
+
+    # logger
+    writer = tensorboard.SummaryWriter(log_dir)  # type: ignore
+    if log_dir is None:
+        log_dir = Path(writer.log_dir)
+    logger = ExperimentLogger(
+        writer,
+        train_interval=1,
+        update_interval=1,
+        save_interval=config.checkpoint_interval,
+        resumed_from=checkpoint,
+    )
+    checkpoint_writer = CheckpointWriter(log_dir / CHECKPOINT_FILE)
+
+    console.print_divider("Config")
+    console.print("log_dir:", log_dir)
+    if checkpoint is not None:
+        console.print("resumed from epoch:", checkpoint.epoch)
+    console.print(config)
+
+    console.print_divider("Model")
+    console.print(policy)
+    return log_dir, logger, checkpoint_writer, checkpoint
+
+
+def _make_save_checkpoint_fn(
+    policy: A2CPolicy,
+    checkpoint_writer: CheckpointWriter,
+) -> Callable[[int, int, int], None]:
+    def save_checkpoint_fn(epoch: int, env_step: int, gradient_step: int) -> None:
+        checkpoint_writer.save(
+            Checkpoint(
+                epoch,
+                env_step,
+                gradient_step,
+                policy.state_dict(),
+                policy.optim.state_dict(),
+            ),
+        )
+
+    return save_checkpoint_fn
+
+
+def _save_policy(policy: A2CPolicy, log_dir: Path, result: dict[str, Any]) -> None:
+    console.print_divider("Training Result")
+    out_model_file = log_dir / "policy.pth"
+    torch.save(policy.state_dict(), out_model_file)
+    console.print("Saved trained model to", out_model_file)
+    console.print_dict(result)
+
+
+def _log_update(
+    logger: ExperimentLogger,
+    gathered: GatheredRollouts,
+    losses: dict[str, Any],
+    env_step: int,
+    gradient_step: int,
+    num_dropped: int,
+    learner_busy: float,
+) -> None:
+    """Log an update of `train_actor_learner` on the `gathered` rollouts."""
+    # pylint: disable=too-many-arguments
+    logger.log_update_data(
+        {name: float(np.mean(value)) for name, value in losses.items()},
+        gradient_step,
+    )
+    if gathered.returns:
+        logger.log_train_data(
+            {
+                "n/ep": len(gathered.returns),
+                "rew": np.mean(gathered.returns),
+                "len": np.mean(gathered.lengths),
+            },
+            env_step,
+        )
+    logger.write(
+        "actor_learner/gradient_step",
+        gradient_step,
+        {
+            "actor_learner/policy_lag": float(np.mean(gathered.lags)),
+            "actor_learner/actor_wait": float(np.mean(gathered.actor_waits)),
+            "actor_learner/learner_busy": learner_busy,
+            "actor_learner/dropped_rollouts": num_dropped,
+        },
+    )
+
+
+def _start_rollout_server(
+    listen: tuple[str, int] | None,
+    rollouts: SharedRollouts,
+    weights: SharedWeights,
+    first_actor_id: int,
+    authkey: bytes | None,
+) -> RolloutServer | None:
+    if listen is None:
+        return None
+    server = RolloutServer(listen, rollouts, weights, first_actor_id, authkey)
+    host, port = server.address
+    console.print(f"Listening for actors at {host}:{port}")
+    return server
+
+
+def _open_trace_store(path: str | None) -> TraceStore | None:
+    return None if path is None else TraceStore.open(Path(path))
+
+
+def _instrument(policy: A2CPolicy, collector: Collector) -> None:
+    """Time the collection, the policy forward and the policy update with `TIMERS`."""
+    policy.forward = TIMERS.timed("policy/forward")(policy.forward)
+    policy.update = TIMERS.timed("policy/update")(policy.update)
+    collector.collect = TIMERS.timed("train/collect")(collector.collect)
+
+
+def _get_env_num(env: gym.Env | BaseVectorEnv) -> int:
+    return len(env) if isinstance(env, BaseVectorEnv) else 1
+
+
+def _get_action_space(env: gym.Env | BaseVectorEnv) -> spaces.Discrete:
+    if isinstance(env, BaseVectorEnv):
+        action_space: spaces.Discrete = env.action_space[0]
+        return action_space
+    return env.action_space
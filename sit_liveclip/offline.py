@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import torch
+
+from sit_liveclip.core.recorder import RESET_ACTION, Recording
+
+
+if TYPE_CHECKING:
+    from typing import Callable, Iterator
+
+    from pathlib import Path
+
+    from sit_liveclip.types import (
+        NDArrayBool,
+        NDArrayInt64,
+        NDArrayFloat32,
+        NDArrayFloat64,
+    )
+
+    DecisionFn = Callable[[torch.Tensor], tuple[torch.Tensor, torch.Tensor]]
+    Decisions = tuple[NDArrayFloat32, NDArrayInt64, NDArrayFloat32]
+
+
+class OfflineEstimate(NamedTuple):
+    num_decisions: int
+    agreement: float  # fraction of logged actions the policy would have taken
+    logged_reward: float  # mean reward per decision of the logged policy
+    ips: float  # importance sampling estimate of the mean reward per decision
+    ips_stderr: float
+    wis: float  # weighted importance sampling
+    dr: float  # doubly robust
+    dr_stderr: float
+    effective_sample_size: float  # of the importance weights
+
+
+def iter_decisions(recording: Recording, chunk_size: int) -> Iterator[Decisions]:
+    """Stream the decisions of a recording as `(obs, action, reward)` chunks.
+
+    A decision is the observation the logged policy acted on, the action it took
+    and the reward that followed: the action and reward of a row pair with the
+    observation of the row before. Rows recorded by reset start a new episode.
+    """
+    columns = recording.columns
+    for start in range(1, len(recording), chunk_size):
+        rows = slice(start, min(start + chunk_size, len(recording)))
+        previous_rows = slice(start - 1, rows.stop - 1)
+        action = np.asarray(columns["action"][rows])
+        keep = action != RESET_ACTION
+        yield (
+            np.ascontiguousarray(columns["obs"][previous_rows][keep]),
+            action[keep],
+            np.asarray(columns["reward"][rows][keep]),
+        )
+
+
+def evaluate_offline(
+    model: DecisionFn,
+    recording_dirs: list[Path],
+    behavior_model: DecisionFn | None = None,
+    greedy: bool = True,
+    chunk_size: int = 1 << 16,
+    min_propensity: float = 1e-3,
+) -> OfflineEstimate:
+    """Estimate the mean reward per decision of `model` from logged sessions.
+
+    The logged policy is `behavior_model` when given, e.g. the checkpoint that
+    played the sessions. Otherwise its propensities are the frequencies of the
+    logged actions, which ignores the observations. They are floored at
+    `min_propensity` to bound the importance weights. The evaluated policy takes
+    the greedy action of `model`, as when served, or samples its probabilities
+    when not `greedy`.
+
+    The doubly robust estimate uses the mean logged reward of each action as
+    its reward model. Recordings are streamed `chunk_size` decisions at a time,
+    the next chunk being read while the current one goes through the models.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    recordings = [Recording(recording_dir) for recording_dir in recording_dirs]
+    if len(recordings) == 0:
+        raise ValueError("No recording to evaluate on.")
+    probe = np.zeros_like(recordings[0].columns["obs"][:1])
+    num_actions = _probs(model, probe)[0].shape[1]
+    action_counts, action_rewards = _count_actions(recordings, num_actions, chunk_size)
+    reward_model = action_rewards / np.maximum(action_counts, 1)
+    action_freqs = action_counts / max(action_counts.sum(), 1)
+
+    sums = dict.fromkeys(("n", "agree", "r", "w", "w2", "wr", "wr2", "dr", "dr2"), 0.0)
+    for obs, action, reward in _prefetch_decisions(recordings, chunk_size):
+        rows = np.arange(len(action))
+        target, greedy_action = _probs(model, obs)
+        if greedy:
+            target = np.eye(num_actions)[greedy_action]
+        if behavior_model is None:
+            propensity = action_freqs[action]
+        else:
+            propensity = _probs(behavior_model, obs)[0][rows, action]
+        weight = target[rows, action] / np.maximum(propensity, min_propensity)
+        direct = target @ reward_model
+        doubly_robust = direct + weight * (reward - reward_model[action])
+        _accumulate(sums, greedy_action == action, reward, weight, doubly_robust)
+
+    num = sums["n"]
+    if num == 0:
+        raise ValueError("The recordings hold no decision.")
+    return OfflineEstimate(
+        num_decisions=int(num),
+        agreement=sums["agree"] / num,
+        logged_reward=sums["r"] / num,
+        ips=sums["wr"] / num,
+        ips_stderr=_stderr(sums["wr"], sums["wr2"], num),
+        wis=sums["wr"] / sums["w"] if sums["w"] > 0 else math.nan,
+        dr=sums["dr"] / num,
+        dr_stderr=_stderr(sums["dr"], sums["dr2"], num),
+        effective_sample_size=sums["w"] ** 2 / sums["w2"] if sums["w2"] > 0 else 0.0,
+    )
+
+
+def estimate_rows(estimate: OfflineEstimate) -> tuple[list[str], list[list[str]]]:
+    """Columns and rows of `estimate`, for `console.print_table`."""
+    columns = ["estimator", "reward per decision", "std error"]
+    rows = [
+        ["logged policy", f"{estimate.logged_reward:.4f}", ""],
+        ["importance sampling", f"{estimate.ips:.4f}", f"{estimate.ips_stderr:.4f}"],
+        ["weighted importance sampling", f"{estimate.wis:.4f}", ""],
+        ["doubly robust", f"{estimate.dr:.4f}", f"{estimate.dr_stderr:.4f}"],
+    ]
+    return columns, rows
+
+
+def _prefetch_decisions(
+    recordings: list[Recording], chunk_size: int
+) -> Iterator[Decisions]:
+    """Non-empty `iter_decisions` chunks of every recording, read one chunk ahead."""
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        for recording in recordings:
+            chunks = iter_decisions(recording, chunk_size)
+            pending = reader.submit(next, chunks, None)
+            while (chunk := pending.result()) is not None:
+                pending = reader.submit(next, chunks, None)
+                if len(chunk[1]) > 0:
+                    yield chunk
+
+
+def _accumulate(
+    sums: dict[str, float],
+    agrees: NDArrayBool,
+    reward: NDArrayFloat32,
+    weight: NDArrayFloat64,
+    doubly_robust: NDArrayFloat64,
+) -> None:
+    """Add the decisions of a chunk to the running sums of `evaluate_offline`."""
+    sums["n"] += len(reward)
+    sums["agree"] += np.count_nonzero(agrees)
+    sums["r"] += reward.sum(dtype="float64")
+    sums["w"] += weight.sum()
+    sums["w2"] += np.square(weight).sum()
+    sums["wr"] += (weight * reward).sum()
+    sums["wr2"] += np.square(weight * reward).sum()
+    sums["dr"] += doubly_robust.sum()
+    sums["dr2"] += np.square(doubly_robust).sum()
+
+
+def _count_actions(
+    recordings: list[Recording],
+    num_actions: int,
+    chunk_size: int,
+) -> tuple[NDArrayFloat64, NDArrayFloat64]:
+    """Number of times each action was logged, and the sum of the rewards it got."""
+    counts = np.zeros(num_actions)
+    rewards = np.zeros(num_actions)
+    for recording in recordings:
+        for start in range(0, len(recording), chunk_size):
+            rows = slice(start, start + chunk_size)
+            action = np.asarray(recording.columns["action"][rows])
+            keep = action != RESET_ACTION
+            counts += np.bincount(action[keep], minlength=num_actions)
+            rewards += np.bincount(
+                action[keep],
+                weights=recording.columns["reward"][rows][keep],
+                minlength=num_actions,
+            )
+    return counts, rewards
+
+
+def _probs(model: DecisionFn, obs: NDArrayFloat32) -> tuple[NDArrayFloat64, NDArrayInt64]:
+    """Action probabilities and greedy actions of `model`."""
+    with torch.inference_mode():
+        actions, probs = model(torch.from_numpy(np.asarray(obs)))
+    return probs.double().numpy(), actions.numpy()
+
+
+def _stderr(total: float, total_squares: float, num: float) -> float:
+    mean = total / num
+    variance = max(total_squares / num - mean**2, 0.0)
+    return math.sqrt(variance / num)
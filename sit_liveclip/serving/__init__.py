@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from sit_liveclip.utils.lazy import lazy_exports
+
+
+# exported by `__getattr__` on first access, see `sit_liveclip.utils.lazy`
+if TYPE_CHECKING:
+    from sit_liveclip.utils.timing import LatencyTracker  # noqa: TC004
+    from sit_liveclip.serving.model import (  # noqa: TC004
+        DecisionModel,
+        load_decision_model,
+        export_decision_model,
+    )
+    from sit_liveclip.serving.batcher import Decision, MicroBatcher  # noqa: TC004
+    from sit_liveclip.serving.distill import (  # noqa: TC004
+        DistilledTree,
+        FidelityReport,
+        load_tree,
+        save_tree,
+        distill_tree,
+        make_decider,
+        fidelity_rows,
+        fidelity_report,
+    )
+    from sit_liveclip.serving.quantize import (  # noqa: TC004
+        QuantizationReport,
+        report_rows,
+        quantize_int8,
+        compare_models,
+        set_num_threads,
+    )
+
+
+__all__ = [
+    "DecisionModel",
+    "load_decision_model",
+    "export_decision_model",
+    "Decision",
+    "MicroBatcher",
+    "LatencyTracker",
+    "QuantizationReport",
+    "report_rows",
+    "quantize_int8",
+    "compare_models",
+    "set_num_threads",
+    "DistilledTree",
+    "FidelityReport",
+    "load_tree",
+    "save_tree",
+    "distill_tree",
+    "make_decider",
+    "fidelity_rows",
+    "fidelity_report",
+]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "sit_liveclip.serving.model": [
+            "DecisionModel",
+            "load_decision_model",
+            "export_decision_model",
+        ],
+        "sit_liveclip.utils.timing": ["LatencyTracker"],
+        "sit_liveclip.serving.batcher": ["Decision", "MicroBatcher"],
+        "sit_liveclip.serving.quantize": [
+            "QuantizationReport",
+            "report_rows",
+            "quantize_int8",
+            "compare_models",
+            "set_num_threads",
+        ],
+        "sit_liveclip.serving.distill": [
+            "DistilledTree",
+            "FidelityReport",
+            "load_tree",
+            "save_tree",
+            "distill_tree",
+            "make_decider",
+            "fidelity_rows",
+            "fidelity_report",
+        ],
+    },
+)
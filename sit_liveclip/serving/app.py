@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import json
+
+from aiohttp import WSMsgType, web
+
+from sit_liveclip.core import wire
+
+
+if TYPE_CHECKING:
+    from sit_liveclip.types import NDArrayFloat32
+    from sit_liveclip.serving.batcher import Decision, MicroBatcher
+    from sit_liveclip.core.observation import ObservationLayout
+
+
+BATCHER_KEY: web.AppKey[MicroBatcher] = web.AppKey("batcher")
+LAYOUT_KEY: web.AppKey[ObservationLayout] = web.AppKey("layout")
+
+
+def make_app(batcher: MicroBatcher, layout: ObservationLayout) -> web.Application:
+    """Serve the decisions of `batcher` to players over HTTP and WebSockets.
+
+    `POST /decide` takes one player state, in the binary wire format or as JSON,
+    and answers `{"action": ..., "probs": [...]}`. `/ws` does the same for every
+    message of a WebSocket, and `GET /stats` reports batch sizes and latencies.
+    """
+    app = web.Application()
+    app[BATCHER_KEY] = batcher
+    app[LAYOUT_KEY] = layout
+    app.add_routes(
+        [
+            web.post("/decide", handle_decide_route),
+            web.get("/ws", handle_decide_socket_route),
+            web.get("/stats", handle_stats_route),
+        ],
+    )
+    app.on_startup.append(_start_batcher)
+    app.on_cleanup.append(_close_batcher)
+    return app
+
+
+def run(
+    batcher: MicroBatcher,
+    layout: ObservationLayout,
+    host: str = "127.0.0.1",
+    port: int = 1235,
+) -> None:
+    web.run_app(make_app(batcher, layout), host=host, port=port)
+
+
+async def handle_decide_route(request: web.Request) -> web.StreamResponse:
+    try:
+        obs = _decode_observation(
+            request.app[LAYOUT_KEY],
+            await request.read(),
+            binary=request.content_type == wire.STATE_MEDIA_TYPE,
+        )
+    except (ValueError, KeyError) as err:
+        raise web.HTTPBadRequest(text=f"Invalid player state: {err!r}") from err
+
+    decision = await request.app[BATCHER_KEY].decide(obs)
+    return web.json_response(_to_json(decision))
+
+
+async def handle_decide_socket_route(request: web.Request) -> web.StreamResponse:
+    """Answer every state received on the WebSocket with a decision, in order."""
+    socket = web.WebSocketResponse()
+    await socket.prepare(request)
+
+    layout = request.app[LAYOUT_KEY]
+    batcher = request.app[BATCHER_KEY]
+    async for message in socket:
+        if message.type not in (WSMsgType.BINARY, WSMsgType.TEXT):
+            continue
+        try:
+            obs = _decode_observation(
+                layout,
+                message.data,
+                binary=message.type == WSMsgType.BINARY,
+            )
+        except (ValueError, KeyError) as err:
+            await socket.send_json({"error": f"Invalid player state: {err!r}"})
+            continue
+
+        await socket.send_json(_to_json(await batcher.decide(obs)))
+
+    return socket
+
+
+async def handle_stats_route(request: web.Request) -> web.StreamResponse:
+    return web.json_response(request.app[BATCHER_KEY].stats())
+
+
+async def _start_batcher(app: web.Application) -> None:
+    app[BATCHER_KEY].start()
+
+
+async def _close_batcher(app: web.Application) -> None:
+    await app[BATCHER_KEY].close()
+
+
+def _decode_observation(
+    layout: ObservationLayout,
+    payload: bytes | str,
+    binary: bool,
+) -> NDArrayFloat32:
+    """Flatten the observation of a player state, wrapped in `{"state": ...}` or not."""
+    if binary:
+        decoded = wire.decode_state(payload)  # type: ignore[arg-type]
+    else:
+        state: dict[str, Any] = json.loads(payload)
+        decoded = wire.decode_state_json(state.get("state", state))
+
+    history_size = decoded.obs["download_speed"].shape[-1]
+    sliding_window_size = decoded.obs["list_video_bitrate"].shape[-1]
+    if (history_size, sliding_window_size) != (
+        layout.history_size,
+        layout.sliding_window_size,
+    ):
+        raise ValueError(
+            f"The model expects a history of {layout.history_size} and a sliding "
+            f"window of {layout.sliding_window_size}, got {history_size} and "
+            f"{sliding_window_size}.",
+        )
+    return layout.flatten(decoded.obs)
+
+
+def _to_json(decision: Decision) -> dict[str, Any]:
+    return {
+        "action": decision.action,
+        "probs": decision.probs.tolist(),
+        "latency": decision.latency,
+    }
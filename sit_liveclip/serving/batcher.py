@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from sit_liveclip.utils.timing import LatencyTracker
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+    from sit_liveclip.types import NDArrayFloat32
+
+    DecisionFn = Callable[[torch.Tensor], tuple[torch.Tensor, torch.Tensor]]
+
+
+class Decision(NamedTuple):
+    action: int
+    probs: NDArrayFloat32
+    latency: float  # seconds between the request and its decision
+
+
+class _Request(NamedTuple):
+    obs: NDArrayFloat32
+    future: asyncio.Future[Decision]
+    start: float
+
+
+class MicroBatcher:
+    """Group concurrent decision requests into batched model calls.
+
+    A batch is run as soon as `max_batch_size` requests are waiting, or
+    `max_wait` seconds after its first request arrived. The model runs in a
+    worker thread, so the next batch fills up while the current one is computed.
+    The request queue belongs to the event loop `start` is called in, or that of
+    the first `decide` otherwise, and is created again in a later event loop.
+    """
+
+    def __init__(
+        self,
+        model: DecisionFn,
+        obs_size: int,
+        max_batch_size: int = 64,
+        max_wait: float = 0.002,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}.")
+
+        self.model = model
+        self.obs_size = obs_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.latency = LatencyTracker()
+        self.num_batches = 0
+        self.num_decisions = 0
+
+        self._batch = torch.empty(max_batch_size, obs_size, dtype=torch.float32)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue: asyncio.Queue[_Request] | None = None
+        self._worker: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Create the request queue and the batching task in the running event loop."""
+        self._started_queue()
+
+    async def decide(self, obs: NDArrayFloat32) -> Decision:
+        """Decide the action of one flat observation."""
+        if obs.shape != (self.obs_size,):
+            raise ValueError(
+                f"Expected an observation of shape ({self.obs_size},), got {obs.shape}.",
+            )
+        queue = self._started_queue()
+        future: asyncio.Future[Decision] = asyncio.get_running_loop().create_future()
+        await queue.put(_Request(obs, future, time.perf_counter()))
+        return await future
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+            self._queue = None
+        self._executor.shutdown()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "decisions": self.num_decisions,
+            "batches": self.num_batches,
+            "mean_batch_size": self.num_decisions / max(self.num_batches, 1),
+            "latency": self.latency.summary(),
+        }
+
+    def _started_queue(self) -> asyncio.Queue[_Request]:
+        # the task of a previous event loop is cancelled when that loop closes
+        if self._queue is None or self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run(self._queue))
+        return self._queue
+
+    async def _run(self, queue: asyncio.Queue[_Request]) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = await self._collect(queue)
+            try:
+                actions, probs = await loop.run_in_executor(
+                    self._executor,
+                    self._infer,
+                    [request.obs for request in requests],
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(err)
+                continue
+
+            self._resolve(requests, actions, probs)
+
+    def _resolve(self, requests: list[_Request], actions: Any, probs: Any) -> None:
+        end = time.perf_counter()
+        for idx, request in enumerate(requests):
+            if not request.future.done():
+                decision = Decision(int(actions[idx]), probs[idx], end - request.start)
+                request.future.set_result(decision)
+                self.latency.add(decision.latency)
+
+        self.num_batches += 1
+        self.num_decisions += len(requests)
+
+    async def _collect(self, queue: asyncio.Queue[_Request]) -> list[_Request]:
+        requests = [await queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(requests) < self.max_batch_size:
+            if not queue.empty():
+                requests.append(queue.get_nowait())
+                continue
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            # unlike `wait_for`, `wait` never loses an item fetched as the time runs out
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter}, timeout=remaining)
+            if not getter.done():
+                getter.cancel()
+                break
+            requests.append(getter.result())
+
+        return requests
+
+    def _infer(self, observations: list[NDArrayFloat32]) -> tuple[Any, Any]:
+        batch = self._batch[: len(observations)]
+        batch.numpy()[:] = observations
+        with torch.inference_mode():
+            actions, probs = self.model(batch)
+        return actions.numpy(), probs.numpy()
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import time
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+import torch
+
+from sit_liveclip.core.observation import OBSERVATION_FIELDS, get_observation_layout
+from sit_liveclip.utils.serializer import serialize, deserialize
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+    from pathlib import Path
+
+    from sit_liveclip.types import NDArrayInt32, NDArrayInt64, NDArrayFloat32
+
+    DecisionFn = Callable[[torch.Tensor], tuple[torch.Tensor, torch.Tensor]]
+
+
+TREE_FORMAT = "sit_liveclip.tree/1"
+
+_LEAF = -1
+
+# node field -> dtype
+_NODE_FIELDS = {
+    "feature": "int32",
+    "threshold": "float32",
+    "left": "int32",
+    "right": "int32",
+    "action": "int32",
+}
+
+
+class DistilledTree(NamedTuple):
+    """Decision tree over flat observations, as run by the player.
+
+    Node 0 is the root. A node with `left[node] == -1` is a leaf deciding
+    `action[node]`, any other node goes to `left[node]` when the observation value
+    at `feature[node]` is at most `threshold[node]`, and to `right[node]` otherwise.
+    """
+
+    history_size: int
+    sliding_window_size: int
+    feature: NDArrayInt32
+    threshold: NDArrayFloat32
+    left: NDArrayInt32
+    right: NDArrayInt32
+    action: NDArrayInt32
+
+    @property
+    def depth(self) -> int:
+        depths = np.zeros(len(self.left), dtype="int32")
+        for node in range(len(self.left)):  # children come after their parent
+            if self.left[node] != _LEAF:
+                depths[[self.left[node], self.right[node]]] = depths[node] + 1
+        return int(depths.max())
+
+    def decide(self, obs: NDArrayFloat32) -> NDArrayInt64:
+        """Actions of a batch of flat observations."""
+        rows = np.arange(len(obs))
+        node = np.zeros(len(obs), dtype="int64")
+        for _ in range(self.depth):
+            go_left = obs[rows, self.feature[node]] <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(self.left[node] == _LEAF, node, child)
+        return self.action[node].astype("int64")
+
+
+class FidelityReport(NamedTuple):
+    name: str  # observations the tree is compared on
+    num_observations: int
+    agreement: float  # fraction of observations with the same action as the policy
+    agreement_per_action: dict[int, float]  # keyed by the action of the policy
+    tree_latency_us: float  # median latency of one decision in plain Python
+    model_latency_us: float  # of the policy on a batch of one
+
+
+def distill_tree(
+    model: DecisionFn,
+    observations: NDArrayFloat32,
+    history_size: int,
+    sliding_window_size: int,
+    max_depth: int = 8,
+    min_samples_leaf: int = 20,
+) -> DistilledTree:
+    """Fit a decision tree to the greedy actions of `model` on flat `observations`.
+
+    Thresholds are stored as float32, rounded down so that float32 observations
+    take the same branches as in the fitted tree.
+    """
+    # pylint: disable=too-many-arguments
+    obs = np.asarray(observations, dtype="float32")
+    with torch.inference_mode():
+        actions, _ = model(torch.from_numpy(obs))
+
+    classifier = DecisionTreeClassifier(
+        max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        random_state=0,
+    )
+    classifier.fit(obs, actions.numpy())
+    tree = classifier.tree_
+
+    threshold = tree.threshold.astype("float32")
+    too_high = threshold > tree.threshold
+    threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+    is_leaf = tree.children_left == _LEAF
+    return DistilledTree(
+        history_size=history_size,
+        sliding_window_size=sliding_window_size,
+        feature=np.where(is_leaf, _LEAF, tree.feature).astype("int32"),
+        threshold=np.where(is_leaf, 0.0, threshold).astype("float32"),
+        left=tree.children_left.astype("int32"),
+        right=tree.children_right.astype("int32"),
+        action=classifier.classes_[tree.value[:, 0].argmax(axis=1)].astype("int32"),
+    )
+
+
+def make_decider(tree: DistilledTree) -> Callable[[list[float]], int]:
+    """Decide on one flat observation in plain Python, as a player would."""
+    feature, threshold = tree.feature.tolist(), tree.threshold.tolist()
+    left, right, action = tree.left.tolist(), tree.right.tolist(), tree.action.tolist()
+
+    def decide(obs: list[float]) -> int:
+        node = 0
+        while left[node] != _LEAF:
+            node = left[node] if obs[feature[node]] <= threshold[node] else right[node]
+        return action[node]  # type: ignore[no-any-return]
+
+    return decide
+
+
+def save_tree(tree: DistilledTree, out_file: Path) -> None:
+    """Save a tree to a `.json` file, or a compact `.npz` one."""
+    if out_file.suffix == ".json":
+        layout = get_observation_layout(tree.history_size, tree.sliding_window_size)
+        data: dict[str, Any] = {
+            "format": TREE_FORMAT,
+            "history_size": tree.history_size,
+            "sliding_window_size": tree.sliding_window_size,
+            "feature_names": [
+                f"{field}[{idx}]"
+                for field in OBSERVATION_FIELDS
+                for idx in range(layout.slices[field].stop - layout.slices[field].start)
+            ],
+            **{field: getattr(tree, field).tolist() for field in _NODE_FIELDS},
+        }
+    else:
+        data = {
+            "history_size": np.int32(tree.history_size),
+            "sliding_window_size": np.int32(tree.sliding_window_size),
+            **{field: getattr(tree, field) for field in _NODE_FIELDS},
+        }
+    serialize(out_file, data, indent=None)
+
+
+def load_tree(input_file: Path) -> DistilledTree:
+    data = deserialize(input_file)
+    if input_file.suffix == ".json" and data.get("format") != TREE_FORMAT:
+        raise ValueError(f"`{input_file}` is not a {TREE_FORMAT} tree.")
+    return DistilledTree(
+        history_size=int(data["history_size"]),
+        sliding_window_size=int(data["sliding_window_size"]),
+        **{
+            field: np.asarray(data[field], dtype=dtype)
+            for field, dtype in _NODE_FIELDS.items()
+        },
+    )
+
+
+def fidelity_report(
+    tree: DistilledTree,
+    model: DecisionFn,
+    observations: dict[str, NDArrayFloat32],
+    repeat: int = 1000,
+) -> list[FidelityReport]:
+    """Compare the actions of `tree` and `model` on each set of `observations`."""
+    decide = make_decider(tree)
+    reports = []
+    for name, obs in observations.items():
+        obs = np.asarray(obs, dtype="float32")
+        with torch.inference_mode():
+            expected = model(torch.from_numpy(obs))[0].numpy()
+        agree = tree.decide(obs) == expected
+
+        reports.append(
+            FidelityReport(
+                name=name,
+                num_observations=len(obs),
+                agreement=float(agree.mean()),
+                agreement_per_action={
+                    int(action): float(agree[expected == action].mean())
+                    for action in np.unique(expected)
+                },
+                tree_latency_us=_median_latency_us(decide, obs[0].tolist(), repeat),
+                model_latency_us=_median_latency_us(
+                    torch.inference_mode()(model),
+                    torch.from_numpy(obs[:1]),
+                    repeat // 10,
+                ),
+            ),
+        )
+    return reports
+
+
+def fidelity_rows(reports: list[FidelityReport]) -> tuple[list[str], list[list[str]]]:
+    """Columns and rows of `reports`, for `console.print_table`."""
+    actions = sorted(
+        {action for report in reports for action in report.agreement_per_action}
+    )
+    columns = [
+        "split",
+        "count",
+        "agreement",
+        *(f"action {action}" for action in actions),
+        "tree (µs)",
+        "policy (µs)",
+    ]
+    rows = []
+    for report in reports:
+        row = [
+            report.name,
+            str(report.num_observations),
+            f"{report.agreement:.2%}",
+            *(
+                f"{report.agreement_per_action[action]:.2%}"
+                if action in report.agreement_per_action
+                else ""
+                for action in actions
+            ),
+            f"{report.tree_latency_us:.1f}",
+            f"{report.model_latency_us:.1f}",
+        ]
+        rows.append(row)
+    return columns, rows
+
+
+def _median_latency_us(func: Callable[[Any], Any], arg: Any, repeat: int) -> float:
+    latencies = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        func(arg)
+        latencies.append(time.perf_counter() - start)
+    return 1e6 * float(np.median(latencies))
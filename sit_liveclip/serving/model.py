@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import torch
+from torch import nn
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from sit_liveclip.core.observation import ObservationLayout
+
+
+class DecisionModel(nn.Module):
+    """Greedy decisions of a trained actor for a batch of flat observations.
+
+    `forward` maps a `(batch_size, layout.size)` float32 tensor to the chosen
+    actions and the action probabilities, as `A2CPolicy` does with
+    `deterministic_eval`.
+    """
+
+    def __init__(self, actor: nn.Module) -> None:
+        super().__init__()
+        self.actor = actor
+
+    def forward(self, obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        probs, _ = self.actor(obs)
+        return probs.argmax(dim=-1), probs
+
+
+def export_decision_model(
+    actor: nn.Module,
+    layout: ObservationLayout,
+    out_file: Path,
+) -> torch.jit.ScriptModule:
+    """Trace the actor into a TorchScript `DecisionModel` saved to `out_file`.
+
+    The exported model runs without the Python classes of this package, and
+    accepts any batch size. The folded weights of `PreprocessNet` are baked in.
+    """
+    model = DecisionModel(actor).eval()
+    example = torch.zeros(2, layout.size)
+    with torch.no_grad():
+        model(example)  # fold the weights before they are traced as constants
+        scripted: torch.jit.ScriptModule = torch.jit.trace(model, example)  # type: ignore
+    scripted.save(str(out_file))  # type: ignore
+    return scripted
+
+
+def load_decision_model(model_file: Path) -> torch.jit.ScriptModule:
+    scripted: torch.jit.ScriptModule = torch.jit.load(  # type: ignore
+        str(model_file),
+        map_location="cpu",
+    )
+    return scripted.eval()
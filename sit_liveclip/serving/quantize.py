@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import copy
+import time
+import contextlib
+
+import numpy as np
+
+import torch
+from torch import nn
+from torch.ao.quantization import quantize_dynamic
+
+from sit_liveclip.core.network import PreprocessNet
+
+
+if TYPE_CHECKING:
+    from typing import Any, TypeVar, Callable
+
+    from sit_liveclip.types import NDArrayFloat32
+
+    ModuleT = TypeVar("ModuleT", bound=nn.Module)
+    DecisionFn = Callable[[torch.Tensor], tuple[torch.Tensor, torch.Tensor]]
+
+
+class QuantizationReport(NamedTuple):
+    name: str
+    agreement: float  # fraction of observations with the same greedy action
+    max_prob_error: float
+    latency_ms: dict[int, float]  # batch size -> median latency of one call
+
+
+def quantize_int8(module: ModuleT, include_preprocess: bool = True) -> ModuleT:
+    """Copy a policy, actor or critic with its linear layers quantized to int8.
+
+    Weights are quantized ahead of time and activations on the fly, per batch.
+    With `include_preprocess`, every `PreprocessNet` is folded into a linear layer,
+    so it is quantized too, otherwise it is shared with `module`. The copy is meant
+    for CPU inference only.
+    """
+    # weight-normalized modules cannot be deep-copied, so they are swapped for
+    # their folded copy or shared as is
+    memo: dict[int, Any] = {
+        id(net): net.fold() if include_preprocess else net
+        for net in module.modules()
+        if isinstance(net, PreprocessNet)
+    }
+    module = copy.deepcopy(module, memo).cpu().eval()
+    for submodule in module.modules():
+        if hasattr(submodule, "device"):
+            submodule.device = "cpu"
+
+    quantized: ModuleT = quantize_dynamic(
+        module,
+        {nn.Linear},
+        dtype=torch.qint8,
+        inplace=True,
+    )
+    return quantized
+
+
+def set_num_threads(num_threads: int | None) -> None:
+    """Use `num_threads` intra-op threads, and a single inter-op thread.
+
+    Inference batches are small, so the inter-op pool is never busy, while the
+    intra-op pool should match the physical cores reserved for the process.
+    """
+    if num_threads is None:
+        return
+    torch.set_num_threads(num_threads)
+    with contextlib.suppress(RuntimeError):  # the inter-op pool is fixed once used
+        torch.set_num_interop_threads(1)
+
+
+def compare_models(
+    reference: DecisionFn,
+    candidates: dict[str, DecisionFn],
+    observations: NDArrayFloat32,
+    batch_sizes: tuple[int, ...] = (1, 16, 256),
+    repeat: int = 50,
+) -> list[QuantizationReport]:
+    """Measure the agreement and latency of `candidates` against `reference`.
+
+    `observations` are flat observations, e.g. the `obs` column of a `Recording`.
+    """
+    obs = torch.as_tensor(np.asarray(observations, dtype="float32"))
+    with torch.inference_mode():
+        ref_actions, ref_probs = reference(obs)
+
+    return [
+        _report(
+            name,
+            model,
+            obs,
+            (ref_actions, ref_probs),
+            batch_sizes,
+            repeat,
+        )
+        for name, model in {"fp32": reference, **candidates}.items()
+    ]
+
+
+def _report(
+    name: str,
+    model: DecisionFn,
+    obs: torch.Tensor,
+    reference: tuple[torch.Tensor, torch.Tensor],
+    batch_sizes: tuple[int, ...],
+    repeat: int,
+) -> QuantizationReport:
+    # pylint: disable=too-many-arguments
+    with torch.inference_mode():
+        actions, probs = model(obs)
+    ref_actions, ref_probs = reference
+
+    return QuantizationReport(
+        name=name,
+        agreement=float((actions == ref_actions).float().mean()),
+        max_prob_error=float((probs - ref_probs).abs().max()),
+        latency_ms={
+            batch_size: _median_latency(model, obs[:batch_size], repeat)
+            for batch_size in batch_sizes
+            if batch_size <= len(obs)
+        },
+    )
+
+
+def _median_latency(model: DecisionFn, obs: torch.Tensor, repeat: int) -> float:
+    latencies = []
+    with torch.inference_mode():
+        model(obs)  # warm up
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(obs)
+            latencies.append(time.perf_counter() - start)
+    return 1e3 * float(np.median(latencies))
+
+
+def report_rows(reports: list[QuantizationReport]) -> tuple[list[str], list[list[str]]]:
+    """Columns and rows of `reports`, for `console.print_table`."""
+    batch_sizes = sorted({size for report in reports for size in report.latency_ms})
+    columns = [
+        "model",
+        "agreement",
+        "max prob error",
+        *(f"batch {size} (ms)" for size in batch_sizes),
+    ]
+    rows = []
+    for report in reports:
+        row = [
+            report.name,
+            f"{report.agreement:.2%}",
+            f"{report.max_prob_error:.4f}",
+            *(f"{report.latency_ms.get(size, float('nan')):.3f}" for size in batch_sizes),
+        ]
+        rows.append(row)
+    return columns, rows
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+import os
+import math
+import time
+import random
+import itertools
+import traceback
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sit_liveclip import experiment
+from sit_liveclip.utils import console
+from sit_liveclip.config import override_config
+from sit_liveclip.serving import set_num_threads
+from sit_liveclip.utils.serializer import serialize
+
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from pathlib import Path
+
+    from sit_liveclip.config import Config
+
+
+class SweepRun(NamedTuple):
+    name: str  # also the name of its log dir
+    overrides: dict[str, Any]
+    reward: float | None  # mean evaluation reward, None if the run failed
+    reward_std: float | None
+    train_steps: int | None
+    duration: float  # seconds
+    error: str | None = None
+
+
+def expand_grid(space: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    """Every combination of the values of `space`, a map from fields to values.
+
+    >>> expand_grid({"batch_size": [64, 128], "conv1d_out": [4]})
+    [{'batch_size': 64, 'conv1d_out': 4}, {'batch_size': 128, 'conv1d_out': 4}]
+    """
+    _check_space(space)
+    return [dict(zip(space, values)) for values in itertools.product(*space.values())]
+
+
+def sample_grid(
+    space: dict[str, list[Any]],
+    num_samples: int,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Draw `num_samples` distinct combinations of the values of `space` at random.
+
+    Combinations are decoded from their index in the grid, so large grids are
+    never expanded. All of them are returned if there are less than `num_samples`.
+    """
+    _check_space(space)
+    sizes = [len(values) for values in space.values()]
+    num_combinations = math.prod(sizes)
+    indices = random.Random(seed).sample(
+        range(num_combinations),
+        min(num_samples, num_combinations),
+    )
+
+    samples = []
+    for index in indices:
+        sample = {}
+        for (field, values), size in zip(reversed(space.items()), reversed(sizes)):
+            index, value_index = divmod(index, size)
+            sample[field] = values[value_index]
+        samples.append({field: sample[field] for field in space})
+    return samples
+
+
+def run_sweep(
+    env_name: str,
+    base_config: Config,
+    variants: list[dict[str, Any]],
+    out_dir: Path,
+    max_workers: int | None = None,
+    threads_per_run: int = 1,
+) -> list[SweepRun]:
+    """Train and evaluate one policy per variant of `base_config`, in parallel.
+
+    Every run gets its own process with `threads_per_run` torch threads, and logs
+    to `out_dir / "run-<i>"`. By default, as many runs as the cores allow are run at
+    once. The runs are returned best reward first, failed ones last.
+    """
+    # pylint: disable=too-many-arguments
+    for variant in variants:
+        override_config(base_config, variant)  # fail before any process is started
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_run)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    runs = []
+    # forked workers would inherit the torch thread pools of this process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers,
+        mp_context=context,
+        initializer=set_num_threads,
+        initargs=(threads_per_run,),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _run,
+                env_name,
+                base_config,
+                variant,
+                out_dir / f"run-{idx:03d}",
+            )
+            for idx, variant in enumerate(variants)
+        ]
+        for future in console.track(
+            as_completed(futures),
+            description="Sweeping...",
+            total=len(futures),
+        ):
+            runs.append(future.result())
+
+    runs.sort(key=lambda run: (run.reward is None, -(run.reward or 0.0)))
+    serialize(out_dir / "summary.jsonl", (run._asdict() for run in runs))
+    return runs
+
+
+def sweep_rows(runs: list[SweepRun]) -> tuple[list[str], list[list[str]]]:
+    """Columns and rows of `runs`, for `console.print_table`."""
+    fields = list(dict.fromkeys(field for run in runs for field in run.overrides))
+    columns = ["run", *fields, "reward", "train steps", "duration"]
+    rows = []
+    for run in runs:
+        row = [
+            run.name,
+            *(str(run.overrides.get(field, "")) for field in fields),
+            "failed"
+            if run.reward is None
+            else f"{run.reward:.3f} ± {run.reward_std:.3f}",
+            "" if run.train_steps is None else str(run.train_steps),
+            f"{run.duration:.0f}s",
+        ]
+        rows.append(row)
+    return columns, rows
+
+
+def _run(
+    env_name: str,
+    base_config: Config,
+    overrides: dict[str, Any],
+    log_dir: Path,
+) -> SweepRun:
+    """Train then evaluate in a worker process, with the output sent to `run.log`."""
+    start = time.perf_counter()
+    log_dir.mkdir(parents=True, exist_ok=True)
+    config = override_config(base_config, overrides)
+    serialize(log_dir / "config.json", config._asdict())
+
+    with open(log_dir / "run.log", "w", encoding="utf-8") as log_file:
+        try:
+            with contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(
+                log_file,
+            ):
+                train_result = experiment.train(
+                    experiment.make_local_env(env_name, config),
+                    log_dir,
+                    config,
+                )
+                summary = experiment.evaluate(
+                    experiment.make_local_env(env_name, config),
+                    log_dir / "policy.pth",
+                    config,
+                )
+        except Exception as err:  # pylint: disable=broad-except
+            traceback.print_exc(file=log_file)
+            return SweepRun(
+                log_dir.name,
+                overrides,
+                reward=None,
+                reward_std=None,
+                train_steps=None,
+                duration=time.perf_counter() - start,
+                error=repr(err),
+            )
+
+    return SweepRun(
+        log_dir.name,
+        overrides,
+        reward=summary["reward"]["mean"],
+        reward_std=summary["reward"]["std"],
+        train_steps=int(train_result["train_step"]),
+        duration=time.perf_counter() - start,
+    )
+
+
+def _check_space(space: dict[str, list[Any]]) -> None:
+    for field, values in space.items():
+        if not isinstance(values, list) or len(values) == 0:
+            raise ValueError(f"`{field}` should have a non-empty list of values.")
@@ -9,6 +9,8 @@ if TYPE_CHECKING:
     import numpy as np
     from numpy.typing import NDArray
 
+    NDArrayBool: TypeAlias = NDArray[np.bool_]
+
     NDArrayInt: TypeAlias = NDArray[np.int_]
     NDArrayUInt8: TypeAlias = NDArray[np.uint8]
     NDArrayInt32: TypeAlias = NDArray[np.int32]
@@ -1,8 +1,34 @@
-from sit_liveclip.utils import serializer
-from sit_liveclip.utils.console import console
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from sit_liveclip.utils.lazy import lazy_exports
+
+
+# exported by `__getattr__` on first access, see `sit_liveclip.utils.lazy`
+if TYPE_CHECKING:
+    from sit_liveclip.utils import serializer  # noqa: TC004
+    from sit_liveclip.utils.timing import TIMERS, Timers, format_metrics  # noqa: TC004
+    from sit_liveclip.utils.console import console  # noqa: TC004
+    from sit_liveclip.utils.trace_store import TraceStore, pack_traces  # noqa: TC004
 
 
 __all__ = [
     "serializer",
     "console",
+    "TraceStore",
+    "pack_traces",
+    "TIMERS",
+    "Timers",
+    "format_metrics",
 ]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "sit_liveclip.utils.timing": ["TIMERS", "Timers", "format_metrics"],
+        "sit_liveclip.utils.console": ["console"],
+        "sit_liveclip.utils.trace_store": ["TraceStore", "pack_traces"],
+    },
+    submodules=("serializer",),
+)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import importlib
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable
+
+
+def lazy_exports(
+    package: str,
+    exports: dict[str, list[str]],
+    submodules: tuple[str, ...] = (),
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """Module `__getattr__` and `__dir__` importing the exports of a package on use.
+
+    `exports` maps modules to the names the package re-exports from them, which
+    are imported on first access (PEP 562). Importing a light module of the
+    package then no longer pays for the torch, tianshou or gym imports of its
+    siblings.
+    """
+    modules = {name: module for module, names in exports.items() for name in names}
+    modules.update({name: f"{package}.{name}" for name in submodules})
+    package_globals = importlib.import_module(package).__dict__
+
+    def __getattr__(name: str) -> Any:
+        module_name = modules.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        module = importlib.import_module(module_name)
+        value = module if name in submodules else getattr(module, name)
+        package_globals[name] = value  # later accesses skip `__getattr__`
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted({*package_globals, *modules})
+
+    return __getattr__, __dir__
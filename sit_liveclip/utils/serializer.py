@@ -2,41 +2,66 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+import os
 import json
 import pickle as pkl
+import struct
 
 import numpy as np
 
 
 if TYPE_CHECKING:
-    from typing import Any
+    from types import TracebackType
+    from typing import Any, Literal, Callable, Iterable, Iterator
 
     from pathlib import Path
 
+    from numpy.typing import ArrayLike, DTypeLike
 
-def serialize(out_file: Path, data: Any) -> None:
-    """Save data to a binary file in numpy `.npy`, pickle `.pkl`, or `.json` format."""
+
+SUPPORTED_FORMATS = ".npy, .npz, .pkl, .json, .jsonl"
+
+# `.npy` headers written by `NpyAppender` have a fixed size, so the shape can be
+# rewritten in place while the file grows
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_SIZE = 128
+
+
+def serialize(out_file: Path, data: Any, indent: int | None = 2) -> None:
+    """Save data to numpy `.npy`/`.npz`, pickle `.pkl`, `.json` or `.jsonl` files.
+
+    `.npz` expects a dict of arrays and compresses them. `.jsonl` expects an
+    iterable of records and writes them one per line as they come.
+    """
     file_format = out_file.suffix
 
-    if file_format == ".npy":
-        np.save(out_file, data)
-    elif file_format == ".pkl":
-        with open(out_file, "wb") as file:
-            pkl.dump(data, file)
-    elif file_format == ".json":
-        out_file.write_text(json.dumps(data, indent=2), encoding="utf-8")
-    else:
+    if file_format == ".json":
+        out_file.write_text(json.dumps(data, indent=indent), encoding="utf-8")
+        return
+
+    if file_format not in _WRITERS:
         raise ValueError(
-            f"`{file_format}` is not supported. Supported formats: .npy, .pkl, .json",
+            f"`{file_format}` is not supported. Supported formats: {SUPPORTED_FORMATS}",
         )
+    _WRITERS[file_format](out_file, data)
+
 
+def deserialize(
+    input_file: Path,
+    mmap_mode: Literal["r", "r+", "c"] | None = None,
+) -> Any:
+    """Load data from numpy `.npy`/`.npz`, pickle `.pkl`, `.json` or `.jsonl` files.
 
-def deserialize(input_file: Path) -> Any:
-    """Load data from numpy `.npy`, pickle `.pkl`, or `.json` files."""
+    `.npy` files can be memory-mapped with `mmap_mode`. `.npz` files are opened
+    lazily: each array is only read when its key is accessed.
+    """
     file_format = input_file.suffix
 
-    if file_format == ".npy":
-        return np.load(input_file)
+    if mmap_mode is not None and file_format != ".npy":
+        raise ValueError(f"`mmap_mode` is only supported for .npy, not `{file_format}`")
+
+    if file_format in (".npy", ".npz"):
+        return np.load(input_file, mmap_mode=mmap_mode)
 
     if file_format == ".pkl":
         with open(input_file, "rb") as file:
@@ -45,6 +70,175 @@ def deserialize(input_file: Path) -> Any:
     if file_format == ".json":
         return json.loads(input_file.read_text())
 
+    if file_format == ".jsonl":
+        return list(iter_json_lines(input_file))
+
     raise ValueError(
-        f"`{file_format}` is not supported. Supported formats: .npy, .pkl, .json",
+        f"`{file_format}` is not supported. Supported formats: {SUPPORTED_FORMATS}",
     )
+
+
+def iter_json_lines(input_file: Path) -> Iterator[Any]:
+    """Stream the records of a `.jsonl` file one at a time."""
+    with open(input_file, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class JsonLinesWriter:
+    """Append records to a `.jsonl` file, one compact JSON document per line."""
+
+    def __init__(self, out_file: Path, append: bool = False) -> None:
+        # open until `close`, which the context manager calls on errors
+        self.file = open(  # noqa: SIM115 pylint: disable=consider-using-with
+            out_file,
+            "a" if append else "w",
+            encoding="utf-8",
+        )
+
+    def write(self, record: Any) -> None:
+        self.file.write(json.dumps(record, separators=(",", ":")))
+        self.file.write("\n")
+
+    def write_all(self, records: Iterable[Any]) -> None:
+        for record in records:
+            self.write(record)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> JsonLinesWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class NpyAppender:
+    """Grow a `.npy` file along its first axis, chunk by chunk.
+
+    Rows are appended to the end of the file and the header is rewritten with the
+    new length on `flush`, so the file stays a valid `.npy` that can be read, or
+    memory-mapped with `deserialize(..., mmap_mode="r")`, while it is being
+    written. Opening an existing file appends to it.
+    """
+
+    def __init__(
+        self,
+        out_file: Path,
+        dtype: DTypeLike,
+        row_shape: tuple[int, ...] = (),
+    ) -> None:
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.num_rows = self._existing_rows(out_file)
+        header = self._header()  # fails before the file is opened
+
+        # open until `close`, which the context manager calls on errors
+        self.file = open(  # noqa: SIM115 pylint: disable=consider-using-with
+            out_file,
+            "r+b" if self.num_rows > 0 else "w+b",
+        )
+        try:
+            # drop rows written after the last flush, if any
+            self.file.write(header)
+            self.file.truncate(_NPY_HEADER_SIZE + self.num_rows * self._row_nbytes)
+            self.file.seek(0, os.SEEK_END)
+        except BaseException:
+            self.file.close()
+            raise
+
+    def append(self, rows: ArrayLike) -> None:
+        chunk = np.ascontiguousarray(rows, dtype=self.dtype).reshape(-1, *self.row_shape)
+        self.file.write(chunk.tobytes())
+        self.num_rows += len(chunk)
+
+    def flush(self) -> None:
+        end = self.file.tell()
+        self.file.seek(0)
+        self.file.write(self._header())
+        self.file.seek(end)
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> NpyAppender:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _existing_rows(self, out_file: Path) -> int:
+        """Number of rows of `out_file`, checking that they can be appended to."""
+        if not out_file.exists() or out_file.stat().st_size == 0:
+            return 0
+
+        existing = np.load(out_file, mmap_mode="r")
+        if existing.dtype != self.dtype or existing.shape[1:] != self.row_shape:
+            raise ValueError(
+                f"Cannot append {self.dtype}{self.row_shape} rows to `{out_file}` "
+                f"holding {existing.dtype}{existing.shape[1:]} rows.",
+            )
+        if existing.offset != _NPY_HEADER_SIZE:
+            raise ValueError(f"`{out_file}` was not written by NpyAppender.")
+        return int(existing.shape[0])
+
+    @property
+    def _row_nbytes(self) -> int:
+        return int(self.dtype.itemsize * np.prod(self.row_shape, dtype="int64"))
+
+    def _header(self) -> bytes:
+        header = repr(
+            {
+                "descr": np.lib.format.dtype_to_descr(self.dtype),
+                "fortran_order": False,
+                "shape": (self.num_rows, *self.row_shape),
+            },
+        )
+        header_len = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2
+        if len(header) >= header_len:
+            raise ValueError(f"Row shape {self.row_shape} is too large for .npy appends.")
+
+        return (
+            _NPY_MAGIC
+            + struct.pack("<H", header_len)
+            + (header.ljust(header_len - 1) + "\n").encode("latin1")
+        )
+
+
+def _save_npz(out_file: Path, data: Any) -> None:
+    np.savez_compressed(out_file, **data)
+
+
+def _save_pkl(out_file: Path, data: Any) -> None:
+    with open(out_file, "wb") as file:
+        pkl.dump(data, file)
+
+
+def _save_jsonl(out_file: Path, data: Any) -> None:
+    with JsonLinesWriter(out_file) as writer:
+        writer.write_all(data)
+
+
+# file format -> function saving data to it, besides `.json`
+_WRITERS: dict[str, Callable[[Path, Any], None]] = {
+    ".npy": np.save,
+    ".npz": _save_npz,
+    ".pkl": _save_pkl,
+    ".jsonl": _save_jsonl,
+}
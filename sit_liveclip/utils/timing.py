@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import re
+import time
+import functools
+import threading
+from contextlib import nullcontext, contextmanager
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from typing import Any, TypeVar, Callable, Iterator, ContextManager
+
+    from sit_liveclip.types import NDArrayFloat64
+
+    FuncT = TypeVar("FuncT", bound=Callable[..., Any])
+
+
+PERCENTILES = (50, 90, 99)
+
+_DISABLED = nullcontext()
+
+
+class LatencyTracker:
+    """Percentiles of the last `window` latencies, in O(1) memory."""
+
+    def __init__(self, window: int = 10_000) -> None:
+        self.latencies: NDArrayFloat64 = np.zeros(window, dtype="float64")
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, latency: float) -> None:
+        self.latencies[self.count % len(self.latencies)] = latency
+        self.count += 1
+        self.total += latency
+
+    def values(self) -> NDArrayFloat64:
+        """The latencies in the window, in seconds and in no particular order."""
+        return self.latencies[: min(self.count, len(self.latencies))]
+
+    def summary(self, percentiles: tuple[int, ...] = (50, 99)) -> dict[str, float]:
+        latencies = self.values()
+        if len(latencies) == 0:
+            return {"count": 0, **{f"p{q}_ms": 0.0 for q in percentiles}}
+
+        values = np.percentile(latencies, percentiles)
+        return {
+            "count": self.count,
+            **{f"p{q}_ms": 1e3 * value for q, value in zip(percentiles, values)},
+        }
+
+
+class Timers:
+    """Named latency trackers around the hot paths of training and serving.
+
+    Timers are disabled by default: `time` then returns a shared no-op context
+    manager and functions decorated with `timed` are called directly, so the
+    instrumented code only pays for a flag check.
+
+    >>> timers = Timers()
+    >>> with timers.time("step"):
+    ...     pass
+    >>> timers.summary()
+    {}
+    """
+
+    def __init__(self, window: int = 10_000) -> None:
+        self.enabled = False
+        self.window = window
+        self.trackers: dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+
+    def time(self, name: str) -> ContextManager[None]:
+        """Time the body of a `with` block as `name`."""
+        if not self.enabled:
+            return _DISABLED
+        return self._time(name)
+
+    def timed(self, name: str) -> Callable[[FuncT], FuncT]:
+        """Decorate a function to time each of its calls as `name`."""
+
+        def decorator(func: FuncT) -> FuncT:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add(name, time.perf_counter() - start)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            tracker = self.trackers.get(name)
+            if tracker is None:
+                tracker = self.trackers[name] = LatencyTracker(self.window)
+            tracker.add(seconds)
+
+    def items(self) -> list[tuple[str, LatencyTracker]]:
+        """The trackers sorted by name, safe to iterate while timers are added."""
+        with self._lock:
+            return sorted(self.trackers.items())
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {name: tracker.summary(PERCENTILES) for name, tracker in self.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.trackers.clear()
+
+    @contextmanager
+    def _time(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+
+# shared by every instrumented module, enabled with `--timing`
+TIMERS = Timers()
+
+
+def format_metrics(
+    timers: Timers,
+    counters: dict[str, float] | None = None,
+    prefix: str = "liveclip",
+) -> str:
+    """Render timers as summaries, and counters as gauges, in the Prometheus text format.
+
+    >>> timers = Timers()
+    >>> timers.add("env/step", 0.5)
+    >>> print(format_metrics(timers, {"sessions": 1}), end="")
+    # TYPE liveclip_sessions gauge
+    liveclip_sessions 1
+    # TYPE liveclip_env_step_seconds summary
+    liveclip_env_step_seconds{quantile="0.5"} 0.5
+    liveclip_env_step_seconds{quantile="0.9"} 0.5
+    liveclip_env_step_seconds{quantile="0.99"} 0.5
+    liveclip_env_step_seconds_sum 0.5
+    liveclip_env_step_seconds_count 1
+    """
+    lines = []
+    for name, value in (counters or {}).items():
+        metric = _metric_name(prefix, name)
+        lines += [f"# TYPE {metric} gauge", f"{metric} {value:g}"]
+
+    for name, tracker in timers.items():
+        metric = _metric_name(prefix, name) + "_seconds"
+        quantiles = np.percentile(tracker.values(), PERCENTILES)
+        lines.append(f"# TYPE {metric} summary")
+        lines += [
+            f'{metric}{{quantile="{q / 100:g}"}} {value:g}'
+            for q, value in zip(PERCENTILES, quantiles)
+        ]
+        lines += [f"{metric}_sum {tracker.total:g}", f"{metric}_count {tracker.count}"]
+
+    return "".join(f"{line}\n" for line in lines)
+
+
+def _metric_name(prefix: str, name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pathlib import Path
+
+import numpy as np
+
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable
+
+    from numpy.typing import ArrayLike
+
+    from sit_liveclip.types import NDArrayInt64, NDArrayFloat32
+
+
+# File layout: magic | float32 data of all traces | int64 offsets | int64 footer.
+# The footer holds the number of traces, so traces can be packed one at a time.
+_MAGIC = b"LCTRACE1"
+_DATA_DTYPE = np.dtype("<f4")
+_INDEX_DTYPE = np.dtype("<i8")
+
+
+def pack_traces(out_file: Path, traces: Iterable[ArrayLike]) -> int:
+    """Pack 1-D traces into one `TraceStore` file and return the number of traces.
+
+    Traces are written as they come, so the corpus never has to fit in memory.
+    """
+    offsets = [0]
+    with open(out_file, "wb") as file:
+        file.write(_MAGIC)
+        for trace in traces:
+            data = np.asarray(trace, dtype=_DATA_DTYPE).ravel()
+            file.write(data.tobytes())
+            offsets.append(offsets[-1] + len(data))
+
+        file.write(np.asarray(offsets, dtype=_INDEX_DTYPE).tobytes())
+        file.write(np.asarray([len(offsets) - 1], dtype=_INDEX_DTYPE).tobytes())
+
+    return len(offsets) - 1
+
+
+class TraceStore:
+    """Variable-length 1-D traces stored back to back in one float32 array.
+
+    Stores opened with `TraceStore.open` are memory-mapped read-only: only the
+    pages of sampled windows are read, and worker processes opening the same file
+    share them through the page cache. Pickling a mapped store sends its path only.
+    """
+
+    def __init__(
+        self,
+        data: NDArrayFloat32,
+        offsets: NDArrayInt64,
+        path: Path | None = None,
+    ) -> None:
+        self.data = data
+        self.offsets = offsets
+        self.lengths = np.diff(offsets)
+        self.path = path
+        self._eligible: dict[int, NDArrayInt64] = {}
+
+    @classmethod
+    def open(cls, path: Path) -> TraceStore:
+        path = Path(path)
+        with open(path, "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"`{path}` is not a trace store file.")
+
+            file.seek(-_INDEX_DTYPE.itemsize, 2)
+            (num_traces,) = np.frombuffer(file.read(_INDEX_DTYPE.itemsize), _INDEX_DTYPE)
+
+            index_size = (num_traces + 1) * _INDEX_DTYPE.itemsize
+            file.seek(-_INDEX_DTYPE.itemsize - index_size, 2)
+            offsets = np.frombuffer(file.read(index_size), dtype=_INDEX_DTYPE)
+
+        data = np.memmap(
+            path,
+            dtype=_DATA_DTYPE,
+            mode="r",
+            offset=len(_MAGIC),
+            shape=(int(offsets[-1]),),
+        )
+        return cls(data, offsets.astype("int64"), path=path)
+
+    @classmethod
+    def from_traces(cls, traces: Iterable[ArrayLike]) -> TraceStore:
+        """Build an in-memory store, e.g. from an `(num_traces, length)` array."""
+        arrays = [np.asarray(trace, dtype=_DATA_DTYPE).ravel() for trace in traces]
+        offsets = np.zeros(len(arrays) + 1, dtype="int64")
+        np.cumsum([len(array) for array in arrays], out=offsets[1:])
+        data = np.concatenate(arrays) if arrays else np.zeros(0, dtype=_DATA_DTYPE)
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __getitem__(self, idx: int) -> NDArrayFloat32:
+        start, stop = self.offsets[idx], self.offsets[idx + 1]
+        trace: NDArrayFloat32 = self.data[start:stop]
+        return trace
+
+    def __getstate__(self) -> dict[str, Any]:
+        if self.path is None:
+            return self.__dict__
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        if "data" in state:
+            self.__dict__.update(state)
+        else:
+            self.__dict__.update(TraceStore.open(state["path"]).__dict__)
+
+    def sample_windows(
+        self,
+        rng: np.random.Generator,
+        num_windows: int,
+        window_size: int,
+    ) -> NDArrayFloat32:
+        """Sample `num_windows` random windows of `window_size` consecutive values.
+
+        Each window costs O(1): a trace is drawn uniformly among those long enough,
+        then a start position uniformly within it.
+        """
+        if window_size not in self._eligible:
+            self._eligible[window_size] = np.flatnonzero(self.lengths >= window_size)
+        eligible = self._eligible[window_size]
+        if len(eligible) == 0:
+            raise ValueError(f"No trace is at least {window_size} values long.")
+
+        trace_idx = eligible[rng.integers(len(eligible), size=num_windows)]
+        starts = self.offsets[trace_idx] + rng.integers(
+            self.lengths[trace_idx] - window_size + 1,
+        )
+        windows: NDArrayFloat32 = self.data[starts[:, None] + np.arange(window_size)]
+        return windows
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from sit_liveclip.core import wire
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+HISTORY_SIZE = 8
+SLIDING_WINDOW_SIZE = 3
+
+PLAYER_STATE = {
+    "status": False,
+    "wastage_cost": 0.25,
+    "download_speed": [1200.0 + 10 * idx for idx in range(HISTORY_SIZE)],
+    "user_staying_time": [15.0 + idx for idx in range(HISTORY_SIZE)],
+    "play_progress": 12.0,
+    "current_staying_time": 13.5,
+    "replay_round": 0,
+    "list_video_bitrate": [1000.0] * SLIDING_WINDOW_SIZE,
+    "list_video_length": [60.0] * SLIDING_WINDOW_SIZE,
+    "list_buffered_content": [20.0, 8.0, 2.0],
+    "list_time_spent_downloading_videos": [4.0, 2.0, 1.0],
+    "list_completed_videos": [0.0, 0.0, 0.0],
+}
+
+
+class _StubPlayerHandler(BaseHTTPRequestHandler):
+    """Answer every `/state` and `/step` request with the same pre-encoded state."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, as a real player would
+    disable_nagle_algorithm = True  # headers and body are written separately
+    payloads = {
+        wire.JSON_MEDIA_TYPE: json.dumps(PLAYER_STATE).encode(),
+        wire.STATE_MEDIA_TYPE: wire.encode_state(PLAYER_STATE),
+    }
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._send_state()
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send_state()
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+    def _send_state(self) -> None:
+        media_type = (
+            wire.STATE_MEDIA_TYPE
+            if self.server.binary  # type: ignore[attr-defined]
+            else wire.JSON_MEDIA_TYPE
+        )
+        payload = self.payloads[media_type]
+        self.send_response(200)
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture(name="stub_player_url", scope="module", params=["json", "binary"])
+def fixture_stub_player_url(request: pytest.FixtureRequest) -> Iterator[str]:
+    """Base URL of a local player answering in JSON or in the binary format."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPlayerHandler)
+    server.binary = request.param == "binary"  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
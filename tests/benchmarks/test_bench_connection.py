@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import pytest
+
+from sit_liveclip.core import Action, PlayerConnection
+
+
+@pytest.fixture(name="player_conn")
+def fixture_player_conn(stub_player_url: str) -> PlayerConnection:
+    conn = PlayerConnection(stub_player_url)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.benchmark(group="player-connection")
+def test_benchmark_get_state(benchmark, player_conn: PlayerConnection) -> None:
+    res = benchmark(player_conn.get_state)
+
+    assert not res.done
+    assert res.obs["download_speed"].shape[-1] == 8
+
+
+@pytest.mark.benchmark(group="player-connection")
+def test_benchmark_step(benchmark, player_conn: PlayerConnection) -> None:
+    res = benchmark(player_conn.step, Action.NEXT)
+
+    assert res.wastage_cost == pytest.approx(0.25)
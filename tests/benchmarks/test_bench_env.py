@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import pytest
+
+import numpy as np
+
+import torch
+from tianshou.env import DummyVectorEnv
+from tianshou.data import Collector
+
+from sit_liveclip.core import Action, LiveClipEnv, DummyLiveClipEnv, PlayerConnection
+from sit_liveclip.config import Config
+from sit_liveclip.experiment import _build_policy
+
+
+HISTORY_SIZE = 8
+SLIDING_WINDOW_SIZE = 3
+SEGMENT_SIZE = 2
+NUM_ENVS = 4
+COLLECT_STEPS = 256
+
+
+@pytest.fixture(name="live_env", params=[False, True], ids=["dict", "flat"])
+def fixture_live_env(stub_player_url: str, request: pytest.FixtureRequest) -> LiveClipEnv:
+    env = LiveClipEnv(
+        PlayerConnection(stub_player_url),
+        HISTORY_SIZE,
+        SLIDING_WINDOW_SIZE,
+        SEGMENT_SIZE,
+        flat_observation=request.param,
+    )
+    env.reset()
+    yield env
+    env.close()
+
+
+@pytest.mark.benchmark(group="env-step")
+def test_benchmark_live_env_step(benchmark, live_env: LiveClipEnv) -> None:
+    _, reward, done, info = benchmark(live_env.step, Action.NEXT)
+
+    assert np.isfinite(reward)
+    assert not done
+    assert info["wait_time"] > 0
+
+
+@pytest.mark.benchmark(group="collector")
+def test_benchmark_collector(benchmark) -> None:
+    torch.manual_seed(0)
+    config = Config(player_conn_base_url="")
+    env = DummyVectorEnv(
+        [
+            lambda: DummyLiveClipEnv(HISTORY_SIZE, SLIDING_WINDOW_SIZE, SEGMENT_SIZE)
+            for _ in range(NUM_ENVS)
+        ],
+    )
+    env.seed(0)
+    policy = _build_policy(env, config, device="cpu")
+    collector = Collector(policy, env)
+
+    def collect() -> dict:
+        collector.reset_stat()
+        return collector.collect(n_step=COLLECT_STEPS)
+
+    result = benchmark(collect)
+
+    assert result["n/st"] >= COLLECT_STEPS
+    benchmark.extra_info["steps_per_round"] = COLLECT_STEPS
+    env.close()
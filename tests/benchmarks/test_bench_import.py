@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import sys
+import subprocess
+
+import pytest
+
+
+# modules that take seconds to import, which only the subcommands using them load
+HEAVY_MODULES = ("torch", "tianshou", "gym", "torch.utils.tensorboard")
+
+IMPORT_CLI = "import sit_liveclip.cli"
+RUN_CLI = """
+import sys
+from sit_liveclip.cli import main
+sys.argv = ["sit_liveclip", *{argv!r}]
+try:
+    main()
+except SystemExit:
+    pass
+"""
+PRINT_HEAVY_MODULES = f"""
+print("heavy modules:", *(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def _run_python(code: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def _loaded_heavy_modules(code: str) -> list[str]:
+    output = _run_python(f"import sys\n{code}\n{PRINT_HEAVY_MODULES}").stdout
+    last_line = output.strip().splitlines()[-1]
+    assert last_line.startswith("heavy modules:")
+    return last_line.split()[2:]
+
+
+@pytest.mark.benchmark(group="import")
+def test_benchmark_import_cli(benchmark) -> None:
+    benchmark.pedantic(_run_python, args=(IMPORT_CLI,), rounds=5, warmup_rounds=1)
+
+    assert _loaded_heavy_modules(IMPORT_CLI) == []
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--version"], ["--help"], ["train", "--unknown"], ["eval"]],
+    ids=["version", "help", "parse-error", "missing-argument"],
+)
+def test_cli_skips_heavy_imports(argv: list[str]) -> None:
+    assert _loaded_heavy_modules(RUN_CLI.format(argv=argv)) == []
+
+
+@pytest.mark.parametrize("package", ["sit_liveclip.core", "sit_liveclip.utils"])
+def test_packages_import_lazily(package: str) -> None:
+    assert _loaded_heavy_modules(f"import {package}") == []
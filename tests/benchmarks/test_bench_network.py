@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+import numpy as np
+
+import torch
+
+from sit_liveclip.core import PreprocessNet
+from sit_liveclip.core.env import BaseLiveClipEnv
+
+
+HISTORY_SIZE = 8
+SLIDING_WINDOW_SIZE = 3
+BATCH_SIZES = [1, 4, 16, 64, 256, 1024, 4096]
+
+
+@pytest.fixture(name="net", scope="module")
+def fixture_net() -> PreprocessNet:
+    torch.manual_seed(0)
+    net = PreprocessNet(
+        history_size=HISTORY_SIZE,
+        sliding_window_size=SLIDING_WINDOW_SIZE,
+        conv1d_out=4,
+        conv1d_kernel_size=3,
+        device="cpu",
+    )
+    return net.eval()
+
+
+def _sample_obs(batch_size: int) -> np.ndarray:
+    env = BaseLiveClipEnv(HISTORY_SIZE, SLIDING_WINDOW_SIZE, 2, flat_observation=True)
+    env.observation_space.seed(batch_size)
+    return np.stack([env.observation_space.sample() for _ in range(batch_size)])
+
+
+@pytest.mark.benchmark(group="preprocess-net")
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+@pytest.mark.parametrize("path", ["unfused", "fused"])
+def test_benchmark_preprocess_net(
+    benchmark,
+    net: PreprocessNet,
+    batch_size: int,
+    path: str,
+) -> None:
+    obs = _sample_obs(batch_size)
+    forward = net._forward_flat if path == "unfused" else lambda obs: net(obs, None)[0]
+
+    with torch.no_grad():
+        features = benchmark(forward, obs)
+
+    assert features.shape[0] == batch_size
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import pytest
+
+from sit_liveclip.core import DummyLiveClipEnv
+from sit_liveclip.config import Config
+from sit_liveclip.experiment import _build_policy
+
+
+HISTORY_SIZE = 8
+SLIDING_WINDOW_SIZE = 3
+
+
+@pytest.mark.benchmark(group="policy")
+def test_benchmark_build_policy(benchmark) -> None:
+    config = Config(player_conn_base_url="")
+    env = DummyLiveClipEnv(HISTORY_SIZE, SLIDING_WINDOW_SIZE, 2)
+
+    policy = benchmark(_build_policy, env, config, "cpu")
+
+    assert policy.actor.preprocess is policy.critic.preprocess
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from typing import Any
+
+import threading
+
+import pytest
+from numpy.testing import assert_array_equal
+
+import gym
+import numpy as np
+from gym import spaces
+
+import torch
+from torch import nn
+from tianshou.data import Batch
+
+from sit_liveclip.actor_learner import (
+    RolloutLayout,
+    RolloutServer,
+    SharedWeights,
+    EpisodeTracker,
+    SharedRollouts,
+    gather_rollouts,
+    run_remote_actor,
+)
+
+
+OBS_SIZE = 3
+LAYOUT = RolloutLayout(rollout_length=2, num_envs=1, obs_size=OBS_SIZE)
+AUTHKEY = b"secret"
+TIMEOUT = 10.0  # seconds
+
+
+class _CountingEnv(gym.Env):
+    """Observations count the steps, and episodes end every third one."""
+
+    observation_space = spaces.Box(0, np.inf, (OBS_SIZE,), dtype="float32")
+    action_space = spaces.Discrete(2)
+
+    def __init__(self) -> None:
+        self.step_id = 0
+
+    def reset(self) -> np.ndarray:
+        return np.full(OBS_SIZE, self.step_id, dtype="float32")
+
+    def step(self, action: Any) -> tuple[np.ndarray, float, bool, dict[str, Any]]:
+        self.step_id += 1
+        return self.reset(), 1.0, self.step_id % 3 == 0, {}
+
+
+class _LinearPolicy:
+    """Always takes the action 1, with an actor to receive weights."""
+
+    def __init__(self) -> None:
+        self.actor = nn.Linear(OBS_SIZE, 2)
+
+    def train(self) -> None:
+        pass
+
+    def __call__(self, batch: Batch) -> Batch:
+        return Batch(act=torch.ones(len(batch.obs), dtype=torch.int64))
+
+
+@pytest.fixture(name="context")
+def fixture_context() -> Any:
+    return torch.multiprocessing.get_context("spawn")
+
+
+def _fill(module: nn.Module, value: float) -> nn.Module:
+    with torch.no_grad():
+        for param in module.parameters():
+            param.fill_(value)
+    return module
+
+
+def test_pulled_weights_are_the_published_ones(context: Any) -> None:
+    learner = _fill(nn.Linear(OBS_SIZE, 2), 1.0)
+    actor = _fill(nn.Linear(OBS_SIZE, 2), 0.0)
+    weights = SharedWeights(learner, context)
+
+    weights.publish(learner)
+    version = weights.pull(actor, -1)
+    _fill(learner, 2.0)
+    unchanged = weights.pull(actor, version)
+
+    assert (version, unchanged, weights.version) == (1, 1, 1)
+    assert_array_equal(actor.weight.detach(), np.ones((2, OBS_SIZE)))
+
+
+def test_snapshot_waits_for_the_weights_being_published(context: Any) -> None:
+    module = _fill(nn.Linear(OBS_SIZE, 2), 1.0)
+    weights = SharedWeights(module, context)
+    weights.sequence.value += 1  # the learner starts writing
+    snapshots = []
+    reader = threading.Thread(target=lambda: snapshots.append(weights.snapshot()))
+
+    reader.start()
+    reader.join(timeout=0.2)
+    waited = reader.is_alive()
+    weights.flat.fill_(3.0)
+    weights.sequence.value += 1
+    reader.join(timeout=TIMEOUT)
+
+    assert waited
+    version, flat = snapshots[0]
+    assert version == 1
+    assert (flat == 3.0).all()
+
+
+def test_rollout_slots_go_from_free_to_full(context: Any) -> None:
+    rollouts = SharedRollouts(LAYOUT, num_slots=2, context=context)
+
+    slot = rollouts.free.get(timeout=TIMEOUT)
+    rollouts.views(slot)["act"][:] = 7
+    rollouts.full.put(slot)
+    full = rollouts.full.get(timeout=TIMEOUT)
+
+    assert full == slot
+    assert (rollouts.views(full)["act"] == 7).all()
+    assert (rollouts.views(1 - slot)["act"] == 0).all()
+
+
+def test_rollouts_need_a_slot(context: Any) -> None:
+    with pytest.raises(ValueError, match="rollout slot"):
+        SharedRollouts(LAYOUT, num_slots=0, context=context)
+
+
+def test_remote_actor_round_trip(context: Any) -> None:
+    learner = _fill(nn.Linear(OBS_SIZE, 2), 1.0)
+    rollouts = SharedRollouts(LAYOUT, num_slots=1, context=context)
+    weights = SharedWeights(learner, context)
+    weights.publish(learner)
+    server = RolloutServer(("localhost", 0), rollouts, weights, 5, AUTHKEY)
+    policies: list[_LinearPolicy] = []
+    num_sent = []
+
+    def policy_fn(_: Any) -> _LinearPolicy:
+        policies.append(_LinearPolicy())
+        return policies[-1]
+
+    actor = threading.Thread(
+        target=lambda: num_sent.append(
+            run_remote_actor(server.address, _CountingEnv, policy_fn, 2, AUTHKEY),
+        ),
+    )
+    actor.start()
+    try:
+        slot = rollouts.full.get(timeout=TIMEOUT)
+        first = {name: view.copy() for name, view in rollouts.views(slot).items()}
+        weights.publish(_fill(learner, 2.0))
+        rollouts.free.put(slot)
+        slot = rollouts.full.get(timeout=TIMEOUT)
+        second = rollouts.views(slot)
+    finally:
+        server.close()
+        actor.join(timeout=TIMEOUT)
+
+    assert first["meta"][:2].tolist() == [5, 1]  # actor id and policy version
+    assert first["obs"][:, 0, 0].tolist() == [0, 1, 2]
+    assert first["act"].tolist() == [[1], [1]]
+    assert first["done"].tolist() == [[False], [False]]
+    assert second["meta"][1] == 2
+    assert second["obs"][:, 0, 0].tolist() == [2, 3, 4]
+    assert second["done"].tolist() == [[True], [False]]
+    assert (policies[0].actor.weight.detach() == 2.0).all()
+    assert server.num_connected == 1
+    assert num_sent[0] >= 2
+
+
+def test_remote_actor_layout_is_checked(context: Any) -> None:
+    learner = nn.Linear(OBS_SIZE, 2)
+    rollouts = SharedRollouts(LAYOUT, num_slots=1, context=context)
+    server = RolloutServer(
+        ("localhost", 0),
+        rollouts,
+        SharedWeights(learner, context),
+        0,
+        AUTHKEY,
+    )
+
+    try:
+        with pytest.raises(ValueError, match="learner expects"):
+            run_remote_actor(
+                server.address,
+                _CountingEnv,
+                lambda _: _LinearPolicy(),
+                rollout_length=3,
+                authkey=AUTHKEY,
+            )
+    finally:
+        server.close()
+
+    assert server.num_connected == 0
+
+
+def test_episodes_are_tracked_across_rollouts() -> None:
+    episodes = EpisodeTracker(num_envs=2)
+    rew = np.ones((2, 2), dtype="float32")
+
+    first = episodes.add(0, rew, np.array([[False, False], [True, False]]))
+    second = episodes.add(0, rew, np.array([[False, True], [False, False]]))
+    other = episodes.add(1, rew, np.array([[True, False], [False, False]]))
+
+    assert first == ([2.0], [2])
+    assert second == ([3.0], [3])  # the second env ran through both rollouts
+    assert other == ([1.0], [1])
+    assert episodes.num_finished == 3
+
+
+def test_rollouts_of_outdated_weights_are_dropped(context: Any) -> None:
+    learner = nn.Linear(OBS_SIZE, 2)
+    rollouts = SharedRollouts(LAYOUT, num_slots=3, context=context)
+    weights = SharedWeights(learner, context)
+    for _ in range(3):
+        weights.publish(learner)
+    for version in (1, 3, 2):
+        slot = rollouts.free.get(timeout=TIMEOUT)
+        rollouts.views(slot)["meta"][:] = (0, version, 0.5)
+        rollouts.full.put(slot)
+
+    gathered = gather_rollouts(
+        rollouts,
+        weights,
+        [],
+        EpisodeTracker(LAYOUT.num_envs),
+        num_rollouts=2,
+        max_policy_lag=1,
+    )
+
+    assert (gathered.num_received, gathered.num_dropped) == (3, 1)
+    assert gathered.lags == [0, 1]
+    assert gathered.actor_waits == [0.5] * 3
+    assert len(gathered.buffer) == 2 * LAYOUT.rollout_length
+    assert rollouts.free.qsize() == 3
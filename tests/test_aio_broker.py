@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, TypeVar, Callable, Awaitable
+
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from sit_liveclip.core import wire
+from sit_liveclip.broker.aio import AsyncMailbox, make_app
+
+
+if TYPE_CHECKING:
+    from aiohttp import ClientWebSocketResponse
+
+
+T = TypeVar("T")
+
+TIMEOUT = 5.0  # seconds
+BINARY_ACCEPT = {"Accept": wire.STATE_MEDIA_TYPE}
+
+
+def _player_state(play_progress: float) -> dict[str, Any]:
+    return {
+        "status": False,
+        "wastage_cost": 0.5,
+        "download_speed": [1000.0] * 3,
+        "user_staying_time": [10.0] * 3,
+        "play_progress": play_progress,
+        "current_staying_time": 5.0,
+        "replay_round": 0.0,
+        "list_video_bitrate": [750.0] * 2,
+        "list_video_length": [30.0] * 2,
+        "list_buffered_content": [2.0] * 2,
+        "list_time_spent_downloading_videos": [0.5] * 2,
+        "list_completed_videos": [0.0] * 2,
+    }
+
+
+def _run(test: Callable[[TestClient], Awaitable[T]]) -> T:
+    async def run() -> T:
+        async with TestClient(TestServer(make_app())) as client:
+            return await test(client)
+
+    return asyncio.run(run())
+
+
+async def _receive_action(socket: ClientWebSocketResponse) -> int:
+    message = await socket.receive_json(timeout=TIMEOUT)
+    action: int = message["action"]
+    return action
+
+
+def test_player_socket_answers_steps_with_json_states() -> None:
+    async def test(client: TestClient) -> tuple[int, dict[str, Any]]:
+        async with client.ws_connect("/ws") as socket:
+            step = asyncio.create_task(client.post("/step", json={"action": 2}))
+            action = await _receive_action(socket)
+            await socket.send_json(_player_state(action))
+            res = await step
+            return action, await res.json()
+
+    action, body = _run(test)
+
+    assert action == 2
+    assert body["state"]["play_progress"] == 2
+    assert body["wait_time"] >= 0
+
+
+def test_player_socket_passes_binary_states_through() -> None:
+    payload = wire.encode_state(_player_state(1.0))
+
+    async def test(client: TestClient) -> bytes:
+        async with client.ws_connect("/ws") as socket:
+            step = asyncio.create_task(
+                client.post("/step", json={"action": 1}, headers=BINARY_ACCEPT),
+            )
+            await _receive_action(socket)
+            await socket.send_bytes(payload)
+            res = await step
+            return await res.read()
+
+    assert _run(test) == payload
+
+
+def test_latest_action_wins() -> None:
+    async def test(client: TestClient) -> tuple[int, dict[str, Any]]:
+        for action in (0, 1, 2):
+            await client.post(f"/action/{action}")
+        async with client.ws_connect("/ws") as socket:
+            action = await _receive_action(socket)
+        stats = await (await client.get("/stats")).json()
+        return action, stats["sessions"]["default"]["actions"]
+
+    action, stats = _run(test)
+
+    assert action == 2
+    assert (stats["posted"], stats["taken"], stats["dropped"]) == (3, 1, 2)
+
+
+def test_latest_state_wins() -> None:
+    async def test(client: TestClient) -> dict[str, Any]:
+        for play_progress in (1.0, 2.0):
+            await client.post("/state", json=_player_state(play_progress))
+        res = await client.get("/state")
+        return await res.json()
+
+    assert _run(test)["state"]["play_progress"] == 2.0
+
+
+def test_actions_posted_while_no_player_is_connected_are_kept() -> None:
+    async def test(client: TestClient) -> tuple[int, int]:
+        async with client.ws_connect("/ws") as socket:
+            await client.post("/action/0")
+            first = await _receive_action(socket)
+        await client.post("/action/1")  # after the player went away
+        async with client.ws_connect("/ws") as socket:
+            second = await _receive_action(socket)
+        return first, second
+
+    assert _run(test) == (0, 1)
+
+
+def test_returned_action_does_not_replace_a_newer_one() -> None:
+    async def test() -> tuple[int | None, int | None]:
+        mailbox = AsyncMailbox()
+        mailbox.return_action(1)
+        returned = await mailbox.take_action()
+        mailbox.post_action(2)
+        mailbox.return_action(1)
+        return returned, await mailbox.take_action()
+
+    assert asyncio.run(test()) == (1, 2)
+
+
+def test_step_times_out_with_504() -> None:
+    async def test(client: TestClient) -> int:
+        res = await client.post("/step?timeout=0.01", json={"action": 1})
+        return res.status
+
+    assert _run(test) == 504
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+import numpy as np
+
+import torch
+
+from sit_liveclip.serving.batcher import Decision, MicroBatcher
+
+
+OBS_SIZE = 3
+
+
+def _argmax_model(obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    return obs.argmax(dim=1), torch.softmax(obs, dim=1)
+
+
+def _failing_model(obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    raise RuntimeError("model failed")
+
+
+async def _decide_all(
+    batcher: MicroBatcher,
+    num_requests: int,
+    close: bool = True,
+) -> list[Decision]:
+    observations = np.eye(OBS_SIZE, dtype="float32")
+    try:
+        return await asyncio.gather(
+            *(batcher.decide(observations[idx % OBS_SIZE]) for idx in range(num_requests))
+        )
+    finally:
+        if close:
+            await batcher.close()
+
+
+def test_concurrent_requests_share_a_batch() -> None:
+    batcher = MicroBatcher(_argmax_model, OBS_SIZE, max_batch_size=4, max_wait=1.0)
+
+    decisions = asyncio.run(_decide_all(batcher, 4))
+
+    assert [decision.action for decision in decisions] == [0, 1, 2, 0]
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["decisions"] == 4
+
+
+def test_batcher_created_outside_the_event_loop_serves_several_loops() -> None:
+    batcher = MicroBatcher(_argmax_model, OBS_SIZE, max_batch_size=2, max_wait=0.0)
+
+    first = asyncio.run(_decide_all(batcher, 3, close=False))
+    second = asyncio.run(_decide_all(batcher, 3))
+
+    assert [decision.action for decision in first + second] == [0, 1, 2] * 2
+
+
+def test_model_errors_reach_every_request() -> None:
+    batcher = MicroBatcher(_failing_model, OBS_SIZE, max_batch_size=2)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        asyncio.run(_decide_all(batcher, 2))
+
+
+def test_observation_shape_is_checked() -> None:
+    batcher = MicroBatcher(_argmax_model, OBS_SIZE)
+
+    with pytest.raises(ValueError, match="shape"):
+        asyncio.run(batcher.decide(np.zeros(OBS_SIZE + 1, dtype="float32")))
@@ -0,0 +1,123 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+import torch
+
+from sit_liveclip import experiment
+from sit_liveclip.config import Config
+from sit_liveclip.checkpoint import (
+    CHECKPOINT_FILE,
+    Checkpoint,
+    CheckpointWriter,
+    load_checkpoint,
+)
+
+
+CONFIG = Config(
+    max_epoch=1,
+    step_per_epoch=16,
+    repeat_per_collect=1,
+    batch_size=8,
+    reward_threshold=float("inf"),  # never stop before `max_epoch`
+    actor_hidden_size=[8],
+    critic_hidden_size=[8],
+)
+
+
+def _checkpoint(epoch: int, weight: torch.Tensor) -> Checkpoint:
+    return Checkpoint(
+        epoch=epoch,
+        env_step=10 * epoch,
+        gradient_step=2 * epoch,
+        policy={"weight": weight},
+        optim={"state": {}, "param_groups": [{"lr": 0.1}]},
+    )
+
+
+def _train(log_dir: Path, max_epoch: int, resume: bool = False) -> None:
+    config = CONFIG._replace(max_epoch=max_epoch)
+    env = experiment.make_local_env("dummy", config)
+    experiment.train(env, log_dir, config, resume=resume)
+
+
+def test_writer_writes_a_loadable_checkpoint(tmp_path: Path) -> None:
+    writer = CheckpointWriter(tmp_path / CHECKPOINT_FILE)
+
+    writer.save(_checkpoint(3, torch.ones(2)))
+    writer.close()
+
+    checkpoint = load_checkpoint(tmp_path / CHECKPOINT_FILE)
+    assert checkpoint[:3] == (3, 30, 6)
+    assert torch.equal(checkpoint.policy["weight"], torch.ones(2))
+    assert checkpoint.optim["param_groups"] == [{"lr": 0.1}]
+    assert writer.num_written == 1
+    assert not (tmp_path / f"{CHECKPOINT_FILE}.tmp").exists()
+
+
+def test_writer_snapshots_the_tensors_when_saving(tmp_path: Path) -> None:
+    writer = CheckpointWriter(tmp_path / CHECKPOINT_FILE)
+    weight = torch.zeros(2)
+
+    writer.save(_checkpoint(1, weight))
+    weight += 1  # training goes on while the checkpoint is written
+    writer.close()
+
+    checkpoint = load_checkpoint(tmp_path / CHECKPOINT_FILE)
+    assert torch.equal(checkpoint.policy["weight"], torch.zeros(2))
+
+
+def test_writer_only_keeps_the_latest_pending_checkpoint(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    writing = threading.Event()
+    resume_writing = threading.Event()
+    write = CheckpointWriter._write
+
+    def slow_write(self: CheckpointWriter, checkpoint: Checkpoint) -> None:
+        writing.set()
+        resume_writing.wait()
+        write(self, checkpoint)
+
+    monkeypatch.setattr(CheckpointWriter, "_write", slow_write)
+    writer = CheckpointWriter(tmp_path / CHECKPOINT_FILE)
+
+    writer.save(_checkpoint(1, torch.zeros(1)))
+    writing.wait()
+    writer.save(_checkpoint(2, torch.zeros(1)))
+    writer.save(_checkpoint(3, torch.zeros(1)))
+    resume_writing.set()
+    writer.close()
+
+    assert (writer.num_written, writer.num_skipped) == (2, 1)
+    assert load_checkpoint(tmp_path / CHECKPOINT_FILE).epoch == 3
+
+
+def test_writer_reports_write_errors(tmp_path: Path) -> None:
+    writer = CheckpointWriter(tmp_path / "missing" / CHECKPOINT_FILE)
+
+    writer.save(_checkpoint(1, torch.zeros(1)))
+
+    with pytest.raises(RuntimeError, match="Could not write"):
+        writer.close()
+
+
+def test_train_resumes_from_the_last_checkpoint(tmp_path: Path) -> None:
+    _train(tmp_path, max_epoch=1)
+    first = load_checkpoint(tmp_path / CHECKPOINT_FILE)
+
+    _train(tmp_path, max_epoch=2, resume=True)
+    second = load_checkpoint(tmp_path / CHECKPOINT_FILE)
+
+    assert (first.epoch, first.env_step) == (1, 16)
+    assert second.epoch == 2
+    assert second.env_step == 2 * first.env_step
+    assert second.gradient_step > first.gradient_step
+    assert (tmp_path / "policy.pth").exists()
+
+
+def test_resuming_requires_a_log_dir() -> None:
+    with pytest.raises(ValueError, match="log dir"):
+        _train(None, max_epoch=1, resume=True)  # type: ignore[arg-type]
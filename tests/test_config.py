@@ -0,0 +1,101 @@
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+from sit_liveclip import cli
+from sit_liveclip.config import Config, load_config, override_config, parse_overrides
+
+
+def _write_json(path: Path, value: object) -> Path:
+    path.write_text(json.dumps(value), encoding="utf-8")
+    return path
+
+
+def test_config_file_overrides_some_fields(tmp_path: Path) -> None:
+    config_file = _write_json(tmp_path / "config.json", {"batch_size": 64})
+
+    config = load_config(config_file)
+
+    assert config.batch_size == 64
+    assert config.learning_rate == Config().learning_rate
+
+
+def test_config_file_must_hold_an_object(tmp_path: Path) -> None:
+    config_file = _write_json(tmp_path / "config.json", [64])
+
+    with pytest.raises(ValueError, match="should hold an object"):
+        load_config(config_file)
+
+
+def test_config_file_rejects_unknown_fields(tmp_path: Path) -> None:
+    config_file = _write_json(tmp_path / "config.json", {"batch_sise": 64})
+
+    with pytest.raises(ValueError, match="Unknown config fields: batch_sise"):
+        load_config(config_file)
+
+
+def test_override_lists_every_unknown_field() -> None:
+    with pytest.raises(ValueError, match=r"fields: a, b\.$"):
+        override_config(Config(), {"b": 1, "a": 2, "batch_size": 64})
+
+
+def test_override_leaves_the_config_alone() -> None:
+    config = Config()
+
+    overridden = override_config(config, {"num_players": 4})
+
+    assert (config.num_players, overridden.num_players) == (1, 4)
+
+
+def test_overrides_are_json_or_plain_strings() -> None:
+    overrides = parse_overrides(
+        [
+            "learning_rate=3e-4",
+            "actor_hidden_size=[64, 64]",
+            "flat_observation=true",
+            "decision_deadline=null",
+            " sim_bandwidth_traces = traces.bin",
+            "player_conn_base_url=http://host:1996/a=b",
+        ],
+    )
+
+    assert overrides == {
+        "learning_rate": 3e-4,
+        "actor_hidden_size": [64, 64],
+        "flat_observation": True,
+        "decision_deadline": None,
+        "sim_bandwidth_traces": " traces.bin",
+        "player_conn_base_url": "http://host:1996/a=b",
+    }
+
+
+@pytest.mark.parametrize("assignment", ["learning_rate", "=3e-4", " =1"])
+def test_overrides_need_a_field_and_a_value(assignment: str) -> None:
+    with pytest.raises(ValueError, match="Expected `field=value`"):
+        parse_overrides([assignment])
+
+
+@pytest.mark.parametrize(
+    ("argv", "message"),
+    [
+        (["-s", "batch_sise=64", "eval", "--model", "p.pth"], "Unknown config"),
+        (["-e", "replay", "eval", "--model", "p.pth"], "requires a recording"),
+    ],
+)
+def test_cli_reports_invalid_configs_as_usage_errors(
+    argv: list[str],
+    message: str,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    monkeypatch.chdir(tmp_path)  # for the log file
+    monkeypatch.setattr(sys, "argv", ["sit_liveclip", *argv])
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main()
+
+    assert exc_info.value.code == 2
+    assert message in capsys.readouterr().err
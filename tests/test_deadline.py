@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from typing import Any
+
+import time
+
+import pytest
+
+import numpy as np
+import requests
+
+from tianshou.env import DummyVectorEnv
+
+from sit_liveclip.config import Config
+from sit_liveclip.core.env import LiveClipEnv
+from sit_liveclip.core.action import Action
+from sit_liveclip.core.deadline import CircuitBreaker, DeadlinePolicy
+from sit_liveclip.core.vector_env import DecisionClock
+from sit_liveclip.core.observation import get_observation_layout
+from sit_liveclip.core.player_connection import PlayerResponse
+
+
+LAYOUT = get_observation_layout(4, 3)
+DEADLINE = DeadlinePolicy(deadline=10.0, fallback_action=Action.NEXT, max_misses=2)
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _FakePlayerConnection:
+    """Answers with states marked by their `play_progress`, None stands for a timeout."""
+
+    def __init__(self, answers: list[float | None]) -> None:
+        self.answers = answers
+        self.sent: list[tuple[Action, float | None]] = []
+
+    def step(self, action: Action, timeout: float | None = None) -> PlayerResponse:
+        self.sent.append((action, timeout))
+        marker = 0.0 if action == Action.RESET else self.answers.pop(0)
+        if marker is None:
+            raise requests.Timeout()
+        obs = LAYOUT.views(np.zeros(LAYOUT.size, dtype="float32"))
+        obs["play_progress"][...] = marker
+        return PlayerResponse(obs, done=False, wastage_cost=0.0)
+
+    def close(self) -> None:
+        pass
+
+
+def _make_env(answers: list[float | None]) -> LiveClipEnv:
+    env = LiveClipEnv(
+        _FakePlayerConnection(answers),  # type: ignore[arg-type]
+        history_size=4,
+        sliding_window_size=3,
+        segment_size=1000,
+        flat_observation=True,
+        deadline=DEADLINE,
+    )
+    env.reset()
+    return env
+
+
+def _sent_actions(env: LiveClipEnv) -> list[Action]:
+    return [action for action, _ in env.player_conn.sent[1:]]
+
+
+def test_breaker_opens_after_consecutive_misses() -> None:
+    clock = _FakeClock()
+    breaker = CircuitBreaker(max_misses=2, cooldown=5.0, clock=clock)
+
+    breaker.record(missed=True)
+    breaker.record(missed=False)
+    breaker.record(missed=True)
+    closed = breaker.is_open
+    breaker.record(missed=True)
+
+    assert not closed
+    assert breaker.is_open
+    assert breaker.num_trips == 1
+    assert not breaker.allow()
+    clock.now = 5.0
+    assert breaker.allow()
+
+
+def test_failed_probe_restarts_the_cooldown_without_a_new_trip() -> None:
+    clock = _FakeClock()
+    breaker = CircuitBreaker(max_misses=1, cooldown=5.0, clock=clock)
+    breaker.record(missed=True)
+
+    clock.now = 6.0
+    breaker.record(missed=True)
+
+    assert breaker.num_trips == 1
+    assert breaker.opened_at == 6.0
+    assert not breaker.allow()
+
+
+def test_answered_probe_closes_the_circuit() -> None:
+    breaker = CircuitBreaker(max_misses=1, cooldown=5.0, clock=_FakeClock())
+    breaker.record(missed=True)
+
+    breaker.record(missed=False)
+
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert breaker.num_misses == 0
+
+
+def test_breaker_needs_a_miss() -> None:
+    with pytest.raises(ValueError, match="max_misses"):
+        CircuitBreaker(max_misses=0, cooldown=5.0)
+
+
+@pytest.mark.parametrize(
+    "overrides, match",
+    [
+        ({"decision_deadline": 0.0}, "positive"),
+        ({"decision_deadline": 1.0, "deadline_fallback_action": "RESET"}, "Unknown"),
+    ],
+)
+def test_deadline_policy_checks_the_config(
+    overrides: dict[str, Any],
+    match: str,
+) -> None:
+    with pytest.raises(ValueError, match=match):
+        DeadlinePolicy.from_config(Config(**overrides))
+
+
+def test_deadline_policy_from_config() -> None:
+    assert DeadlinePolicy.from_config(Config(decision_deadline=None)) is None
+    assert DeadlinePolicy.from_config(Config(decision_deadline=0.5)).deadline == 0.5
+
+
+def test_action_in_time_is_sent() -> None:
+    env = _make_env([1.0])
+
+    obs, _, _, info = env.step(Action.PAUSE)
+
+    assert env.player_conn.sent[1] == (Action.PAUSE, DEADLINE.deadline)
+    assert obs[LAYOUT.slices["play_progress"]] == 1.0
+    assert not info["deadline_missed"]
+    assert info["sent_action"] == Action.PAUSE
+    assert env.deadline_stats["decisions"] == 1
+    assert env.deadline_stats["missed"] == 0
+
+
+def test_late_action_is_replaced_by_the_fallback() -> None:
+    env = _make_env([1.0])
+    env.observed_at = time.monotonic() - 2 * DEADLINE.deadline
+
+    obs, _, _, info = env.step(Action.PAUSE)
+
+    assert _sent_actions(env) == [Action.NEXT]
+    assert obs[LAYOUT.slices["play_progress"]] == 1.0
+    assert info["deadline_missed"]
+    assert info["sent_action"] == Action.NEXT
+    assert env.deadline_stats["late_decisions"] == 1
+    assert env.deadline_stats["missed"] == 1
+
+
+def test_player_timeout_returns_the_last_observation() -> None:
+    env = _make_env([1.0, None])
+    env.step(Action.PAUSE)
+
+    obs, reward, done, info = env.step(Action.PAUSE)
+
+    assert obs[LAYOUT.slices["play_progress"]] == 1.0
+    assert (reward, done) == (0.0, False)
+    assert info["deadline_missed"]
+    assert not info["circuit_open"]
+    assert env.timed_out
+    assert env.deadline_stats["player_timeouts"] == 1
+
+
+def test_step_answered_after_a_timeout_is_marked() -> None:
+    env = _make_env([None, 2.0, 3.0])
+    env.step(Action.PAUSE)
+
+    _, _, _, after_timeout = env.step(Action.PAUSE)
+    _, _, _, info = env.step(Action.PAUSE)
+
+    assert after_timeout["after_timeout"]
+    assert not info["after_timeout"]
+    assert not env.timed_out
+    assert env.deadline_stats["after_timeout"] == 1
+
+
+def test_open_circuit_skips_the_player() -> None:
+    env = _make_env([None, None])
+    env.step(Action.PAUSE)
+    env.step(Action.PAUSE)
+
+    _, reward, _, info = env.step(Action.PAUSE)
+
+    assert len(_sent_actions(env)) == 2
+    assert reward == 0.0
+    assert info["circuit_open"]
+    assert info["sent_action"] == -1
+    assert env.deadline_stats["skipped"] == 1
+    assert env.deadline_stats["circuit_trips"] == 1
+    assert env.deadline_stats["missed"] == 3
+
+
+def test_decision_clock_times_the_whole_batch() -> None:
+    venv = DecisionClock(
+        DummyVectorEnv([lambda: _make_env([1.0]), lambda: _make_env([1.0])]),
+    )
+    venv.reset()
+    venv.observed_at = time.monotonic() - 2 * DEADLINE.deadline  # a slow policy
+
+    venv.step(np.array([Action.PAUSE] * 2))
+
+    for stats in venv.get_env_attr("deadline_stats"):
+        assert stats["late_decisions"] == 1
+    assert venv.observed_at > time.monotonic() - DEADLINE.deadline
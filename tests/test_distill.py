@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+from numpy.testing import assert_array_equal
+
+import numpy as np
+
+import torch
+
+from sit_liveclip.serving.distill import (
+    TREE_FORMAT,
+    DistilledTree,
+    load_tree,
+    save_tree,
+    distill_tree,
+    make_decider,
+    fidelity_report,
+)
+from sit_liveclip.core.observation import get_observation_layout
+
+
+HISTORY_SIZE = 4
+SLIDING_WINDOW_SIZE = 3
+LAYOUT = get_observation_layout(HISTORY_SIZE, SLIDING_WINDOW_SIZE)
+
+SPEED = LAYOUT.slices["download_speed"].start  # latest download speed
+PROGRESS = LAYOUT.slices["play_progress"].start
+
+
+def _policy(obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """Pauses on slow downloads, then goes to the next video past half of this one."""
+    actions = torch.where(
+        obs[:, SPEED] < 0.3,
+        torch.zeros(len(obs), dtype=torch.int64),
+        1 + (obs[:, PROGRESS] > 0.5).long(),
+    )
+    return actions, torch.nn.functional.one_hot(actions, 3).float()
+
+
+def _observations(num: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).random((num, LAYOUT.size), dtype="float32")
+
+
+@pytest.fixture(name="tree", scope="module")
+def fixture_tree() -> DistilledTree:
+    return distill_tree(
+        _policy,
+        _observations(2000, seed=0),
+        HISTORY_SIZE,
+        SLIDING_WINDOW_SIZE,
+        max_depth=4,
+        min_samples_leaf=5,
+    )
+
+
+def test_distilled_tree_agrees_with_the_policy(tree: DistilledTree) -> None:
+    reports = fidelity_report(
+        tree,
+        _policy,
+        {"held out": _observations(500, seed=1)},
+        repeat=10,
+    )
+
+    assert reports[0].num_observations == 500
+    assert reports[0].agreement > 0.97
+    assert set(reports[0].agreement_per_action) == {0, 1, 2}
+    assert tree.depth <= 4
+
+
+def test_python_decider_matches_the_vectorized_one(tree: DistilledTree) -> None:
+    obs = _observations(100, seed=2)
+    decide = make_decider(tree)
+
+    actions = [decide(row.tolist()) for row in obs]
+
+    assert_array_equal(actions, tree.decide(obs))
+
+
+@pytest.mark.parametrize("suffix", [".json", ".npz"])
+def test_tree_round_trip(
+    tree: DistilledTree,
+    tmp_path: Path,
+    suffix: str,
+) -> None:
+    obs = _observations(100, seed=3)
+
+    save_tree(tree, tmp_path / f"tree{suffix}")
+    loaded = load_tree(tmp_path / f"tree{suffix}")
+
+    assert (loaded.history_size, loaded.sliding_window_size) == (4, 3)
+    assert_array_equal(loaded.decide(obs), tree.decide(obs))
+
+
+def test_thresholds_keep_adjacent_float32_observations_apart() -> None:
+    slow = np.nextafter(np.float32(1000), np.float32(np.inf))
+    fast = np.nextafter(slow, np.float32(np.inf))  # their midpoint rounds up to `fast`
+    obs = np.zeros((20, LAYOUT.size), dtype="float32")
+    obs[10:, SPEED] = fast
+    obs[:10, SPEED] = slow
+
+    def speed_policy(obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+        actions = (obs[:, SPEED] > slow).long()
+        return actions, torch.nn.functional.one_hot(actions, 2).float()
+
+    tree = distill_tree(
+        speed_policy,
+        obs,
+        HISTORY_SIZE,
+        SLIDING_WINDOW_SIZE,
+        min_samples_leaf=1,
+    )
+
+    assert_array_equal(tree.decide(obs), [0] * 10 + [1] * 10)
+
+
+def test_loading_rejects_other_json_files(tmp_path: Path) -> None:
+    (tmp_path / "tree.json").write_text('{"format": "other"}')
+
+    with pytest.raises(ValueError, match=TREE_FORMAT):
+        load_tree(tmp_path / "tree.json")
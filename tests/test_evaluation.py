@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+import gym
+import numpy as np
+
+from tianshou.env import DummyVectorEnv
+from tianshou.data import Batch
+
+from sit_liveclip.evaluation import summarize, run_episodes, summary_rows
+
+
+class _FixedLengthEnv(gym.Env):
+    """Episodes of `length` steps, with a reward of 1 and rebuffering on odd steps."""
+
+    def __init__(self, length: int, with_info: bool = True) -> None:
+        self.length = length
+        self.with_info = with_info
+        self.step_id = 0
+
+    def reset(self) -> np.ndarray:
+        self.step_id = 0
+        return np.zeros(2, dtype="float32")
+
+    def step(self, action: Any) -> tuple[np.ndarray, float, bool, dict[str, Any]]:
+        self.step_id += 1
+        info = {"rebuffering": self.step_id % 2, "wastage_cost": 0.5}
+        return (
+            np.full(2, self.step_id, dtype="float32"),
+            1.0,
+            self.step_id == self.length,
+            info if self.with_info else {},
+        )
+
+
+class _ConstantPolicy:
+    def eval(self) -> None:
+        pass
+
+    def __call__(self, batch: Batch) -> Batch:
+        return Batch(act=np.zeros(len(batch.obs), dtype="int64"))
+
+    def map_action(self, act: np.ndarray) -> np.ndarray:
+        return act
+
+
+def _run(env: gym.Env | DummyVectorEnv, num_episodes: int) -> dict[str, np.ndarray]:
+    return run_episodes(_ConstantPolicy(), env, num_episodes)  # type: ignore[arg-type]
+
+
+def test_episodes_are_spread_over_the_envs() -> None:
+    env = DummyVectorEnv([lambda: _FixedLengthEnv(2), lambda: _FixedLengthEnv(3)])
+
+    episodes = _run(env, num_episodes=5)
+
+    order = np.lexsort((episodes["length"], episodes["env_id"]))
+    assert_array_equal(episodes["env_id"][order], [0, 0, 0, 1, 1])
+    assert_array_equal(episodes["length"][order], [2, 2, 2, 3, 3])
+    assert_array_equal(episodes["reward"][order], [2, 2, 2, 3, 3])
+    assert_allclose(episodes["rebuffering_rate"][order], [1 / 2] * 3 + [2 / 3] * 2)
+    assert_allclose(episodes["wastage_cost"][order], [1.0] * 3 + [1.5] * 2)
+
+
+def test_envs_left_without_episodes_do_not_play() -> None:
+    env = DummyVectorEnv([lambda: _FixedLengthEnv(2)] * 3)
+
+    episodes = _run(env, num_episodes=2)
+
+    assert sorted(episodes["env_id"]) == [0, 1]
+
+
+def test_metrics_missing_from_the_info_are_nan() -> None:
+    episodes = _run(_FixedLengthEnv(4, with_info=False), num_episodes=2)
+
+    assert_array_equal(episodes["reward"], [4, 4])
+    assert np.isnan(episodes["rebuffering_rate"]).all()
+    assert np.isnan(episodes["wastage_cost"]).all()
+
+
+def test_run_episodes_needs_an_episode() -> None:
+    with pytest.raises(ValueError, match="positive"):
+        _run(_FixedLengthEnv(2), num_episodes=0)
+
+
+def test_summary_statistics() -> None:
+    episodes = {
+        "reward": np.array([1.0, 2.0, 3.0, 4.0]),
+        "length": np.array([10.0, np.nan, 10.0, 10.0]),
+        "wastage_cost": np.full(4, np.nan),
+    }
+
+    summary = summarize(episodes, num_resamples=200)
+
+    reward = summary["reward"]
+    assert (reward["count"], reward["mean"], reward["p50"]) == (4, 2.5, 2.5)
+    assert reward["std"] == pytest.approx(np.sqrt(1.25))
+    assert 1.0 <= reward["ci_low"] <= 2.5 <= reward["ci_high"] <= 4.0
+    assert summary["length"]["count"] == 3
+    assert summary["length"]["ci_low"] == summary["length"]["ci_high"] == 10.0
+    assert set(summary) == {"reward", "length"}  # all NaN or missing metrics are left out
+
+
+def test_summary_is_reproducible_with_a_seed() -> None:
+    episodes = {"reward": np.random.default_rng(1).normal(size=50)}
+
+    assert summarize(episodes, seed=3) == summarize(episodes, seed=3)
+
+
+def test_summary_rows() -> None:
+    summary = summarize({"reward": np.array([1.0, 1.0])})
+
+    columns, rows = summary_rows(summary)
+
+    assert len(columns) == len(rows[0])
+    assert rows == [
+        ["reward", "1.000", "[1.000, 1.000]", "0.000", "1.000", "1.000", "1.000"],
+    ]
@@ -0,0 +1,120 @@
+import time
+import threading
+
+import pytest
+
+from sit_liveclip.broker import Slot, Mailbox, MailboxRegistry, SessionLimitError
+
+
+def _wait_in_thread(mailbox: Mailbox[str], timeout: float) -> threading.Thread:
+    thread = threading.Thread(target=mailbox.take_state, args=(timeout,))
+    thread.start()
+    while mailbox.num_waiters == 0:
+        time.sleep(0.001)
+    return thread
+
+
+def test_slot_keeps_the_latest_messages() -> None:
+    slot: Slot[int] = Slot(capacity=2)
+
+    for message in range(3):
+        slot.post(message)
+
+    assert slot.take() == 2
+    assert slot.stats() == {
+        "pending": 0,
+        "posted": 3,
+        "taken": 1,
+        "dropped": 1,  # 0, evicted by 2
+        "stale": 1,  # 1, skipped when 2 was taken
+    }
+
+
+def test_slot_capacity_must_be_positive() -> None:
+    with pytest.raises(ValueError, match="capacity"):
+        Slot(capacity=0)
+
+
+def test_take_times_out_without_message() -> None:
+    mailbox: Mailbox[str] = Mailbox()
+
+    start = time.perf_counter()
+    state = mailbox.take_state(timeout=0.05)
+
+    assert state is None
+    assert time.perf_counter() - start >= 0.05
+    assert mailbox.num_waiters == 0
+
+
+def test_take_wakes_up_when_a_message_is_posted() -> None:
+    mailbox: Mailbox[str] = Mailbox()
+    timer = threading.Timer(0.01, mailbox.post_action, args=(2,))
+    timer.start()
+
+    action = mailbox.take_action(timeout=5.0)
+
+    timer.join()
+    assert action == 2
+
+
+def test_post_step_discards_pending_states() -> None:
+    mailbox: Mailbox[str] = Mailbox()
+    mailbox.post_state("late reply")
+
+    mailbox.post_step(1)
+
+    assert mailbox.take_state() is None
+    assert mailbox.take_action() == 1
+    assert mailbox.stats()["states"]["stale"] == 1
+
+
+def test_registry_evicts_the_least_recently_used_session() -> None:
+    mailboxes: MailboxRegistry[Mailbox[str]] = MailboxRegistry(max_sessions=2)
+    first = mailboxes.get("a")
+    mailboxes.get("b")
+    mailboxes.get("a")
+
+    mailboxes.get("c")
+
+    assert mailboxes.get("a") is first
+    assert mailboxes.counters()["evicted"] == 1
+    assert set(mailboxes.stats()["sessions"]) == {"a", "c"}
+
+
+def test_registry_keeps_sessions_with_waiters() -> None:
+    mailboxes: MailboxRegistry[Mailbox[str]] = MailboxRegistry(max_sessions=2)
+    waited_on = mailboxes.get("a")
+    mailboxes.get("b")
+    thread = _wait_in_thread(waited_on, timeout=5.0)
+
+    mailboxes.get("c")
+    waited_on.post_state("state")
+    thread.join()
+
+    assert mailboxes.get("a") is waited_on
+    assert set(mailboxes.stats()["sessions"]) == {"a", "c"}
+
+
+def test_registry_rejects_new_sessions_when_all_are_waited_on() -> None:
+    mailboxes: MailboxRegistry[Mailbox[str]] = MailboxRegistry(max_sessions=1)
+    thread = _wait_in_thread(mailboxes.get("a"), timeout=0.2)
+
+    with pytest.raises(SessionLimitError):
+        mailboxes.get("b")
+    thread.join()
+
+    assert mailboxes.counters()["rejected"] == 1
+    mailboxes.get("b")
+    assert mailboxes.counters()["evicted"] == 1
+
+
+def test_registry_counters_sum_over_sessions() -> None:
+    mailboxes: MailboxRegistry[Mailbox[str]] = MailboxRegistry()
+    for session_id in ("a", "b", None):
+        mailboxes.get(session_id).post_state("state")
+
+    counters = mailboxes.counters()
+
+    assert counters["sessions"] == 3
+    assert counters["states_posted"] == 3
+    assert counters["states_pending"] == 3
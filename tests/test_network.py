@@ -0,0 +1,115 @@
+import pytest
+
+import numpy as np
+
+import torch
+from tianshou.data import Batch
+
+from sit_liveclip.core import PreprocessNet
+from sit_liveclip.core.env import BaseLiveClipEnv
+
+
+HISTORY_SIZE = 8
+SLIDING_WINDOW_SIZE = 3
+# float32 sums of download speeds up to 17000, in a different order
+ATOL = 1e-3
+
+
+@pytest.fixture(name="net")
+def fixture_net() -> PreprocessNet:
+    torch.manual_seed(0)
+    net = PreprocessNet(
+        history_size=HISTORY_SIZE,
+        sliding_window_size=SLIDING_WINDOW_SIZE,
+        conv1d_out=4,
+        conv1d_kernel_size=3,
+        device="cpu",
+    )
+    return net.eval()
+
+
+def _sample_obs(batch_size: int, flat: bool) -> np.ndarray:
+    env = BaseLiveClipEnv(HISTORY_SIZE, SLIDING_WINDOW_SIZE, 2, flat_observation=flat)
+    env.observation_space.seed(batch_size)
+    samples = [env.observation_space.sample() for _ in range(batch_size)]
+    if flat:
+        return np.stack(samples)
+    return Batch(samples)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 64])
+def test_fused_forward_matches_flat_forward(net: PreprocessNet, batch_size: int) -> None:
+    obs = _sample_obs(batch_size, flat=True)
+
+    with torch.no_grad():
+        expected = net._forward_flat(obs)
+        fused, _ = net(obs, None)
+
+    torch.testing.assert_close(fused, expected, rtol=1e-5, atol=ATOL)
+
+
+def test_fused_forward_matches_dict_forward(net: PreprocessNet) -> None:
+    obs = _sample_obs(16, flat=False)
+
+    with torch.no_grad():
+        expected = net._encode(
+            torch.as_tensor(obs.download_speed),
+            torch.as_tensor(obs.user_staying_time),
+            torch.as_tensor(obs.play_progress),
+            torch.as_tensor(obs.current_staying_time),
+            torch.as_tensor(obs.list_video_length[:, 0].reshape(-1, 1)),
+            torch.as_tensor(obs.list_buffered_content),
+        )
+        fused, _ = net(obs, None)
+
+    torch.testing.assert_close(fused, expected, rtol=1e-5, atol=ATOL)
+
+
+def test_fused_weights_follow_parameter_updates(net: PreprocessNet) -> None:
+    obs = _sample_obs(8, flat=True)
+    with torch.no_grad():
+        before = net(obs, None)[0].clone()
+        net.download_speed_conv[0].bias.add_(1.0)
+        expected = net._forward_flat(obs)
+        after, _ = net(obs, None)
+
+    assert not torch.equal(before, after)
+    torch.testing.assert_close(after, expected, rtol=1e-5, atol=ATOL)
+
+
+def test_fused_forward_keeps_autograd_outputs(net: PreprocessNet) -> None:
+    obs = _sample_obs(4, flat=True)
+
+    first, _ = net(obs, None)
+    second, _ = net(obs, None)
+
+    assert first.data_ptr() != second.data_ptr()
+
+
+def test_fused_forward_mixes_inference_no_grad_and_grad_modes(net: PreprocessNet) -> None:
+    obs = _sample_obs(8, flat=True)
+    with torch.no_grad():
+        expected = net._forward_flat(obs)
+
+    with torch.inference_mode():
+        in_inference, _ = net(obs, None)
+    with torch.no_grad():
+        in_no_grad, _ = net(obs, None)
+    with_grad, _ = net(obs, None)
+    with_grad.sum().backward()
+
+    for features in (in_inference, in_no_grad, with_grad):
+        torch.testing.assert_close(features, expected, rtol=1e-5, atol=ATOL)
+    assert with_grad.requires_grad
+    assert net.download_speed_conv[0].bias.grad is not None
+
+
+def test_fused_forward_returns_fresh_outputs(net: PreprocessNet) -> None:
+    obs = _sample_obs(8, flat=True)
+
+    with torch.no_grad():
+        first, _ = net(obs, None)
+        kept = first.clone()
+        net(obs[::-1].copy(), None)
+
+    torch.testing.assert_close(first, kept, rtol=0, atol=0)
@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+
+import numpy as np
+
+import torch
+
+from sit_liveclip.offline import evaluate_offline
+from sit_liveclip.core.recorder import RESET_ACTION, Transition, TransitionRecorder
+from sit_liveclip.core.observation import get_observation_layout
+
+
+LAYOUT = get_observation_layout(4, 3)
+
+# (marker in the observation, action, reward) of each row, two episodes
+ROWS = [
+    (0, RESET_ACTION, 0.0),
+    (1, 0, 1.0),
+    (2, 1, 0.0),
+    (3, 0, 0.5),
+    (4, RESET_ACTION, 0.0),
+    (5, 1, 2.0),
+]
+# Decisions pair an action and its reward with the observation of the row before:
+# (0, 0, 1.0), (1, 1, 0.0), (2, 0, 0.5) and (4, 1, 2.0). Both actions are logged
+# twice, so their frequencies are 0.5 and the reward model is [0.75, 1.0].
+
+
+def _model(obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """Takes action 1 with a probability of a fifth of the marker: 0, .2, .4 then .8."""
+    prob = obs[:, :1] / 5
+    probs = torch.cat([1 - prob, prob], dim=1)
+    return probs.argmax(dim=1), probs
+
+
+@pytest.fixture(name="recording_dir")
+def fixture_recording_dir(tmp_path: Path) -> Path:
+    recorder = TransitionRecorder(tmp_path, LAYOUT)
+    for marker, action, reward in ROWS:
+        obs = np.zeros(LAYOUT.size, dtype="float32")
+        obs[0] = marker
+        recorder.record(Transition(obs, action, reward, False, 0.0, 0.0, 0.0))
+    recorder.close()
+    return tmp_path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 64])
+def test_stochastic_policy_estimates(recording_dir: Path, chunk_size: int) -> None:
+    estimate = evaluate_offline(
+        _model,
+        [recording_dir],
+        greedy=False,
+        chunk_size=chunk_size,
+    )
+
+    # target probabilities of the logged actions: 1, .2, .6 and .8
+    # importance weights: 2, .4, 1.2 and 1.6
+    assert estimate.num_decisions == 4
+    assert estimate.agreement == pytest.approx(3 / 4)  # greedy actions: 0, 0, 0, 1
+    assert estimate.logged_reward == pytest.approx(3.5 / 4)
+    assert estimate.ips == pytest.approx((2 + 0 + 0.6 + 3.2) / 4)
+    assert estimate.wis == pytest.approx((2 + 0 + 0.6 + 3.2) / 5.2)
+    # direct estimates: .75, .8, .85 and .95, plus 2 * .25, .4 * -1, 1.2 * -.25, 1.6 * 1
+    assert estimate.dr == pytest.approx((1.25 + 0.4 + 0.55 + 2.55) / 4)
+    assert estimate.effective_sample_size == pytest.approx(5.2**2 / 8.16)
+
+
+def test_greedy_policy_estimates(recording_dir: Path) -> None:
+    estimate = evaluate_offline(_model, [recording_dir])
+
+    # the greedy policy agrees with the logged actions but the second one
+    # importance weights: 2, 0, 2 and 2
+    assert estimate.ips == pytest.approx((2 + 0 + 1 + 4) / 4)
+    assert estimate.wis == pytest.approx((2 + 0 + 1 + 4) / 6)
+    # direct estimates: .75, .75, .75 and 1, plus 2 * .25, 0, 2 * -.25, 2 * 1
+    assert estimate.dr == pytest.approx((1.25 + 0.75 + 0.25 + 3) / 4)
+
+
+def test_behavior_model_gives_the_propensities(recording_dir: Path) -> None:
+    estimate = evaluate_offline(
+        _model,
+        [recording_dir],
+        behavior_model=_model,
+        greedy=False,
+    )
+
+    # evaluating the logged policy itself, every importance weight is 1
+    assert estimate.ips == pytest.approx(estimate.logged_reward)
+    assert estimate.wis == pytest.approx(estimate.logged_reward)
+    assert estimate.dr == pytest.approx((1.0 - 0.2 + 0.6 + 1.95) / 4)
+    assert estimate.effective_sample_size == pytest.approx(4)
+    assert estimate.ips_stderr > 0
+
+
+def test_evaluation_needs_a_recording() -> None:
+    with pytest.raises(ValueError, match="No recording"):
+        evaluate_offline(_model, [])
@@ -0,0 +1,71 @@
+import pytest
+
+import numpy as np
+
+import torch
+from torch.ao.nn.quantized import dynamic
+from tianshou.utils.net.discrete import Actor
+
+from sit_liveclip.core import PreprocessNet
+from sit_liveclip.serving.model import DecisionModel
+from sit_liveclip.core.observation import get_observation_layout
+from sit_liveclip.serving.quantize import report_rows, quantize_int8, compare_models
+
+
+LAYOUT = get_observation_layout(4, 3)
+
+
+@pytest.fixture(name="model", scope="module")
+def fixture_model() -> DecisionModel:
+    torch.manual_seed(0)
+    net = PreprocessNet(
+        history_size=LAYOUT.history_size,
+        sliding_window_size=LAYOUT.sliding_window_size,
+        conv1d_out=4,
+        conv1d_kernel_size=3,
+        device="cpu",
+    )
+    return DecisionModel(Actor(net, 4, hidden_sizes=[16], device="cpu")).eval()
+
+
+@pytest.mark.parametrize("include_preprocess", [True, False])
+def test_int8_model_agrees_with_the_float_model(
+    model: DecisionModel,
+    include_preprocess: bool,
+) -> None:
+    obs = np.random.default_rng(0).random((500, LAYOUT.size), dtype="float32")
+
+    int8_model = quantize_int8(model, include_preprocess=include_preprocess)
+    reports = compare_models(model, {"int8": int8_model}, obs, (1, 16), repeat=2)
+
+    assert [report.name for report in reports] == ["fp32", "int8"]
+    assert reports[0].agreement == 1.0
+    assert reports[1].agreement >= 0.95
+    assert reports[1].max_prob_error < 0.01
+    assert set(reports[1].latency_ms) == {1, 16}
+
+
+@pytest.mark.parametrize("include_preprocess", [True, False])
+def test_quantized_copy_leaves_the_model_alone(
+    model: DecisionModel,
+    include_preprocess: bool,
+) -> None:
+    int8_model = quantize_int8(model, include_preprocess=include_preprocess)
+
+    quantized = [
+        module for module in int8_model.modules() if isinstance(module, dynamic.Linear)
+    ]
+    shared = any(module is model.actor.preprocess for module in int8_model.modules())
+    assert len(quantized) == (3 if include_preprocess else 2)  # with the folded net
+    assert shared != include_preprocess
+    assert not any(isinstance(module, dynamic.Linear) for module in model.modules())
+
+
+def test_report_rows_leave_missing_batch_sizes_blank(model: DecisionModel) -> None:
+    obs = np.zeros((8, LAYOUT.size), dtype="float32")
+    reports = compare_models(model, {}, obs, batch_sizes=(1, 16), repeat=1)
+
+    columns, rows = report_rows(reports)
+
+    assert columns == ["model", "agreement", "max prob error", "batch 1 (ms)"]
+    assert rows[0][:3] == ["fp32", "100.00%", "0.0000"]
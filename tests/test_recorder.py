@@ -0,0 +1,154 @@
+from pathlib import Path
+
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+import numpy as np
+
+from sit_liveclip.core.env import ReplayLiveClipEnv
+from sit_liveclip.core.action import Action
+from sit_liveclip.core.reward import RewardWeights
+from sit_liveclip.core.recorder import (
+    RESET_ACTION,
+    Recording,
+    Transition,
+    TransitionRecorder,
+    relabel_recording,
+)
+from sit_liveclip.core.observation import get_observation_layout
+from sit_liveclip.utils.serializer import NpyAppender
+
+
+LAYOUT = get_observation_layout(4, 3)
+SEGMENT_SIZE = 2
+
+
+def _transition(step: int, action: int, done: bool = False) -> Transition:
+    return Transition(
+        obs=np.full(LAYOUT.size, step, dtype="float32"),
+        action=action,
+        reward=-float(step),
+        done=done,
+        wastage_cost=0.5 * step,
+        wait_time=0.01,
+        step_time=0.02,
+    )
+
+
+def _record(out_dir: Path, transitions: list[Transition], flush_every: int = 2) -> None:
+    recorder = TransitionRecorder(out_dir, LAYOUT, flush_every=flush_every)
+    for transition in transitions:
+        recorder.record(transition)
+    recorder.close()
+
+
+# two episodes, the second one cut short by the end of the recording
+EPISODES = [
+    _transition(0, RESET_ACTION),
+    _transition(1, Action.CURRENT),
+    _transition(2, Action.NEXT, done=True),
+    _transition(3, RESET_ACTION),
+    _transition(4, Action.PAUSE),
+]
+
+
+def test_recording_reads_back_the_recorded_transitions(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES)
+
+    recording = Recording(tmp_path)
+
+    assert len(recording) == 5
+    assert (recording.history_size, recording.sliding_window_size) == (4, 3)
+    assert_array_equal(recording.columns["obs"][:, 0], np.arange(5))
+    assert_array_equal(recording.columns["action"], [-1, 1, 2, -1, 0])
+    assert_array_equal(recording.columns["done"], [False, False, True, False, False])
+    assert_array_equal(recording.reset_rows(), [0, 3])
+
+
+def test_recorder_appends_to_an_existing_recording(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES[:3])
+    _record(tmp_path, EPISODES[3:])
+
+    assert len(Recording(tmp_path)) == 5
+
+
+def test_recording_ignores_rows_missing_from_some_columns(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES)
+    with NpyAppender(tmp_path / "reward.npy", "float32") as reward:
+        reward.append([1.0])  # as if the recorder died mid-write
+
+    assert len(Recording(tmp_path)) == 5
+
+
+def test_find_lists_one_recording_per_env(tmp_path: Path) -> None:
+    for env_id in (1, 0):
+        _record(tmp_path / f"env-{env_id}", EPISODES[:1])
+
+    assert Recording.find(tmp_path) == [tmp_path / "env-0", tmp_path / "env-1"]
+    assert Recording.find(tmp_path / "env-0") == [tmp_path / "env-0"]
+
+
+def test_replay_env_plays_back_episodes_in_order(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES)
+    env = ReplayLiveClipEnv(tmp_path, SEGMENT_SIZE, flat_observation=True)
+
+    first_obs = env.reset()
+    _, reward, done, info = env.step(Action.PAUSE)
+    _, last_reward, last_done, _ = env.step(Action.PAUSE)
+
+    assert first_obs[0] == 0
+    assert (reward, done, info["recorded_action"]) == (-1.0, False, Action.CURRENT)
+    assert (last_reward, last_done) == (-2.0, True)
+
+
+def test_replay_env_ends_an_episode_cut_short(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES)
+    env = ReplayLiveClipEnv(tmp_path, SEGMENT_SIZE)
+    env.reset()
+    env.reset()
+
+    env.step(Action.CURRENT)
+    obs, reward, done, info = env.step(Action.CURRENT)
+
+    assert obs["download_speed"][0, 0] == 4
+    assert (reward, done, info["recorded_action"]) == (0.0, True, RESET_ACTION)
+
+
+def test_replay_env_needs_an_episode(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES[1:3])
+
+    with pytest.raises(ValueError, match="no recorded episode"):
+        ReplayLiveClipEnv(tmp_path, SEGMENT_SIZE)
+
+
+def test_relabel_penalizes_rebuffering_and_wastage(tmp_path: Path) -> None:
+    rebuffering_obs = np.zeros(LAYOUT.size, dtype="float32")  # nothing buffered
+    rebuffering_obs[LAYOUT.slices["list_video_length"]] = 60.0
+    _record(
+        tmp_path,
+        [
+            _transition(0, RESET_ACTION),
+            _transition(1, Action.CURRENT)._replace(obs=rebuffering_obs),
+            _transition(2, Action.NEXT),  # fully buffered video
+        ],
+    )
+
+    num_rows = relabel_recording(tmp_path, tmp_path / "relabeled.npy", SEGMENT_SIZE)
+    relabel_recording(
+        tmp_path,
+        tmp_path / "former.npy",
+        SEGMENT_SIZE,
+        RewardWeights(rebuffering=-1.0),
+        chunk_size=2,
+    )
+
+    assert num_rows == 3
+    assert_allclose(np.load(tmp_path / "relabeled.npy"), [0.0, -1.5, -1.0])
+    assert_allclose(np.load(tmp_path / "former.npy"), [0.0, 0.5, -1.0])
+
+
+def test_relabel_does_not_overwrite_the_recording(tmp_path: Path) -> None:
+    _record(tmp_path, EPISODES)
+
+    with pytest.raises(ValueError, match="column"):
+        relabel_recording(tmp_path, tmp_path / "reward.npy", SEGMENT_SIZE)
@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import pytest
+from numpy.testing import assert_array_equal
+
+import numpy as np
+
+from sit_liveclip.utils.serializer import (
+    NpyAppender,
+    serialize,
+    deserialize,
+    iter_json_lines,
+)
+
+
+@pytest.mark.parametrize("suffix", [".npy", ".pkl"])
+def test_array_round_trip(tmp_path: Path, suffix: str) -> None:
+    data = np.arange(12, dtype="float32").reshape(3, 4)
+
+    serialize(tmp_path / f"data{suffix}", data)
+
+    assert_array_equal(deserialize(tmp_path / f"data{suffix}"), data)
+
+
+def test_npz_is_read_lazily_by_key(tmp_path: Path) -> None:
+    data = {"a": np.arange(3), "b": np.ones((2, 2), dtype="float32")}
+
+    serialize(tmp_path / "data.npz", data)
+    loaded = deserialize(tmp_path / "data.npz")
+
+    assert sorted(loaded.files) == ["a", "b"]
+    assert_array_equal(loaded["b"], data["b"])
+
+
+def test_jsonl_streams_records(tmp_path: Path) -> None:
+    records = ({"step": idx, "reward": -idx / 2} for idx in range(3))
+
+    serialize(tmp_path / "data.jsonl", records)
+
+    assert list(iter_json_lines(tmp_path / "data.jsonl"))[-1] == {"step": 2, "reward": -1}
+    assert len(deserialize(tmp_path / "data.jsonl")) == 3
+
+
+def test_mmap_mode_is_only_supported_for_npy(tmp_path: Path) -> None:
+    serialize(tmp_path / "data.npy", np.arange(4))
+    serialize(tmp_path / "data.json", [1, 2])
+
+    mapped = deserialize(tmp_path / "data.npy", mmap_mode="r")
+
+    assert isinstance(mapped, np.memmap)
+    with pytest.raises(ValueError, match="mmap_mode"):
+        deserialize(tmp_path / "data.json", mmap_mode="r")
+
+
+def test_unsupported_format_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="not supported"):
+        serialize(tmp_path / "data.csv", [1])
+
+
+def test_appender_writes_a_valid_npy(tmp_path: Path) -> None:
+    out_file = tmp_path / "rows.npy"
+
+    with NpyAppender(out_file, "float32", row_shape=(3,)) as appender:
+        appender.append(np.zeros((2, 3)))
+        appender.append(np.ones(3))
+
+    rows = np.load(out_file)
+    assert rows.shape == (3, 3)
+    assert rows.dtype == np.float32
+    assert_array_equal(rows[2], 1.0)
+
+
+def test_appender_reopens_and_appends(tmp_path: Path) -> None:
+    out_file = tmp_path / "rows.npy"
+    with NpyAppender(out_file, "int64") as appender:
+        appender.append([0, 1])
+
+    with NpyAppender(out_file, "int64") as appender:
+        appender.append([2])
+
+    assert_array_equal(np.load(out_file), [0, 1, 2])
+
+
+def test_appender_drops_rows_written_after_the_last_flush(tmp_path: Path) -> None:
+    out_file = tmp_path / "rows.npy"
+    appender = NpyAppender(out_file, "int64")
+    appender.append([0, 1, 2])
+    appender.flush()
+    appender.append([3, 4])
+    appender.file.flush()  # on disk, but not counted in the header
+    appender.file.close()  # the writer dies without closing the appender
+
+    with NpyAppender(out_file, "int64") as reopened:
+        assert reopened.num_rows == 3
+        reopened.append([5])
+
+    assert_array_equal(np.load(out_file), [0, 1, 2, 5])
+
+
+def test_appender_file_can_be_read_while_written(tmp_path: Path) -> None:
+    out_file = tmp_path / "rows.npy"
+
+    with NpyAppender(out_file, "float32", row_shape=(2,)) as appender:
+        appender.append(np.zeros((4, 2)))
+        appender.flush()
+        first = deserialize(out_file, mmap_mode="r")
+        appender.append(np.ones((2, 2)))
+        appender.flush()
+        second = deserialize(out_file, mmap_mode="r")
+
+    assert first.shape == (4, 2)
+    assert second.shape == (6, 2)
+    assert_array_equal(second[4:], 1.0)
+
+
+def test_appender_rejects_mismatched_rows(tmp_path: Path) -> None:
+    out_file = tmp_path / "rows.npy"
+    with NpyAppender(out_file, "float32", row_shape=(2,)) as appender:
+        appender.append(np.zeros(2))
+
+    with pytest.raises(ValueError, match="Cannot append"):
+        NpyAppender(out_file, "float32", row_shape=(3,))
+
+
+def test_appender_checks_the_row_shape_before_opening_the_file(tmp_path: Path) -> None:
+    out_file = tmp_path / "rows.npy"
+
+    with pytest.raises(ValueError, match="too large"):
+        NpyAppender(out_file, "float32", row_shape=(1000,) * 20)
+
+    assert not out_file.exists()
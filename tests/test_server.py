@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterator
+
+import time
+import threading
+
+import pytest
+from numpy.testing import assert_allclose
+
+import requests
+from werkzeug.serving import make_server
+
+import server
+from sit_liveclip.utils import TIMERS
+from sit_liveclip.broker import Mailbox, MailboxRegistry
+from sit_liveclip.core.action import Action
+from sit_liveclip.core.player_connection import PlayerConnection
+
+
+if TYPE_CHECKING:
+    from flask.testing import FlaskClient
+
+
+HISTORY_SIZE = 3
+SLIDING_WINDOW_SIZE = 2
+TIMEOUT = 5.0  # seconds
+
+
+def _player_state(play_progress: float) -> dict[str, Any]:
+    return {
+        "status": False,
+        "wastage_cost": 0.5,
+        "download_speed": [1000.0] * HISTORY_SIZE,
+        "user_staying_time": [10.0] * HISTORY_SIZE,
+        "play_progress": play_progress,
+        "current_staying_time": 5.0,
+        "replay_round": 0.0,
+        "list_video_bitrate": [750.0] * SLIDING_WINDOW_SIZE,
+        "list_video_length": [30.0] * SLIDING_WINDOW_SIZE,
+        "list_buffered_content": [2.0] * SLIDING_WINDOW_SIZE,
+        "list_time_spent_downloading_videos": [0.5] * SLIDING_WINDOW_SIZE,
+        "list_completed_videos": [0.0] * SLIDING_WINDOW_SIZE,
+    }
+
+
+def _answer_actions(client: FlaskClient, num_actions: int, **kwargs: Any) -> list[int]:
+    """Act as a player in a thread: answer each action with a state marking it."""
+    actions: list[int] = []
+
+    def play() -> None:
+        for _ in range(num_actions):
+            res = client.get("/action", query_string={"timeout": TIMEOUT}, **kwargs)
+            actions.append(res.json["action"])
+            client.post("/state", json=_player_state(actions[-1]), **kwargs)
+
+    threading.Thread(target=play, daemon=True).start()
+    return actions
+
+
+def _wait_for_waiter(mailbox: Mailbox[Any]) -> None:
+    while mailbox.num_waiters == 0:
+        time.sleep(0.001)
+
+
+@pytest.fixture(name="registry", autouse=True)
+def fixture_registry(monkeypatch: pytest.MonkeyPatch) -> MailboxRegistry[Any]:
+    registry: MailboxRegistry[Any] = MailboxRegistry(server.MAILBOX_CAPACITY)
+    monkeypatch.setattr(server, "mailboxes", registry)
+    return registry
+
+
+@pytest.fixture(name="client")
+def fixture_client() -> FlaskClient:
+    return server.app.test_client()
+
+
+@pytest.fixture(name="base_url")
+def fixture_base_url() -> Iterator[str]:
+    http_server = make_server("127.0.0.1", 0, server.app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{http_server.server_port}"
+    http_server.shutdown()
+
+
+def test_step_answers_with_the_next_state(client: FlaskClient) -> None:
+    actions = _answer_actions(client, num_actions=1)
+
+    res = client.post("/step", json={"action": 2})
+
+    assert res.status_code == 200
+    assert actions == [2]
+    assert res.json["state"]["play_progress"] == 2
+    assert res.json["wait_time"] >= 0
+
+
+def test_step_discards_states_of_earlier_actions(client: FlaskClient) -> None:
+    client.post("/state", json=_player_state(-1))
+    _answer_actions(client, num_actions=1)
+
+    res = client.post("/step", json={"action": 1})
+
+    assert res.json["state"]["play_progress"] == 1
+
+
+def test_step_times_out_with_504(client: FlaskClient) -> None:
+    res = client.post("/step", json={"action": 1}, query_string={"timeout": 0.01})
+
+    assert res.status_code == 504
+
+
+def test_state_is_404_without_timeout_and_204_after_it(client: FlaskClient) -> None:
+    missing = client.get("/state")
+    timed_out = client.get("/state", query_string={"timeout": 0.01})
+
+    assert missing.status_code == 404
+    assert timed_out.status_code == 204
+
+
+def test_long_poll_answers_once_the_state_is_posted(
+    client: FlaskClient,
+    registry: MailboxRegistry[Any],
+) -> None:
+    def post_state() -> None:
+        _wait_for_waiter(registry.get(None))
+        client.post("/state", json=_player_state(3.0))
+
+    threading.Thread(target=post_state, daemon=True).start()
+
+    res = client.get("/state", query_string={"timeout": TIMEOUT})
+
+    assert res.status_code == 200
+    assert res.json["state"]["play_progress"] == 3.0
+
+
+def test_sessions_are_routed_by_header(client: FlaskClient) -> None:
+    client.post("/state", json=_player_state(1.0), headers={"X-Session-Id": "a"})
+
+    other = client.get("/state", headers={"X-Session-Id": "b"})
+    same = client.get("/state", query_string={"session": "a"})
+
+    assert other.status_code == 404
+    assert same.json["state"]["play_progress"] == 1.0
+
+
+def test_binary_state_is_sent_to_clients_preferring_it(client: FlaskClient) -> None:
+    client.post("/state", json=_player_state(1.0))
+
+    res = client.get("/state", headers={"Accept": "application/x-liveclip-state"})
+
+    assert res.mimetype == "application/x-liveclip-state"
+    assert float(res.headers["X-Wait-Time"]) >= 0
+
+
+def test_new_sessions_are_refused_with_503_when_all_are_waited_on(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    registry: MailboxRegistry[Any] = MailboxRegistry(max_sessions=1)
+    monkeypatch.setattr(server, "mailboxes", registry)
+    waiter = threading.Thread(
+        target=client.get,
+        args=("/state",),
+        kwargs={"query_string": {"timeout": TIMEOUT}},
+    )
+    waiter.start()
+    _wait_for_waiter(registry.get(None))
+
+    res = client.get("/state", headers={"X-Session-Id": "other"})
+
+    client.post("/state", json=_player_state(0.0))
+    waiter.join(timeout=TIMEOUT)
+    assert res.status_code == 503
+    assert registry.num_rejected == 1
+
+
+def test_metrics_report_counters_and_enabled_timers(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(TIMERS, "enabled", True)
+    monkeypatch.setattr(TIMERS, "trackers", {})
+    client.post("/state", json=_player_state(1.0))
+    client.get("/state")
+
+    res = client.get("/metrics")
+
+    lines = res.get_data(as_text=True).splitlines()
+    assert res.mimetype == "text/plain"
+    assert "liveclip_sessions 1" in lines
+    assert "liveclip_states_posted 1" in lines
+    assert "liveclip_broker_respond_seconds_count 1" in lines
+
+
+@pytest.mark.parametrize("legacy_protocol", [False, True])
+def test_player_connection_steps_through_the_broker(
+    base_url: str,
+    legacy_protocol: bool,
+) -> None:
+    conn = PlayerConnection(base_url, "player-0", legacy_protocol=legacy_protocol)
+    headers = {"X-Session-Id": "player-0"}
+    actions = _answer_actions(server.app.test_client(), 1, headers=headers)
+
+    res = conn.step(Action.NEXT, timeout=TIMEOUT)
+    conn.close()
+
+    assert actions == [1]  # players number the actions from -1
+    assert_allclose(res.obs["play_progress"], [1.0])
+    assert (res.done, res.wastage_cost) == (False, 0.5)
+
+
+def test_player_connection_step_times_out(base_url: str) -> None:
+    conn = PlayerConnection(base_url)
+
+    with pytest.raises(requests.Timeout):
+        conn.step(Action.NEXT, timeout=0.1)
+    conn.close()
+
+
+def test_get_state_gives_up_after_its_timeout(base_url: str) -> None:
+    conn = PlayerConnection(base_url, legacy_protocol=True)
+    conn.poll_timeout = 0.05
+
+    with pytest.raises(requests.Timeout):
+        conn.get_state(timeout=0.2)
+    conn.close()
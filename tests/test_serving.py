@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from typing import Any, TypeVar, Callable, Awaitable
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+import numpy as np
+from aiohttp.test_utils import TestClient, TestServer
+
+import torch
+from tianshou.utils.net.discrete import Actor
+
+from sit_liveclip.core import PreprocessNet, wire
+from sit_liveclip.serving.app import make_app
+from sit_liveclip.serving.model import load_decision_model, export_decision_model
+from sit_liveclip.serving.batcher import MicroBatcher
+from sit_liveclip.core.observation import get_observation_layout
+
+
+T = TypeVar("T")
+
+HISTORY_SIZE = 4
+SLIDING_WINDOW_SIZE = 3
+LAYOUT = get_observation_layout(HISTORY_SIZE, SLIDING_WINDOW_SIZE)
+
+
+def _make_actor() -> Actor:
+    torch.manual_seed(0)
+    net = PreprocessNet(
+        history_size=HISTORY_SIZE,
+        sliding_window_size=SLIDING_WINDOW_SIZE,
+        conv1d_out=4,
+        conv1d_kernel_size=3,
+        device="cpu",
+    )
+    return Actor(net, 4, hidden_sizes=[8], device="cpu").eval()
+
+
+def _observations(num: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.uniform(0, 100, (num, LAYOUT.size)).astype("float32")
+
+
+def _player_state(history_size: int = HISTORY_SIZE) -> dict[str, Any]:
+    return {
+        "status": False,
+        "wastage_cost": 0.0,
+        "download_speed": [1000.0] * history_size,
+        "user_staying_time": [10.0] * history_size,
+        "play_progress": 3.0,
+        "current_staying_time": 5.0,
+        "replay_round": 0.0,
+        "list_video_bitrate": [750.0] * SLIDING_WINDOW_SIZE,
+        "list_video_length": [30.0] * SLIDING_WINDOW_SIZE,
+        "list_buffered_content": [2.0] * SLIDING_WINDOW_SIZE,
+        "list_time_spent_downloading_videos": [0.5] * SLIDING_WINDOW_SIZE,
+        "list_completed_videos": [0.0] * SLIDING_WINDOW_SIZE,
+    }
+
+
+def _argmax_model(obs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """Picks the largest of the first four observation values."""
+    probs = torch.softmax(obs[:, :4], dim=1)
+    return probs.argmax(dim=1), probs
+
+
+def _run(test: Callable[[TestClient], Awaitable[T]]) -> T:
+    async def run() -> T:
+        batcher = MicroBatcher(_argmax_model, LAYOUT.size, max_batch_size=4)
+        async with TestClient(TestServer(make_app(batcher, LAYOUT))) as client:
+            return await test(client)
+
+    return asyncio.run(run())
+
+
+def test_exported_model_decides_as_the_actor(tmp_path: Path) -> None:
+    actor = _make_actor()
+    obs = _observations(16)
+
+    export_decision_model(actor, LAYOUT, tmp_path / "model.pt")
+    model = load_decision_model(tmp_path / "model.pt")
+
+    with torch.no_grad():
+        probs, _ = actor(obs)
+        actions, model_probs = model(torch.as_tensor(obs))
+    assert_array_equal(actions.numpy(), probs.argmax(dim=-1).numpy())
+    assert_allclose(model_probs.numpy(), probs.numpy(), atol=1e-5)
+
+
+def test_decide_answers_json_and_binary_states() -> None:
+    state = _player_state()
+    expected = _argmax_model(
+        torch.as_tensor(LAYOUT.flatten(wire.decode_state_json(state).obs))[None]
+    )
+
+    async def test(client: TestClient) -> list[dict[str, Any]]:
+        decisions = []
+        for kwargs in (
+            {"json": state},
+            {"json": {"state": state}},
+            {
+                "data": wire.encode_state(state),
+                "headers": {"Content-Type": wire.STATE_MEDIA_TYPE},
+            },
+        ):
+            res = await client.post("/decide", **kwargs)
+            decisions.append(await res.json())
+        return decisions
+
+    decisions = _run(test)
+
+    for decision in decisions:
+        assert decision["action"] == int(expected[0])
+        assert_allclose(decision["probs"], expected[1][0].numpy(), rtol=1e-6)
+
+
+def test_decide_rejects_states_of_another_layout() -> None:
+    async def test(client: TestClient) -> tuple[int, str]:
+        res = await client.post("/decide", json=_player_state(HISTORY_SIZE + 1))
+        return res.status, await res.text()
+
+    status, text = _run(test)
+
+    assert status == 400
+    assert "history of 4" in text
+
+
+def test_stats_count_the_decisions() -> None:
+    async def test(client: TestClient) -> dict[str, Any]:
+        await asyncio.gather(
+            *(client.post("/decide", json=_player_state()) for _ in range(3)),
+        )
+        res = await client.get("/stats")
+        return await res.json()
+
+    stats = _run(test)
+
+    assert stats["decisions"] == 3
+    assert 1 <= stats["batches"] <= 3
+
+
+@pytest.mark.parametrize("binary", [True, False])
+def test_socket_answers_every_state(binary: bool) -> None:
+    state = _player_state()
+
+    async def test(client: TestClient) -> list[dict[str, Any]]:
+        async with client.ws_connect("/ws") as socket:
+            for _ in range(2):
+                if binary:
+                    await socket.send_bytes(wire.encode_state(state))
+                else:
+                    await socket.send_json(state)
+            await socket.send_str("{}")
+            return [await socket.receive_json(timeout=5.0) for _ in range(3)]
+
+    first, second, error = _run(test)
+
+    assert first["action"] == second["action"]
+    assert "Invalid player state" in error["error"]
@@ -0,0 +1,138 @@
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+import numpy as np
+
+from sit_liveclip.core.action import Action
+from sit_liveclip.core.simulator import PlayerSimulator, SimulatedLiveClipEnv
+
+
+HISTORY_SIZE = 4
+SLIDING_WINDOW_SIZE = 3
+SEGMENT_SIZE = 2
+BANDWIDTH = 3000.0  # kbps, so 6 seconds of a 1000 kbps clip per step
+
+
+def _make_simulator(num_sessions: int = 3, **kwargs: object) -> PlayerSimulator:
+    kwargs.setdefault("bandwidth_traces", np.full((1, 1000), BANDWIDTH, "float32"))
+    return PlayerSimulator(
+        num_sessions,
+        HISTORY_SIZE,
+        SLIDING_WINDOW_SIZE,
+        SEGMENT_SIZE,
+        episode_length=10,
+        mean_staying_time=1000.0,  # clipped to the clip length
+        seed=0,
+        **kwargs,  # type: ignore[arg-type]
+    )
+
+
+def _field(simulator: PlayerSimulator, obs: np.ndarray, field: str) -> np.ndarray:
+    return obs[:, simulator.layout.slices[field]]
+
+
+def test_reset_starts_with_empty_buffers() -> None:
+    simulator = _make_simulator()
+
+    obs = simulator.reset(np.arange(3))
+
+    assert obs.shape == (3, simulator.layout.size)
+    assert_array_equal(_field(simulator, obs, "list_video_bitrate"), 1000.0)
+    assert_array_equal(_field(simulator, obs, "list_video_length"), 60.0)
+    assert_array_equal(_field(simulator, obs, "list_buffered_content"), 0.0)
+    assert_array_equal(simulator.step_count, 0)
+
+
+def test_step_downloads_the_chosen_clip_and_plays_the_current_one() -> None:
+    simulator = _make_simulator()
+    ids = np.arange(3)
+    simulator.reset(ids)
+    actions = np.array([Action.PAUSE, Action.CURRENT, Action.NEXT])
+
+    obs, wastage_cost, rebuffering_time = simulator.step(actions, ids)
+
+    buffered = _field(simulator, obs, "list_buffered_content")
+    assert_allclose(buffered[:, 0], [0.0, 6.0, 0.0])
+    assert_allclose(buffered[:, 1], [0.0, 0.0, 6.0])
+    assert_allclose(_field(simulator, obs, "play_progress")[:, 0], [0.0, 2.0, 0.0])
+    assert_allclose(rebuffering_time, [2.0, 0.0, 2.0])
+    assert_allclose(wastage_cost, 0.0)
+    assert_allclose(_field(simulator, obs, "download_speed")[:, -1], BANDWIDTH)
+
+
+def test_swipe_moves_the_window_and_charges_the_unwatched_buffer() -> None:
+    simulator = _make_simulator(num_sessions=1)
+    ids = np.arange(1)
+    simulator.reset(ids)
+    simulator.planned_staying_time[:] = SEGMENT_SIZE
+
+    obs, wastage_cost, _ = simulator.step(np.array([Action.CURRENT]), ids)
+
+    # 6 s buffered, 2 s watched, 4 s of a 1000 kbps clip wasted
+    assert_allclose(wastage_cost, [4.0])
+    assert simulator.clip_count[0] == 1
+    assert_allclose(_field(simulator, obs, "play_progress"), 0.0)
+    assert_allclose(_field(simulator, obs, "list_buffered_content"), 0.0)
+    assert_allclose(_field(simulator, obs, "user_staying_time")[0, -1], SEGMENT_SIZE)
+
+
+def test_sessions_are_done_after_the_episode_length() -> None:
+    simulator = _make_simulator()
+    ids = np.arange(3)
+    simulator.reset(ids)
+
+    for _ in range(10):
+        assert not simulator.is_done(ids).any()
+        simulator.step(np.full(3, Action.CURRENT), ids)
+
+    assert simulator.is_done(ids).all()
+
+
+def test_env_steps_only_the_requested_sessions() -> None:
+    env = SimulatedLiveClipEnv(
+        4,
+        HISTORY_SIZE,
+        SLIDING_WINDOW_SIZE,
+        SEGMENT_SIZE,
+        flat_observation=True,
+        seed=0,
+    )
+    env.reset()
+
+    obs, reward, done, info = env.step(np.full(2, Action.CURRENT), id=[1, 3])
+
+    assert obs.shape == (2, env.simulator.layout.size)
+    assert reward.shape == done.shape == (2,)
+    assert_array_equal(info.env_id, [1, 3])
+    assert_array_equal(env.simulator.step_count, [0, 1, 0, 1])
+
+
+@pytest.mark.parametrize("flat", [True, False])
+def test_env_observations_fit_the_observation_space(flat: bool) -> None:
+    env = SimulatedLiveClipEnv(
+        2,
+        HISTORY_SIZE,
+        SLIDING_WINDOW_SIZE,
+        SEGMENT_SIZE,
+        flat_observation=flat,
+        seed=0,
+    )
+    space = env.get_env_attr("observation_space")[0]
+
+    obs = env.reset()
+
+    for idx in range(2):
+        assert space.contains(obs[idx] if flat else obs[idx].__dict__)
+
+
+def test_seed_makes_episodes_reproducible() -> None:
+    def rollout(seed: int) -> np.ndarray:
+        simulator = PlayerSimulator(
+            2, HISTORY_SIZE, SLIDING_WINDOW_SIZE, SEGMENT_SIZE, seed=seed
+        )
+        ids = np.arange(2)
+        simulator.reset(ids)
+        return simulator.step(np.full(2, Action.NEXT), ids)[0]
+
+    assert_array_equal(rollout(1), rollout(1))
+    assert not np.array_equal(rollout(1), rollout(2))
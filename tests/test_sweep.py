@@ -0,0 +1,63 @@
+import pytest
+
+from sit_liveclip.sweep import SweepRun, sweep_rows, expand_grid, sample_grid
+
+
+SPACE = {"batch_size": [64, 128, 256], "conv1d_out": [4, 8], "flat_observation": [True]}
+
+
+def test_grid_has_every_combination_in_order() -> None:
+    grid = expand_grid(SPACE)
+
+    assert len(grid) == 6
+    assert grid[0] == {"batch_size": 64, "conv1d_out": 4, "flat_observation": True}
+    assert grid[-1] == {"batch_size": 256, "conv1d_out": 8, "flat_observation": True}
+    assert [list(variant) for variant in grid] == [list(SPACE)] * 6
+
+
+@pytest.mark.parametrize("space", [{"batch_size": []}, {"batch_size": 64}])
+def test_grid_values_must_be_non_empty_lists(space: dict) -> None:
+    with pytest.raises(ValueError, match="`batch_size` should have"):
+        expand_grid(space)
+
+    with pytest.raises(ValueError, match="`batch_size` should have"):
+        sample_grid(space, 1)
+
+
+def test_samples_are_distinct_combinations_of_the_grid() -> None:
+    grid = expand_grid(SPACE)
+
+    samples = sample_grid(SPACE, 4, seed=1)
+
+    assert len(samples) == 4
+    assert all(sample in grid for sample in samples)
+    assert len({tuple(sample.values()) for sample in samples}) == 4
+    assert samples == sample_grid(SPACE, 4, seed=1)
+
+
+def test_samples_are_capped_at_the_grid_size() -> None:
+    samples = sample_grid(SPACE, 100)
+
+    assert sorted(samples, key=lambda s: tuple(s.values())) == expand_grid(SPACE)
+
+
+def test_sweep_rows_list_the_overridden_fields() -> None:
+    runs = [
+        SweepRun("run-000", {"batch_size": 64}, 0.5, 0.25, 1000, 12.3),
+        SweepRun("run-001", {"conv1d_out": 8}, None, None, None, 1.0, "ValueError()"),
+    ]
+
+    columns, rows = sweep_rows(runs)
+
+    assert columns == [
+        "run",
+        "batch_size",
+        "conv1d_out",
+        "reward",
+        "train steps",
+        "duration",
+    ]
+    assert rows == [
+        ["run-000", "64", "", "0.500 ± 0.250", "1000", "12s"],
+        ["run-001", "", "8", "failed", "", "1s"],
+    ]
@@ -0,0 +1,118 @@
+import re
+
+import pytest
+
+from sit_liveclip.utils.timing import TIMERS, Timers, LatencyTracker, format_metrics
+
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{quantile="[0-9.]+"\})? \S+$')
+
+
+def _add(timers: Timers, name: str, num: int) -> None:
+    for seconds in range(1, num + 1):
+        timers.add(name, seconds / 1e3)
+
+
+@pytest.fixture(name="timers")
+def fixture_timers() -> Timers:
+    timers = Timers()
+    timers.enabled = True
+    return timers
+
+
+def test_disabled_timers_record_nothing() -> None:
+    timers = Timers()
+
+    @timers.timed("call")
+    def call() -> int:
+        return 1
+
+    with timers.time("block"):
+        pass
+
+    assert call() == 1
+    assert timers.summary() == {}
+
+
+def test_enabled_timers_aggregate_calls(timers: Timers) -> None:
+    @timers.timed("call")
+    def call() -> int:
+        return 1
+
+    for _ in range(3):
+        call()
+        with timers.time("block"):
+            pass
+
+    summary = timers.summary()
+    assert set(summary) == {"block", "call"}
+    assert summary["call"]["count"] == 3
+    assert 0 <= summary["call"]["p50_ms"] <= summary["call"]["p99_ms"]
+
+
+def test_timed_functions_are_timed_when_they_raise(timers: Timers) -> None:
+    @timers.timed("call")
+    def call() -> None:
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        call()
+
+    assert timers.summary()["call"]["count"] == 1
+
+
+def test_summary_has_the_quantiles_of_the_latencies(timers: Timers) -> None:
+    _add(timers, "step", 100)
+
+    summary = timers.summary()["step"]
+
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert summary["p90_ms"] == pytest.approx(90.1)
+    assert summary["p99_ms"] == pytest.approx(99.01)
+
+
+def test_tracker_keeps_the_last_window_but_counts_everything() -> None:
+    tracker = LatencyTracker(window=4)
+
+    for seconds in range(10):
+        tracker.add(float(seconds))
+
+    assert sorted(tracker.values()) == [6.0, 7.0, 8.0, 9.0]
+    assert (tracker.count, tracker.total) == (10, 45.0)
+    assert tracker.summary()["p50_ms"] == pytest.approx(7500.0)
+
+
+def test_reset_drops_the_trackers(timers: Timers) -> None:
+    _add(timers, "step", 2)
+
+    timers.reset()
+
+    assert timers.summary() == {}
+
+
+def test_shared_timers_are_disabled_by_default() -> None:
+    assert not TIMERS.enabled
+
+
+def test_metrics_are_prometheus_text(timers: Timers) -> None:
+    _add(timers, "env/step", 10)
+    _add(timers, "policy.forward", 1)
+
+    text = format_metrics(timers, {"sessions": 2, "states_dropped": 0})
+
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    for line in lines:
+        assert line.startswith("# TYPE ") or SAMPLE.match(line), line
+    assert "# TYPE liveclip_sessions gauge" in lines
+    assert "# TYPE liveclip_env_step_seconds summary" in lines
+    assert "liveclip_env_step_seconds_count 10" in lines
+    assert "liveclip_env_step_seconds_sum 0.055" in lines
+    assert "liveclip_policy_forward_seconds_count 1" in lines
+
+
+def test_metrics_of_disabled_timers_are_counters_only() -> None:
+    assert format_metrics(Timers(), {"sessions": 0}, prefix="broker") == (
+        "# TYPE broker_sessions gauge\nbroker_sessions 0\n"
+    )
@@ -0,0 +1,79 @@
+import pickle
+from pathlib import Path
+
+import pytest
+from numpy.testing import assert_array_equal
+
+import numpy as np
+
+from sit_liveclip.utils.trace_store import TraceStore, pack_traces
+
+
+TRACES = [np.arange(5), np.arange(10, 12), np.arange(20, 27)]
+
+
+@pytest.fixture(name="store_file")
+def fixture_store_file(tmp_path: Path) -> Path:
+    pack_traces(tmp_path / "traces.bin", iter(TRACES))
+    return tmp_path / "traces.bin"
+
+
+def test_packed_traces_read_back(store_file: Path) -> None:
+    store = TraceStore.open(store_file)
+
+    assert len(store) == 3
+    for idx, trace in enumerate(TRACES):
+        assert_array_equal(store[idx], trace)
+        assert store[idx].dtype == np.float32
+    assert_array_equal(store.lengths, [5, 2, 7])
+
+
+def test_pickled_store_maps_the_file_again(store_file: Path) -> None:
+    store = TraceStore.open(store_file)
+
+    unpickled = pickle.loads(pickle.dumps(store))
+
+    assert store.__getstate__() == {"path": store_file}  # not the traces
+    assert isinstance(unpickled.data, np.memmap)
+    assert unpickled.path == store_file
+    assert_array_equal(unpickled[2], TRACES[2])
+
+
+def test_in_memory_store_pickles_its_traces() -> None:
+    store = TraceStore.from_traces(TRACES)
+
+    unpickled = pickle.loads(pickle.dumps(store))
+
+    assert unpickled.path is None
+    assert_array_equal(unpickled[1], TRACES[1])
+
+
+def test_open_rejects_other_files(tmp_path: Path) -> None:
+    (tmp_path / "traces.bin").write_bytes(b"NOTATRACE" + bytes(16))
+
+    with pytest.raises(ValueError, match="not a trace store"):
+        TraceStore.open(tmp_path / "traces.bin")
+
+
+def test_store_may_be_empty() -> None:
+    store = TraceStore.from_traces([])
+
+    assert len(store) == 0
+    assert store.data.dtype == np.float32
+
+
+def test_windows_stay_within_a_trace() -> None:
+    store = TraceStore.from_traces(TRACES)
+
+    windows = store.sample_windows(np.random.default_rng(0), 200, window_size=4)
+
+    assert windows.shape == (200, 4)
+    assert_array_equal(np.diff(windows, axis=1), 1)  # consecutive values of a trace
+    assert set(windows[:, 0]) <= {0, 1, 20, 21, 22, 23}  # the 2-long trace is skipped
+
+
+def test_windows_need_a_long_enough_trace() -> None:
+    store = TraceStore.from_traces(TRACES)
+
+    with pytest.raises(ValueError, match="at least 8 values"):
+        store.sample_windows(np.random.default_rng(0), 1, window_size=8)
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+
+import numpy as np
+
+from tianshou.env import DummyVectorEnv
+
+from sit_liveclip.core.deadline import DeadlinePolicy
+from sit_liveclip.core.recorder import RESET_ACTION, Transition, TransitionRecorder
+from sit_liveclip.core.vector_env import (
+    PlayerSpec,
+    DecisionClock,
+    build_player_specs,
+    make_live_vector_env,
+    make_replay_vector_env,
+)
+from sit_liveclip.core.observation import get_observation_layout
+
+
+LAYOUT = get_observation_layout(4, 3)
+URLS = ["http://player-0:5000", "http://player-1:5000"]
+
+
+def _record(out_dir: Path, num_steps: int) -> None:
+    recorder = TransitionRecorder(out_dir, LAYOUT)
+    for step in range(num_steps):
+        recorder.record(
+            Transition(
+                obs=np.full(LAYOUT.size, step, dtype="float32"),
+                action=RESET_ACTION if step == 0 else 0,
+                reward=0.0,
+                done=False,
+                wastage_cost=0.0,
+                wait_time=0.0,
+                step_time=0.0,
+            ),
+        )
+    recorder.close()
+
+
+def test_one_url_is_shared_by_sessions() -> None:
+    specs = build_player_specs(URLS[:1], num_players=3, legacy_protocol=True)
+
+    assert specs == [
+        PlayerSpec(URLS[0], f"player-{idx}", legacy_protocol=True) for idx in range(3)
+    ]
+
+
+def test_single_player_has_no_session() -> None:
+    assert build_player_specs(URLS[:1], num_players=1) == [PlayerSpec(URLS[0])]
+
+
+@pytest.mark.parametrize("num_players", [1, 2])
+def test_one_player_per_url(num_players: int) -> None:
+    specs = build_player_specs(URLS, num_players)
+
+    assert specs == [PlayerSpec(URLS[0]), PlayerSpec(URLS[1])]
+
+
+def test_player_count_must_match_the_urls() -> None:
+    with pytest.raises(ValueError, match="Cannot drive 3 players through 2 URLs"):
+        build_player_specs(URLS, num_players=3)
+
+
+def test_player_specs_need_a_url() -> None:
+    with pytest.raises(ValueError, match="At least one"):
+        build_player_specs([], num_players=1)
+
+
+def test_live_vector_env_connects_each_env_to_its_player() -> None:
+    specs = build_player_specs(URLS[:1], num_players=1)
+
+    venv = make_live_vector_env(specs, 4, 3, 1000, deadline=DeadlinePolicy(1.0))
+    player_conn = venv.get_env_attr("player_conn")[0]
+    venv.close()
+
+    assert isinstance(venv, DecisionClock)
+    assert (player_conn.base_url, player_conn.session_id) == (URLS[0], None)
+
+
+def test_live_vector_env_without_deadline_is_not_clocked() -> None:
+    venv = make_live_vector_env([PlayerSpec(URLS[0])], 4, 3, 1000)
+    venv.close()
+
+    assert isinstance(venv, DummyVectorEnv)
+
+
+def test_replay_vector_env_has_one_env_per_recording(tmp_path: Path) -> None:
+    _record(tmp_path / "env-0", num_steps=2)
+    _record(tmp_path / "env-1", num_steps=3)
+
+    venv = make_replay_vector_env(tmp_path, segment_size=1000, flat_observation=True)
+    obs = venv.reset()
+
+    assert len(venv) == 2
+    assert obs.shape == (2, LAYOUT.size)
+
+
+def test_replay_vector_env_needs_a_recording(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="No recording"):
+        make_replay_vector_env(tmp_path, segment_size=1000)
@@ -0,0 +1,77 @@
+from typing import Any
+
+import pytest
+from numpy.testing import assert_array_equal
+
+import numpy as np
+
+from sit_liveclip.core import wire
+from sit_liveclip.core.observation import OBSERVATION_FIELDS
+
+
+HISTORY_SIZE = 5
+SLIDING_WINDOW_SIZE = 3
+
+
+def _sample_state(seed: int = 0) -> dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    return {
+        "status": True,
+        "wastage_cost": 1.5,
+        "download_speed": rng.uniform(0, 17000, HISTORY_SIZE).tolist(),
+        "user_staying_time": rng.uniform(0, 120, HISTORY_SIZE).tolist(),
+        "play_progress": 12.25,
+        "current_staying_time": 30.5,
+        "replay_round": 0.0,
+        "list_video_bitrate": [1000.0] * SLIDING_WINDOW_SIZE,
+        "list_video_length": [60.0] * SLIDING_WINDOW_SIZE,
+        "list_buffered_content": rng.uniform(0, 60, SLIDING_WINDOW_SIZE).tolist(),
+        "list_time_spent_downloading_videos": [0.5, 1.0, 0.0],
+        "list_completed_videos": [1.0, 0.0, 0.0],
+    }
+
+
+def test_binary_state_matches_json_state() -> None:
+    state = _sample_state()
+
+    from_binary = wire.decode_state(wire.encode_state(state))
+    from_json = wire.decode_state_json(state)
+
+    assert from_binary.done == from_json.done
+    assert from_binary.wastage_cost == from_json.wastage_cost
+    for field in OBSERVATION_FIELDS:
+        assert_array_equal(from_binary.obs[field], from_json.obs[field])
+
+
+def test_decoded_state_keeps_shapes_and_float32_values() -> None:
+    state = _sample_state()
+
+    decoded = wire.decode_state(wire.encode_state(state))
+
+    assert decoded.done is True
+    assert decoded.wastage_cost == 1.5
+    assert decoded.obs["download_speed"].shape == (1, HISTORY_SIZE)
+    assert decoded.obs["play_progress"].shape == (1,)
+    assert decoded.obs["list_buffered_content"].shape == (SLIDING_WINDOW_SIZE,)
+    assert_array_equal(
+        decoded.obs["download_speed"][0],
+        np.asarray(state["download_speed"], dtype="float32"),
+    )
+
+
+def test_decoded_binary_state_is_read_only() -> None:
+    decoded = wire.decode_state(wire.encode_state(_sample_state()))
+
+    with pytest.raises(ValueError, match="read-only"):
+        decoded.obs["download_speed"][0, 0] = 0.0
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_state_to_json_round_trip(seed: int) -> None:
+    payload = wire.encode_state(_sample_state(seed))
+
+    state = wire.state_to_json(payload)
+
+    assert wire.encode_state(state) == payload
+    assert isinstance(state["play_progress"], float)
+    assert len(state["list_video_bitrate"]) == SLIDING_WINDOW_SIZE